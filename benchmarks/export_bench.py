@@ -0,0 +1,86 @@
+# export_bench.py
+# Throughput of the streaming export (nutrivision_core/export.py) on a synthetic
+# database of about a million rows: profiles, profile_series buckets, diet and
+# workout plans and feedback (synthetic_data.py). Every format is exported for
+# all users with each --workers count in a fresh process, which reports rows/s,
+# MB written and its peak RSS (largest of the process and its workers), so a
+# memory that grows with the row count shows. Linux only (/proc).
+#
+# Usage: python benchmarks/export_bench.py [--users 20000] [--profiles 40]
+#            [--workers 1,4] [--formats csv,jsonl,parquet] [--db PATH] [--out export.json]
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHILD = """
+import sys, json, time, resource
+from nutrivision_core import export
+db, out, fmt, workers = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+start = time.perf_counter()
+totals = export.export_all(db, out, fmt, workers)
+elapsed = time.perf_counter() - start
+# ru_maxrss survives exec on Linux (it would report this script's parent); VmHWM does not.
+with open("/proc/self/status") as f:
+    peak = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+print(json.dumps({"rows": sum(totals.values()), "seconds": elapsed, "max_rss_mb": peak / 1024}))
+"""
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2 ** 20
+
+
+def run_case(db, workdir, fmt, workers):
+    out = tempfile.mkdtemp(prefix=f"{fmt}-{workers}-", dir=workdir)
+    result = subprocess.run([sys.executable, "-c", CHILD, db, out, fmt, str(workers)], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    case = json.loads(result.stdout.strip().splitlines()[-1])
+    case.update(format=fmt, workers=workers, rows_per_s=round(case["rows"] / case["seconds"]), mb=round(directory_mb(out), 1))
+    for name in os.listdir(out):
+        os.remove(os.path.join(out, name))
+    return case
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming export on a million-row database.")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--profiles", type=int, default=40, help="profile rows per user")
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=[1, 4])
+    parser.add_argument("--formats", type=lambda s: s.split(","), default=["csv", "jsonl", "parquet"])
+    parser.add_argument("--db", help="reuse (or keep) the synthetic database at this path")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    from synthetic_data import populate
+    workdir = tempfile.mkdtemp(prefix="nutrivision-export-")
+    db = args.db or os.path.join(workdir, "export.db")
+    if not os.path.exists(db):
+        start = time.perf_counter()
+        counts = populate(db, users=args.users, profiles_per_user=args.profiles, diet_plans_per_user=4,
+                          workout_plans_per_user=3, feedback_per_user=3)
+        print(f"Built {db}: {counts} in {time.perf_counter() - start:.0f} s")
+
+    print(f"{'format':<8} {'workers':>7} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'MB':>8} {'peak RSS MB':>12}")
+    results = []
+    for fmt in args.formats:
+        for workers in args.workers:
+            case = run_case(db, workdir, fmt, workers)
+            results.append(case)
+            print(f"{fmt:<8} {workers:>7} {case['rows']:>9} {case['seconds']:>8.1f} {case['rows_per_s']:>9} "
+                  f"{case['mb']:>8} {case['max_rss_mb']:>12.0f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# fake_model.py
+# A local stand-in for the OpenAI chat completions endpoint, shared by the
+# benchmarks. It answers after a fixed delay with a reply shaped like the one
+# the calling feature expects: a 7-day diet plan from the offline planner, a
+# workout plan, a dish name, a JSON nutrition estimate or a freshness note.
+# Streaming requests get the reply in small chunks followed by a usage chunk.
+#
+# The server runs in its own process so it does not compete with the client
+# for the GIL. /stats reports the requests, peak concurrency and TCP
+# connections seen since the last reset (DELETE /stats resets).
+#
+# Usage: python benchmarks/fake_model.py --port 8791 [--delay 0.5]
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHUNK_CHARS = 16
+NUTRITION_REPLY = json.dumps({"serving": "1 plate (300 g)", "calories": 520, "protein": 18, "carbs": 64, "fat": 21, "sugar": 6})
+FRESHNESS_REPLY = "The produce looks fresh: the colour is even, the skin is firm and there are no bruises or mould."
+DISH_REPLY = "Paneer butter masala"
+
+
+def canned_replies():
+    from synthetic_data import sample_profile, sample_answers, workout_plan_text
+    from nutrivision_core import plans
+    rng = random.Random(1)
+    while True:
+        profile, answers = sample_profile(rng, 0), sample_answers(rng)
+        try:
+            diet = plans.instant_diet_plan(profile, answers, plans.diet_targets(profile))[0]
+            break
+        except ValueError:
+            continue
+    return {"diet": diet, "workout": workout_plan_text(rng)}
+
+
+def reply_for(body, replies):
+    system = body["messages"][0]["content"] if body.get("messages") else ""
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return NUTRITION_REPLY
+    if "dietitian" in system:
+        return replies["diet"]
+    if "fitness coach" in system:
+        return replies["workout"]
+    if (body.get("max_tokens") or 1000) <= 50:
+        return DISH_REPLY
+    return FRESHNESS_REPLY
+
+
+def usage(body, content):
+    prompt = sum(len(json.dumps(m.get("content"))) for m in body.get("messages", [])) // 4
+    completion = max(1, len(content) // 4)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def serve(port, delay):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    replies = canned_replies()
+    state = {"active": 0, "peak": 0, "requests": 0, "connections": set()}
+
+    def chunk(delta, finish=None, usage=None):
+        choices = [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish}]
+        return "data: " + json.dumps({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0,
+                                      "model": "gpt-4o", "choices": choices, "usage": usage}) + "\n\n"
+
+    async def completions(request):
+        body = json.loads(await request.body())
+        state["requests"] += 1
+        state["connections"].add((request.client.host, request.client.port))
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            state["active"] -= 1
+        content = reply_for(body, replies)
+        if body.get("stream"):
+            async def events():
+                yield chunk({"role": "assistant", "content": ""})
+                for start in range(0, len(content), CHUNK_CHARS):
+                    yield chunk({"content": content[start:start + CHUNK_CHARS]})
+                yield chunk({}, "stop")
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield chunk(None, usage=usage(body, content))
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return JSONResponse({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage(body, content),
+        })
+
+    async def stats(request):
+        result = {"peak": state["peak"], "requests": state["requests"], "connections": len(state["connections"])}
+        if request.method == "DELETE":
+            state.update(peak=0, requests=0, connections=set())
+        return JSONResponse(result)
+
+    app = Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"]),
+                            Route("/stats", stats, methods=["GET", "DELETE"])])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096, timeout_keep_alive=30)
+
+
+class FakeServer:
+    # Starts the server on a free port in a subprocess and waits until it answers.
+    def __init__(self, delay):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        self.port = sock.getsockname()[1]
+        sock.close()
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--port", str(self.port), "--delay", str(delay)])
+        while True:
+            try:
+                self.stats()
+                break
+            except OSError:
+                if self.process.poll() is not None:
+                    raise RuntimeError("The fake model server exited during startup.")
+                time.sleep(0.1)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def stats(self, reset=False):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.port}/stats", method="DELETE" if reset else "GET")
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+    def reset(self):
+        self.stats(reset=True)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI chat completions endpoint.")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds before each reply starts")
+    args = parser.parse_args()
+    serve(args.port, args.delay)
@@ -0,0 +1,286 @@
+# load_test.py
+# Many simulated users walking the app at once. Each session is a headless
+# Streamlit session (AppTest) running the real entry script, so every step is
+# a full script run or fragment rerun with its own session state, against one
+# shared database and the local fake model server (fake_model.py).
+#
+# A journey is: open the app, sign up, log in, save a profile, answer the diet
+# survey and generate a plan, rate it, open the Dashboard and Past Diet Plans.
+# Sessions run on --concurrency threads in each of --processes worker
+# processes; every process uses the same database, so SQLite write contention
+# and bcrypt work show up as they would with several app workers.
+#
+# Reported per step: runs, errors, error rate and p50/p95/p99 latency, plus
+# completed journeys and page runs per second. A step's latency is the time
+# AppTest takes to run the script, including its own small harness overhead;
+# the login step includes the page's 1.2 s redirect pause.
+#
+# Usage: python benchmarks/load_test.py [--sessions 200] [--concurrency 16]
+#            [--processes 1] [--script nutrivision_app.py] [--model-delay 0.5]
+#            [--think-time 0] [--out load.json]
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "Load#test-2024"
+STEPS = ["open", "signup", "login", "profile", "diet_survey", "diet_generate", "rate", "dashboard", "past_plans"]
+
+
+class StepFailed(Exception):
+    pass
+
+
+def expect(condition, message):
+    if not condition:
+        raise StepFailed(message)
+
+
+# --- JOURNEY ---
+# Each step opens its page and acts on it as a user would; its time covers
+# every script run it triggers. Widget values set without .run() are sent
+# with the next run, as a browser would.
+def step_open(at, user):
+    at.run()
+
+
+def step_signup(at, user):
+    at.sidebar.radio[0].set_value("Sign Up").run()
+    at.sidebar.text_input[0].input(f"{user}@load.test")
+    at.sidebar.text_input[1].input(user)
+    at.sidebar.text_input[2].input(PASSWORD)
+    at.sidebar.button[0].click().run()
+    expect(at.sidebar.success, f"signup shown no success: {[w.value for w in at.sidebar.warning]}")
+
+
+def step_login(at, user):
+    at.sidebar.radio[0].set_value("Login").run()
+    at.sidebar.text_input[0].input(user)
+    at.sidebar.text_input[1].input(PASSWORD)
+    at.sidebar.button[0].click().run()
+    expect(at.session_state["logged_in"], f"not logged in: {[w.value for w in at.sidebar.warning]}")
+
+
+def step_profile(at, user, rng):
+    at.sidebar.selectbox[0].set_value("User Profile").run()
+    at.text_input[0].input(user)
+    at.number_input[0].set_value(round(rng.uniform(1.55, 1.9), 2))
+    at.number_input[1].set_value(round(rng.uniform(55, 100), 1))
+    at.button[0].click().run()
+    expect(any("saved" in s.value for s in at.success), "profile not saved")
+
+
+def step_diet_survey(at, user, rng):
+    at.sidebar.selectbox[0].set_value("Diet Plan").run()
+    at.selectbox[0].set_value(rng.choice(["Vegetarian", "Eggetarian", "Non-Vegetarian"]))
+    at.multiselect[0].set_value([rng.choice(["Peanuts", "Shellfish", "None"])])
+    at.multiselect[1].set_value(["None"])
+    at.multiselect[2].set_value([rng.choice(["None", "Omega-3", "Multivitamins"])])
+    at.run()
+    expect(len(at.button) >= 2, "survey did not offer the generate buttons")
+
+
+def step_diet_generate(at, user):
+    at.button[0].click().run()
+    expect(not at.error, f"generation failed: {[e.value for e in at.error]}")
+    expect(any("Day" in m.value for m in at.markdown), "no plan shown")
+
+
+def step_rate(at, user, rng):
+    at.sidebar.selectbox[0].set_value("Rate Diet Plan").run()
+    at.slider[0].set_value(rng.randint(1, 5))
+    at.button[0].click().run()
+    expect(at.success, "feedback not saved")
+
+
+def step_dashboard(at, user):
+    at.sidebar.selectbox[0].set_value("Dashboard").run()
+    expect(at.metric, "dashboard shows no metrics")
+
+
+def step_past_plans(at, user):
+    at.sidebar.selectbox[0].set_value("Past Diet Plans").run()
+    expect(at.expander, "no past plans listed")
+
+
+JOURNEY = [
+    ("open", step_open), ("signup", step_signup), ("login", step_login), ("profile", step_profile),
+    ("diet_survey", step_diet_survey), ("diet_generate", step_diet_generate), ("rate", step_rate),
+    ("dashboard", step_dashboard), ("past_plans", step_past_plans),
+]
+NEEDS_RNG = {step_profile, step_diet_survey, step_rate}
+
+
+def run_session(script, user, seed, think_time):
+    # [(step, seconds or None, error or None)]; a failed step ends the journey.
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(seed)
+    at = AppTest.from_file(script, default_timeout=120)
+    records = []
+    for name, step in JOURNEY:
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+        start = time.perf_counter()
+        try:
+            step(at, user, rng) if step in NEEDS_RNG else step(at, user)
+            if at.exception:
+                raise StepFailed(at.exception[0].message)
+        except Exception as e:
+            records.append((name, None, f"{type(e).__name__}: {e}"[:200]))
+            break
+        records.append((name, time.perf_counter() - start, None))
+    return records
+
+
+def share_test_runtime():
+    # AppTest sets up process-wide state for each run and tears it down when the
+    # run ends: a mock Runtime and the global.appTest config option. With
+    # sessions on several threads, one session's teardown would pull both out
+    # from under another session's script. The option stays on for the whole
+    # process, and runtime lookups fall back to the most recent mock.
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    config.set_option("global.appTest", True)
+    latest = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            latest[:] = [cls._instance]
+            return cls._instance
+        if latest:
+            return latest[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(latest))
+
+
+def run_worker(worker, sessions, concurrency, script, think_time, seed):
+    # One worker process: its share of the sessions on a thread pool.
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    # AppTest re-applies logger.level on every run; pages log a deprecation warning per chart.
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    share_test_runtime()
+    records = []
+    lock = threading.Lock()
+
+    def one(i):
+        result = run_session(script, f"load{worker}x{i}", seed * 100003 + worker * 1009 + i, think_time)
+        with lock:
+            records.extend(result)
+
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(one, range(sessions)))
+    finally:
+        # A worker process joins its children on exit before the executor's
+        # own exit hook has stopped them; stop the bcrypt workers first.
+        from nutrivision_core import auth_pool
+        auth_pool.shutdown()
+    return records
+
+
+# --- REPORT ---
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def report(records, wall, sessions):
+    steps = {}
+    for name, seconds, error in records:
+        entry = steps.setdefault(name, {"runs": 0, "errors": 0, "latencies": [], "sample_error": None})
+        entry["runs"] += 1
+        if error:
+            entry["errors"] += 1
+            entry["sample_error"] = entry["sample_error"] or error
+        else:
+            entry["latencies"].append(seconds)
+    result = {}
+    for name in STEPS:
+        entry = steps.get(name)
+        if not entry:
+            continue
+        latencies = entry.pop("latencies")
+        entry["error_rate"] = round(entry["errors"] / entry["runs"], 4)
+        if latencies:
+            entry.update({f"p{p}_ms": round(percentile(latencies, p) * 1000, 1) for p in (50, 95, 99)})
+        result[name] = entry
+    completed = sum(1 for name, _, error in records if name == STEPS[-1] and not error)
+    return {
+        "sessions": sessions, "completed_journeys": completed, "wall_s": round(wall, 2),
+        "journeys_per_s": round(completed / wall, 2), "page_runs_per_s": round(len(records) / wall, 1),
+        "steps": result,
+    }
+
+
+def print_report(summary):
+    print(f"{'step':<15} {'runs':>6} {'errors':>7} {'err %':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in summary["steps"].items():
+        print(f"{name:<15} {s['runs']:>6} {s['errors']:>7} {s['error_rate']:>7.1%} {s.get('p50_ms', '-'):>9} "
+              f"{s.get('p95_ms', '-'):>9} {s.get('p99_ms', '-'):>9}")
+    print(f"\n{summary['completed_journeys']}/{summary['sessions']} journeys completed in {summary['wall_s']} s: "
+          f"{summary['journeys_per_s']} journeys/s, {summary['page_runs_per_s']} page runs/s")
+    for name, s in summary["steps"].items():
+        if s["sample_error"]:
+            print(f"  {name}: {s['sample_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive many headless app sessions through a user journey.")
+    parser.add_argument("--sessions", type=int, default=200, help="simulated users in total")
+    parser.add_argument("--concurrency", type=int, default=16, help="sessions at once in each process")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes sharing the database")
+    parser.add_argument("--script", default="nutrivision_app.py", help="entry script, relative to the repository")
+    parser.add_argument("--model-delay", type=float, default=0.5, help="seconds the fake model waits before replying")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause in seconds before each step")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the summary to this JSON file")
+    args = parser.parse_args()
+
+    from fake_model import FakeServer
+    out = os.path.abspath(args.out) if args.out else None
+    script = os.path.join(ROOT, args.script)
+    server = FakeServer(args.model_delay)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["NUTRIVISION_OPENAI_API_KEY"] = "sk-load"
+    # The entry scripts use a relative database path: every worker shares this directory's file.
+    os.chdir(tempfile.mkdtemp(prefix="nutrivision-load-"))
+
+    shares = [args.sessions // args.processes + (w < args.sessions % args.processes) for w in range(args.processes)]
+    print(f"{args.sessions} sessions: {args.processes} process(es) x {args.concurrency} concurrent, model delay {args.model_delay} s")
+    started = time.perf_counter()
+    records = []
+    try:
+        if args.processes == 1:
+            records = run_worker(0, shares[0], args.concurrency, script, args.think_time, args.seed)
+        else:
+            with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(run_worker, w, n, args.concurrency, script, args.think_time, args.seed)
+                           for w, n in enumerate(shares)]
+                for f in futures:
+                    records.extend(f.result())
+    finally:
+        server.stop()
+    summary = report(records, time.perf_counter() - started, args.sessions)
+    summary["settings"] = vars(args)
+    print_report(summary)
+    if out:
+        with open(out, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {out}")
+
+
+if __name__ == "__main__":
+    main()
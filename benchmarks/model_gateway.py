@@ -0,0 +1,127 @@
+# model_gateway.py
+# Concurrent model calls from one process, against the local fake of the OpenAI
+# chat completions endpoint (fake_model.py) that answers after a fixed delay.
+#
+#   thread pool  - the old path: the synchronous OpenAI client on a pool of
+#                  worker threads, so calls in flight are capped by threads
+#   gateway      - the pages' path now: calls submitted to the model gateway's
+#                  event loop and its one shared AsyncOpenAI connection pool
+#
+# Reports wall time, throughput, latency percentiles, the peak number of
+# requests the server saw at once, and how many TCP connections were opened
+# (fewer connections than requests means keep-alive reuse).
+#
+# Usage: python benchmarks/model_gateway.py [--calls 600] [--delay 0.5]
+#            [--threads 32] [--max-in-flight 256] [--check]
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_model import FakeServer
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def summarize(name, server, started, latencies, errors):
+    wall = time.perf_counter() - started
+    seen = server.stats()
+    return {
+        "path": name, "calls": len(latencies) + errors, "errors": errors, "wall_s": round(wall, 3),
+        "calls_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "server_peak_in_flight": seen["peak"], "tcp_connections": seen["connections"],
+    }
+
+
+def run_thread_pool(server, calls, threads):
+    from openai import OpenAI
+    client = OpenAI(api_key="sk-bench", base_url=f"http://127.0.0.1:{server.port}/v1", max_retries=0)
+    messages = [{"role": "user", "content": "ping"}]
+
+    def one():
+        t = time.perf_counter()
+        client.chat.completions.create(model="gpt-4o", messages=messages, max_tokens=5)
+        return time.perf_counter() - t
+
+    server.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        futures = [pool.submit(one) for _ in range(calls)]
+    latencies = [f.result() for f in futures if not f.exception()]
+    return summarize(f"thread pool ({threads} threads)", server, started, latencies, calls - len(latencies))
+
+
+def run_gateway(server, calls, max_in_flight):
+    from nutrivision_core import llm
+    from nutrivision_core.gateway import ModelGateway
+
+    gateway = ModelGateway(max_in_flight)
+    messages = [{"role": "user", "content": "ping"}]
+
+    async def one():
+        t = time.perf_counter()
+        await llm.chat_async(messages, max_tokens=5)
+        return time.perf_counter() - t
+
+    # Warm-up: builds the loop's client outside the timed run.
+    gateway.run(one())
+    server.reset()
+    started = time.perf_counter()
+    futures = [gateway.submit(one()) for _ in range(calls)]
+    wait(futures)
+    latencies = [f.result() for f in futures if not f.exception()]
+    result = summarize(f"gateway (max {max_in_flight} in flight)", server, started, latencies, calls - len(latencies))
+    result["gateway_peak_in_flight"] = gateway.stats()["peak_in_flight"]
+    gateway.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds the fake server takes per call")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--check", action="store_true", help="fail unless the gateway reaches its in-flight limit")
+    args = parser.parse_args()
+
+    server = FakeServer(args.delay)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["NUTRIVISION_OPENAI_API_KEY"] = "sk-bench"
+    # The gateway path records each call in the usage ledger; keep it out of the working directory.
+    from nutrivision_core import storage
+    storage.configure(os.path.join(tempfile.mkdtemp(), "nutrivision_users.db"))
+    try:
+        results = [run_thread_pool(server, args.calls, args.threads), run_gateway(server, args.calls, args.max_in_flight)]
+    finally:
+        server.stop()
+
+    for r in results:
+        print(f"{r['path']:<30} {r['wall_s']:>7.2f} s  {r['calls_per_s']:>7.1f} calls/s  p50 {r['p50_ms']} ms  "
+              f"p95 {r['p95_ms']} ms  peak in flight {r['server_peak_in_flight']}  connections {r['tcp_connections']}  "
+              f"errors {r['errors']}")
+    print(json.dumps(results, indent=2))
+
+    if args.check:
+        gateway = results[1]
+        target = min(args.calls, args.max_in_flight) * 0.9
+        if gateway["errors"] or gateway["server_peak_in_flight"] < target:
+            print(f"FAIL: gateway peaked at {gateway['server_peak_in_flight']} in flight (want >= {target:.0f}) "
+                  f"with {gateway['errors']} errors")
+            sys.exit(1)
+        print("OK")
+
+
+if __name__ == "__main__":
+    main()
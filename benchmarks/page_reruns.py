@@ -0,0 +1,104 @@
+# page_reruns.py
+# Server CPU per widget interaction on the Diet Plan page.
+#
+#   full rerun      - the whole script runs (session checks, sidebar, page), which
+#                     is what every survey interaction cost before the survey
+#                     pages became fragments
+#   fragment rerun  - only the page body runs, which is what a widget change
+#                     inside the fragment costs now
+#
+# Runs against a throwaway database in a temporary directory, with the OpenAI
+# client pointed at a closed local port. Both answer sets get an offline plan
+# before measuring, so every measured interaction is served from the plan cache;
+# the one generation the page attempts while the first set is filled in fails
+# fast and is not timed.
+#
+# Usage: python benchmarks/page_reruns.py [interactions]
+import os
+import sys
+import time
+import tempfile
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "nutrivision_app.py")
+FRAGMENT_SCRIPT = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import streamlit as st
+from nutrivision_core import pages, storage
+storage.configure("nutrivision_users.db")
+pages.show_diet_plan(st.session_state["user_id"])
+"""
+SUPPLEMENTS = (["None"], ["Omega-3"])
+
+
+def new_app(path=None, script=None):
+    at = AppTest.from_file(path, default_timeout=120) if path else AppTest.from_string(script, default_timeout=120)
+    at.secrets["openai_api_key"] = "sk-benchmark"
+    return at
+
+
+def login(at):
+    at.run()
+    at.sidebar.radio[0].set_value("Sign Up").run()
+    at.sidebar.text_input[0].input("bench@example.com")
+    at.sidebar.text_input[1].input("bench")
+    at.sidebar.text_input[2].input("Bench#2024pass")
+    at.sidebar.button[0].click().run()
+    at.sidebar.radio[0].set_value("Login").run()
+    at.sidebar.text_input[0].input("bench")
+    at.sidebar.text_input[1].input("Bench#2024pass")
+    at.sidebar.button[0].click().run()
+    at.run()
+    at.sidebar.selectbox[0].set_value("User Profile").run()
+    at.text_input[0].input("Bench")
+    at.number_input[0].set_value(1.75)
+    at.number_input[1].set_value(72.0)
+    at.button[0].click().run()
+
+
+def answer(at, supplements):
+    at.selectbox[0].set_value("Vegetarian")
+    at.multiselect[0].set_value(["Peanuts"])
+    at.multiselect[1].set_value(["None"])
+    at.multiselect[2].set_value(supplements)
+
+
+def measure(at, interactions):
+    timings = []
+    for i in range(interactions):
+        answer(at, SUPPLEMENTS[i % 2])
+        start = time.process_time()
+        at.run()
+        timings.append(time.process_time() - start)
+        assert not at.exception, at.exception
+    timings.sort()
+    return timings[len(timings) // 2] * 1e3, sum(timings) / len(timings) * 1e3
+
+
+def main(interactions=40):
+    os.environ["OPENAI_BASE_URL"] = "http://127.0.0.1:9"
+    os.chdir(tempfile.mkdtemp(prefix="nutrivision-bench-"))
+
+    full = new_app(path=APP)
+    login(full)
+    full.sidebar.selectbox[0].set_value("Diet Plan").run()
+    for supplements in SUPPLEMENTS:
+        answer(full, supplements)
+        full.run()
+        full.button[1].click().run()
+
+    fragment = new_app(script=FRAGMENT_SCRIPT)
+    fragment.session_state["user_id"] = full.session_state["user_id"]
+    fragment.run()
+
+    results = {"full rerun": measure(full, interactions), "fragment rerun": measure(fragment, interactions)}
+    print(f"Diet Plan page, {interactions} interactions (CPU ms per interaction)")
+    for label, (p50, mean) in results.items():
+        print(f"{label:>15}: p50 {p50:7.2f}  mean {mean:7.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
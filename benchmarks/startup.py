@@ -0,0 +1,109 @@
+# startup.py
+# Cold start of an app worker. Each script runs in a fresh interpreter under
+# -X importtime: the login page is rendered once (import plus first run), then
+# a logged-in session walks every page except the Dashboard and Logout. The
+# report shows cold-start time, peak RSS, the slowest top-level imports, and
+# whether the plotting stack was loaded, which only the Dashboard may do.
+#
+# Usage:
+#   python benchmarks/startup.py [script ...]
+#   python benchmarks/startup.py --check [--budget SECONDS] [script ...]
+#
+# --check exits non-zero when a page other than the Dashboard loads pandas,
+# matplotlib or plotly.express, or when a cold start exceeds the budget.
+# tests/test_startup.py asserts the same module checks under pytest.
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ["nutrivision_app.py", "nutrivision.py", "nutrivision2.py"]
+HEAVY = ["pandas", "matplotlib", "plotly.express"]
+STARTUP_BUDGET = 6.0
+CHILD = """
+import sys, json, time, resource
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.secrets["openai_api_key"] = "sk-startup"
+at.run()
+cold = time.perf_counter() - start
+heavy = sys.argv[2].split(",")
+after_login = [m for m in heavy if m in sys.modules]
+
+at.session_state["logged_in"] = True
+at.session_state["user_id"] = 1
+at.run()
+pages = [p for p in at.sidebar.selectbox[0].options if p not in ("Dashboard", "Logout")]
+for page in pages:
+    at.sidebar.selectbox[0].set_value(page).run()
+after_pages = [m for m in heavy if m in sys.modules]
+print(json.dumps({
+    "cold_start": cold,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "pages": pages,
+    "errors": [str(e.value) for e in at.exception],
+    "heavy_at_login": after_login,
+    "heavy_after_pages": after_pages,
+}))
+"""
+
+
+def import_times(stderr):
+    # Cumulative microseconds per top-level package, from -X importtime output.
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith(" ") or name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        totals[name.strip().split(".")[0]] += int(cumulative)
+    return totals
+
+
+def measure(script):
+    workdir = tempfile.mkdtemp(prefix="nutrivision-startup-")
+    env = dict(os.environ, OPENAI_BASE_URL="http://127.0.0.1:9")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, os.path.join(ROOT, script), ",".join(HEAVY)],
+                          cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} failed to start:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = import_times(proc.stderr).most_common(8)
+    return result
+
+
+def main(argv):
+    check = "--check" in argv
+    budget = STARTUP_BUDGET
+    if "--budget" in argv:
+        budget = float(argv[argv.index("--budget") + 1])
+        del argv[argv.index("--budget"):argv.index("--budget") + 2]
+    scripts = [a for a in argv if not a.startswith("--")] or SCRIPTS
+
+    failures = []
+    for script in scripts:
+        r = measure(script)
+        print(f"{script}: cold start {r['cold_start']:.2f} s, peak RSS {r['max_rss_mb']:.0f} MB")
+        print("  slowest imports: " + ", ".join(f"{name} {us / 1e3:.0f} ms" for name, us in r["imports"]))
+        print(f"  heavy modules at login: {r['heavy_at_login'] or 'none'}; after {len(r['pages'])} pages: {r['heavy_after_pages'] or 'none'}")
+        if r["errors"]:
+            failures.append(f"{script}: page errors {r['errors']}")
+        if r["heavy_after_pages"]:
+            failures.append(f"{script}: non-dashboard pages loaded {', '.join(r['heavy_after_pages'])}")
+        if r["cold_start"] > budget:
+            failures.append(f"{script}: cold start {r['cold_start']:.2f} s exceeds the {budget:.1f} s budget")
+
+    if check:
+        for failure in failures:
+            print("FAIL", failure)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
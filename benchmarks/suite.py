@@ -0,0 +1,342 @@
+# suite.py
+# Reproducible benchmarks for the app's hot paths. Each run builds synthetic
+# databases (synthetic_data.py) in a temporary directory, starts the local fake
+# model server (fake_model.py) and times:
+#
+#   profile_lookup@N        latest profile of a random user, N users in the DB
+#   dashboard@N             the Dashboard page body (queries and charts), N users
+#   diet_plan.cache_hit     the profile_hash lookup that reuses a stored plan
+#   diet_plan.cache_miss    prompt, model call and save of a new diet plan
+#   diet_plan.stream_first  time to the first streamed chunk of a diet plan
+#   diet_plan.stream_total  the whole streamed diet plan
+#   workout_plan.cache_hit  the 14-day reuse lookup
+#   workout_plan.cache_miss prompt, model call and save of a new workout plan
+#   image.preprocess@WxH    decoding, validating and encoding an upload of WxH
+#   login@Tt                bcrypt login of a random user on T threads
+#   past_plans@P            the Past Diet Plans page for a user with P plans
+#
+# Pages run in Streamlit's bare mode, so element calls cost what building the
+# page costs but nothing is sent to a browser. Random choices use fixed seeds.
+#
+# Usage:
+#   python benchmarks/suite.py [--sizes 100,1000] [--repeat 1.0] [--only PREFIX ...]
+#                              [--model-delay 0] [--out results.json]
+#   python benchmarks/suite.py --compare BASELINE.json CURRENT.json [--threshold 0.15]
+#
+# --compare exits non-zero when any case's p50 is slower than the baseline by
+# more than the threshold, or when a case that passed now has errors.
+import os
+import io
+import sys
+import json
+import time
+import random
+import tempfile
+import platform
+import argparse
+import datetime
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_model import FakeServer
+from synthetic_data import BENCH_PASSWORD, populate, sample_answers
+from streamlit.logger import set_log_level
+
+# Bare-mode pages log a warning per element call; only errors are of interest here.
+set_log_level("error")
+
+IMAGE_SIZES = [(640, 480), (1280, 960), (4032, 3024)]
+LOGIN_THREADS = [1, 4]
+HISTORY_SIZES = [50, 500]
+DEFAULT_THRESHOLD = 0.15
+
+
+# --- MEASUREMENT ---
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def summarize(samples, errors=0, wall=None):
+    result = {"n": len(samples), "errors": errors}
+    if samples:
+        result.update(mean_ms=round(sum(samples) / len(samples) * 1000, 3), p50_ms=round(percentile(samples, 50) * 1000, 3),
+                      p95_ms=round(percentile(samples, 95) * 1000, 3), max_ms=round(max(samples) * 1000, 3))
+        result["ops_per_s"] = round(len(samples) / (wall if wall else sum(samples)), 1)
+    return result
+
+
+def timed(fn, iterations, warmup=2):
+    # Runs fn(i) warmup times untimed, then iterations times; returns the summary.
+    for i in range(warmup):
+        fn(i)
+    samples, errors = [], 0
+    for i in range(iterations):
+        start = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            errors += 1
+            if errors == 1:
+                print("  error:", repr(e))
+            continue
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, errors)
+
+
+# --- CASES ---
+def db_cases(sizes, repeat, workdir):
+    from nutrivision_core import pages, profiles, storage
+    for users in sizes:
+        path = os.path.join(workdir, f"bench_{users}.db")
+        populate(path, users=users)
+        storage.configure(path)
+        rng = random.Random(users)
+        yield f"profile_lookup@{users}", timed(lambda i: profiles.latest_profile(rng.randint(1, users)), int(2000 * repeat))
+        yield f"dashboard@{users}", timed(lambda i: pages.dashboard(rng.randint(1, users), "plotly"), int(50 * repeat))
+
+
+def plan_cases(repeat, workdir):
+    from nutrivision_core import llm, plans, profiles, storage
+    path = os.path.join(workdir, "bench_plans.db")
+    populate(path, users=200)
+    storage.configure(path)
+    rng = random.Random(11)
+    profile = profiles.latest_profile(1)
+    answers = sample_answers(rng)
+    targets = plans.diet_targets(profile)
+    profile_hash = plans.diet_profile_hash(profile, answers)
+    plan, stored, days = plans.instant_diet_plan(profile, answers, targets)
+    plans.save_diet_plan(1, profile_hash, answers, plan, stored, days)
+    prefs = plans.workout_preferences("Morning", "45 mins", ["None"], ["Dumbbells", "Bench / Box"])
+
+    def diet_miss(i):
+        prompt = plans.diet_prompt(profile, answers, targets, plans.latest_feedback_note(1), False)
+        plan = llm.generate_text_plan(plans.DIET_SYSTEM_PROMPT, prompt, plans.DIET_MAX_TOKENS[0], site="diet_plan")
+        plans.save_diet_plan(1, profile_hash, answers, plan, plan, None)
+
+    def workout_miss(i):
+        plan = llm.generate_text_plan(plans.WORKOUT_SYSTEM_PROMPT, plans.workout_prompt(profile, prefs, False),
+                                      plans.WORKOUT_MAX_TOKENS[0], site="workout_plan")
+        plans.save_workout_plan(1, plan)
+
+    first, total = [], []
+
+    def diet_stream(i):
+        messages = llm.plan_messages(plans.DIET_SYSTEM_PROMPT, plans.diet_prompt(profile, answers, targets, None, False))
+
+        async def consume():
+            start = time.perf_counter()
+            parts = []
+            async for delta in llm.stream_chat(messages, "diet_plan", temperature=0.5, max_tokens=plans.DIET_MAX_TOKENS[0]):
+                if not parts:
+                    first.append(time.perf_counter() - start)
+                parts.append(delta)
+            total.append(time.perf_counter() - start)
+            return "".join(parts)
+        llm.gateway().run(consume())
+
+    yield "diet_plan.cache_hit", timed(lambda i: plans.cached_diet_plan(1, profile_hash), int(2000 * repeat))
+    yield "diet_plan.cache_miss", timed(diet_miss, int(100 * repeat))
+    stream = timed(diet_stream, int(100 * repeat))
+    del first[:2], total[:2]
+    yield "diet_plan.stream_first", summarize(first, stream["errors"])
+    yield "diet_plan.stream_total", summarize(total, stream["errors"])
+    yield "workout_plan.cache_miss", timed(workout_miss, int(100 * repeat))
+    yield "workout_plan.cache_hit", timed(lambda i: plans.recent_workout_plan(1), int(2000 * repeat))
+
+
+def synthetic_photo(width, height, seed):
+    # A smooth gradient with sensor-like noise: JPEG sizes close to real photos.
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    base = np.stack([200 * x + 30 * y, 120 + 80 * y * x, 90 + 100 * (1 - x) * y], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, (height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def image_cases(repeat):
+    from nutrivision_core import images
+    for width, height in IMAGE_SIZES:
+        data = synthetic_photo(width, height, width)
+
+        def preprocess(i):
+            image, error = images.open_image(io.BytesIO(data))
+            assert error is None, error
+            images.image_data_url(image)
+        iterations = max(3, int(200 * repeat * 640 * 480 / (width * height)))
+        yield f"image.preprocess@{width}x{height}", dict(timed(preprocess, iterations), bytes=len(data))
+
+
+def login_cases(repeat, workdir):
+    from nutrivision_core import auth, storage
+    path = os.path.join(workdir, "bench_login.db")
+    populate(path, users=500)
+    storage.configure(path)
+    rng = random.Random(5)
+
+    def login(i):
+        user, message = auth.authenticate(f"user{rng.randint(1, 500)}", BENCH_PASSWORD, f"10.0.{i % 250}.{i // 250 % 250}")
+        if user is None:
+            raise RuntimeError(message or "login rejected")
+
+    for threads in LOGIN_THREADS:
+        iterations = int(40 * repeat) * threads
+        login(0)
+        samples, errors = [], 0
+
+        def one(i):
+            start = time.perf_counter()
+            login(i)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            futures = [pool.submit(one, i) for i in range(iterations)]
+        wall = time.perf_counter() - start
+        for f in futures:
+            if f.exception():
+                errors += 1
+            else:
+                samples.append(f.result())
+        yield f"login@{threads}t", summarize(samples, errors, wall)
+
+
+def history_cases(repeat, workdir):
+    from nutrivision_core import pages, storage
+    for size in HISTORY_SIZES:
+        path = os.path.join(workdir, f"bench_history_{size}.db")
+        populate(path, users=10, diet_plans_per_user=size)
+        storage.configure(path)
+        yield f"past_plans@{size}", timed(lambda i: pages.view_past_diet_plans(1), max(3, int(20 * repeat * 50 / size)))
+
+
+# --- RESULTS ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results):
+    print(f"{'case':<30} {'n':>6} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'ops/s':>9}")
+    for name, r in results.items():
+        if r["n"]:
+            print(f"{name:<30} {r['n']:>6} {r['errors']:>4} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['max_ms']:>10.3f} {r['ops_per_s']:>9.1f}")
+        else:
+            print(f"{name:<30} {r['n']:>6} {r['errors']:>4}")
+
+
+def compare(baseline, current, threshold):
+    # Returns the regressed case names; cases missing from either run are listed but not judged.
+    regressions = []
+    print(f"{'case':<30} {'base p50':>10} {'now p50':>10} {'change':>8}")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        old, new = baseline["results"].get(name), current["results"].get(name)
+        if not old or not new:
+            print(f"{name:<30} {'only in ' + ('current' if new else 'baseline'):>30}")
+            continue
+        if not new["n"] or not old["n"]:
+            print(f"{name:<30} {'no samples':>30}")
+            if new["errors"] and not old["errors"]:
+                regressions.append(name)
+            continue
+        change = new["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        regressed = change > threshold or (new["errors"] > 0 and old["errors"] == 0)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<30} {old['p50_ms']:>10.3f} {new['p50_ms']:>10.3f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def run(args):
+    server = FakeServer(args.model_delay)
+    workdir = tempfile.mkdtemp(prefix="nutrivision-bench-")
+    os.chdir(workdir)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["NUTRIVISION_OPENAI_API_KEY"] = "sk-bench"
+    # (case name prefixes, cases) per group; a group runs only if --only keeps one of its prefixes.
+    groups = [
+        (("profile_lookup", "dashboard"), lambda: db_cases(args.sizes, args.repeat, workdir)),
+        (("diet_plan", "workout_plan"), lambda: plan_cases(args.repeat, workdir)),
+        (("image",), lambda: image_cases(args.repeat)),
+        (("login",), lambda: login_cases(args.repeat, workdir)),
+        (("past_plans",), lambda: history_cases(args.repeat, workdir)),
+    ]
+
+    def wanted(name):
+        return not args.only or any(name.startswith(prefix) or prefix.startswith(name) for prefix in args.only)
+
+    results = {}
+    try:
+        for prefixes, cases in groups:
+            if not any(wanted(prefix) for prefix in prefixes):
+                continue
+            for name, result in cases():
+                if not wanted(name):
+                    continue
+                results[name] = result
+                print(f"  {name}: p50 {result.get('p50_ms')} ms ({result['n']} runs, {result['errors']} errors)", flush=True)
+    finally:
+        server.stop()
+    return {
+        "meta": {"created_at": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "sizes": args.sizes, "repeat": args.repeat, "model_delay": args.model_delay},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths.")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[100, 1000],
+                        help="users in the databases for the profile and dashboard cases")
+    parser.add_argument("--repeat", type=float, default=1.0, help="scales every case's iteration count")
+    parser.add_argument("--only", nargs="*", help="case name prefixes to keep, e.g. dashboard image")
+    parser.add_argument("--model-delay", type=float, default=0.0, help="seconds the fake model waits before replying")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the new results against this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed p50 slowdown, e.g. 0.15 for 15%%")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        out = os.path.abspath(args.out) if args.out else None
+        baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+        current = run(args)
+        print()
+        print_results(current["results"])
+        if out:
+            with open(out, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"\nResults written to {out}")
+        if not baseline_path:
+            return
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print()
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
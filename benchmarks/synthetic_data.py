@@ -0,0 +1,137 @@
+# synthetic_data.py
+# Builds a throwaway app database of a given size for the benchmarks: users,
+# profiles (and their profile_series buckets), diet_plans, workout_plans and
+# diet_feedback rows for N users. The same seed always produces the same rows.
+#
+# Plan bodies come from the offline planner (diet) and a fixed template
+# (workout), drawn from a small pool and stored once each in plan_blobs, the
+# way repeated plans are stored by the app. Every user shares one bcrypt hash
+# of BENCH_PASSWORD, so logins can be benchmarked against any of them.
+#
+# Usage: python benchmarks/synthetic_data.py DB [--users 1000] [--profiles 5]
+#            [--diet-plans 3] [--workout-plans 2] [--feedback 1] [--seed 7]
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nutrivision_core import auth, plans, profile_history, profiles, storage
+
+BENCH_PASSWORD = "Bench-pass-1!"
+PLAN_POOL = 24
+HISTORY_DAYS = 180
+# Workout plans are spread over a month, so some users get the 14-day reuse and some do not.
+WORKOUT_HISTORY_DAYS = 30
+FEEDBACK_NOTES = ["Too much rice", "Loved the breakfasts", "Needed more snacks", "Hard to cook on weekdays", ""]
+
+
+def sample_profile(rng, user_id, created_at=None):
+    # A profiles row: (user_id, name, gender, body_type, activity_level, height,
+    # weight, bmi, goal, weight_loss_rate, workout_type, gym_focus, created_at).
+    height = round(rng.uniform(1.5, 1.95), 2)
+    weight = round(rng.uniform(48, 115), 1)
+    goal = rng.choice(profiles.GOALS)
+    workout_type = rng.choice(profiles.WORKOUT_TYPES)
+    return (user_id, f"User {user_id}", rng.choice(profiles.GENDERS[:2]), rng.choice(profiles.BODY_TYPES),
+            rng.choice(profiles.ACTIVITY_LEVELS), height, weight, profiles.compute_bmi(height, weight), goal,
+            rng.choice(profiles.LOSS_RATES) if goal == "Lose Fat" else "", workout_type,
+            rng.choice(profiles.GYM_FOCUS) if workout_type == "Gym" else "", str(created_at or datetime.datetime.now()))
+
+
+def sample_answers(rng):
+    return plans.diet_answers(rng.choice(plans.DIET_TYPES), [rng.choice(["Peanuts", "Shellfish", "None"])], "",
+                              ["None"], [rng.choice(plans.SUPPLEMENTS)])
+
+
+def workout_plan_text(rng):
+    focus = ["Upper Body", "Lower Body", "Full Body", "Core", "Cardio", "Rest", "Mobility"]
+    lines = ["# Weekly Workout Plan"]
+    for day in range(1, 8):
+        lines += [f"Day {day}: {rng.choice(focus)}", "- Warm-up: 5 min brisk walk and dynamic stretches"]
+        for n in range(1, 6):
+            lines.append(f"- Exercise {n}: {rng.choice(['Squat', 'Push-up', 'Row', 'Lunge', 'Plank', 'Deadlift', 'Burpee'])}"
+                         f" — {rng.randint(3, 5)} x {rng.choice([8, 10, 12, 15])}")
+        lines.append("- Cooldown: 5 min stretching")
+    return "\n".join(lines)
+
+
+def plan_pool(rng, conn):
+    # [(blob_id, profile_hash, answers)] for diet plans and [blob_id] for workout plans.
+    diet, workout = [], []
+    while len(diet) < PLAN_POOL:
+        profile = sample_profile(rng, 0)
+        answers = sample_answers(rng)
+        try:
+            plan, stored, days = plans.instant_diet_plan(profile, answers, plans.diet_targets(profile))
+        except ValueError:
+            continue
+        blob_id = storage.store_plan_blob(stored, conn)
+        storage.save_plan_structure(blob_id, plan, days)
+        diet.append((blob_id, plans.diet_profile_hash(profile, answers), answers))
+    for _ in range(PLAN_POOL):
+        workout.append(storage.store_plan_blob(workout_plan_text(rng), conn))
+    conn.commit()
+    return diet, workout
+
+
+def populate(path, users=1000, profiles_per_user=5, diet_plans_per_user=3, workout_plans_per_user=2, feedback_per_user=1, seed=7):
+    # Fills a new database at path; returns the row counts written.
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    storage.configure(path)
+    conn = storage.connection()
+    diet_pool, workout_pool = plan_pool(rng, conn)
+    password = auth.hash_password(BENCH_PASSWORD)
+    now = datetime.datetime.now()
+
+    def when(max_days=HISTORY_DAYS):
+        return now - datetime.timedelta(days=rng.uniform(0, max_days))
+
+    conn.executemany('INSERT INTO users (id, email, username, password) VALUES (?, ?, ?, ?)',
+                     [(u, f"user{u}@bench.test", f"user{u}", password) for u in range(1, users + 1)])
+    profile_rows, diet_rows, workout_rows, feedback_rows = [], [], [], []
+    for u in range(1, users + 1):
+        history = sorted(when() for _ in range(profiles_per_user))
+        profile_rows += [sample_profile(rng, u, created_at) for created_at in history]
+        for _ in range(diet_plans_per_user):
+            blob_id, profile_hash, answers = rng.choice(diet_pool)
+            diet_rows.append((u, profile_hash, blob_id, answers["diet_type"], ",".join(answers["allergens"]), "",
+                              ",".join(answers["health_conditions"]), ",".join(answers["supplements"]), when()))
+        workout_rows += [(u, rng.choice(workout_pool), when(WORKOUT_HISTORY_DAYS)) for _ in range(workout_plans_per_user)]
+        feedback_rows += [(u, rng.choice(diet_pool)[0], rng.randint(1, 5), rng.choice(FEEDBACK_NOTES),
+                           rng.choice(["Fully", "Partially", "Not at all"]), str(when())) for _ in range(feedback_per_user)]
+    conn.executemany('INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', profile_rows)
+    conn.executemany('INSERT INTO diet_plans (user_id, profile_hash, blob_id, diet_type, allergens, other_allergy, health_conditions, '
+                     'supplements, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', diet_rows)
+    conn.executemany('INSERT INTO workout_plans (user_id, blob_id, created_at) VALUES (?, ?, ?)', workout_rows)
+    conn.executemany('INSERT INTO diet_feedback (user_id, blob_id, rating, feedback, compliance, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                     feedback_rows)
+    conn.commit()
+    profile_history.backfill(conn)
+    return {"users": users, "profiles": len(profile_rows), "diet_plans": len(diet_rows),
+            "workout_plans": len(workout_rows), "diet_feedback": len(feedback_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic users, profiles and plans.")
+    parser.add_argument("db")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--profiles", type=int, default=5, help="profile rows per user")
+    parser.add_argument("--diet-plans", type=int, default=3, help="diet plans per user")
+    parser.add_argument("--workout-plans", type=int, default=2, help="workout plans per user")
+    parser.add_argument("--feedback", type=int, default=1, help="feedback rows per user")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = populate(args.db, args.users, args.profiles, args.diet_plans, args.workout_plans, args.feedback, args.seed)
+    print(", ".join(f"{n} {table}" for table, n in counts.items()), f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
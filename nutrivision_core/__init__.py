@@ -0,0 +1,21 @@
+# nutrivision_core
+# Everything the Streamlit entry points and the HTTP API share:
+#   settings - configuration from secrets.toml or NUTRIVISION_* variables
+#   storage  - schema, migrations, plan blob store, plan rows and page queries
+#   postgres - PostgreSQL backend for storage (shared database for several nodes)
+#   llm      - OpenAI access (async) and plan generation
+#   gateway  - the event loop the Streamlit pages submit model calls to
+#   tracing  - sampled latency spans around page, DB, model and image stages
+#   metrics  - Prometheus-style counters and histograms, served at /metrics
+#   ledger   - per-user, per-feature model token and cost ledger, daily budgets
+#   profiling - on-demand profiles of slow or sampled page runs
+#   write_behind - batched background inserts for profiles and feedback
+#   profiles - fitness profile options, validation and rows
+#   profile_history - bucketed BMI and weight series, retention and compaction
+#   plans    - diet and workout prompts, cached plans and offline plans
+#   images   - photo validation, freshness checks and dish identification
+#   auth     - accounts, logins, sessions and password resets
+#   export   - streaming CSV/JSONL/Parquet export of profiles, plans and feedback
+#   charts   - dashboard charts (plotly or matplotlib)
+#   pages    - the Streamlit pages and main()
+#   api      - the headless HTTP API (python -m nutrivision_core.api)
@@ -0,0 +1,403 @@
+# api.py
+# Headless HTTP API over the same core as the Streamlit pages: accounts,
+# profiles, diet and workout plans (optionally streamed as they are generated),
+# plan history and the two photo checks. Model calls are async and share one
+# connection pool per worker; SQLite, bcrypt and PIL work runs on the thread
+# pool. Workers keep no per-user state - sessions are read from the database on
+# every request - so the service scales by adding processes, and by adding
+# machines when --db (or database_url) is a shared PostgreSQL database:
+#
+#   python -m nutrivision_core.api --port 8000 --workers 4 --db nutrivision_users.db
+#   python -m nutrivision_core.api --port 8000 --workers 4 --db postgresql://app@db-host/nutrivision
+#
+# Clients send the token from POST /login as "Authorization: Bearer <token>".
+#
+# Behind a reverse proxy or load balancer, list its addresses in
+# --forwarded-allow-ips (setting forwarded_allow_ips, default 127.0.0.1):
+# uvicorn then takes the client address from X-Forwarded-For. A forwarded
+# request from any other address is throttled per account only, as its address
+# is the proxy's, shared by every user behind it.
+import io
+import time
+import argparse
+import functools
+
+from openai import APIError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.middleware import Middleware
+from starlette.routing import Route
+
+from . import auth, images, ledger, llm, metrics, plans, profiles, settings, storage
+from .session_store import SessionStore, load_secret
+
+storage.configure(settings.get("database_url", settings.get("db_path", storage.DEFAULT_DB_PATH)))
+
+
+@functools.lru_cache(maxsize=None)
+def session_store(path):
+    # Uncached: a logout handled by one worker must end the session in all of them.
+    # Statements run on the calling threadpool thread's own connection.
+    return SessionStore(storage.connection, load_secret(storage.connection(), settings.get("session_secret", None)), cache=False)
+
+
+def sessions():
+    return session_store(storage.db_path())
+
+
+def error(message, status_code=400):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON.")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Request body must be a JSON object.")
+    return body
+
+
+def bearer_token(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else ""
+
+
+async def current_user(request):
+    user_id = await run_in_threadpool(sessions().resume, bearer_token(request))
+    if user_id is None:
+        raise HTTPException(401, "Not logged in or the session has expired.")
+    # Model calls made for this request are charged to the user in the ledger.
+    ledger.set_user(user_id)
+    return user_id
+
+
+async def current_profile(user_id):
+    profile = await run_in_threadpool(profiles.latest_profile, user_id)
+    if not profile:
+        raise HTTPException(409, "No profile data found. Please fill out your profile first.")
+    if not plans.has_valid_bmi(profile):
+        raise HTTPException(409, plans.LOW_BMI_MESSAGE)
+    return profile
+
+
+# --- ACCOUNTS ---
+async def signup(request):
+    body = await json_body(request)
+    message = await run_in_threadpool(auth.register, body.get("email", ""), body.get("username", ""), body.get("password", ""))
+    if message:
+        return error(message, 503 if message == auth.BUSY_MESSAGE else 400)
+    return JSONResponse({"created": True}, status_code=201)
+
+
+def client_address(request):
+    # The address the per-client login limit is keyed on, or None when it cannot
+    # be trusted. uvicorn replaces the peer with an X-Forwarded-For entry only
+    # for trusted proxies; otherwise the peer is an unlisted proxy (or a client
+    # sending its own header).
+    if request.client is None:
+        return None
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded is not None and request.client.host not in [a.strip() for a in forwarded.split(",")]:
+        return None
+    return request.client.host
+
+
+async def login(request):
+    body = await json_body(request)
+    ip = client_address(request)
+    user, message = await run_in_threadpool(auth.authenticate, body.get("identifier", ""), body.get("password", ""), ip)
+    if user is None:
+        if message == auth.BUSY_MESSAGE:
+            return error(message, 503)
+        return error(message or "Invalid credentials.", 429 if message else 401)
+    token = await run_in_threadpool(sessions().create, user[0])
+    return JSONResponse({"token": token, "user_id": user[0], "expires_in": sessions().ttl})
+
+
+async def logout(request):
+    await run_in_threadpool(sessions().revoke, bearer_token(request))
+    return JSONResponse({"logged_out": True})
+
+
+# --- PROFILE ---
+async def profile(request):
+    user_id = await current_user(request)
+    if request.method == "GET":
+        row = await run_in_threadpool(profiles.latest_profile, user_id)
+        if not row:
+            return error("No profile data available.", 404)
+        return JSONResponse(profiles.profile_dict(row))
+
+    body = await json_body(request)
+    try:
+        height, weight = float(body.get("height") or 0), float(body.get("weight") or 0)
+    except (TypeError, ValueError):
+        return error("Height and Weight must be numbers.")
+    goal, workout_type = body.get("goal", ""), body.get("workout_type", "")
+    # As on the page, the loss rate and gym focus only apply to their goal and workout type.
+    fields = (str(body.get("name", "")), body.get("gender", ""), body.get("body_type", ""), body.get("activity_level", ""),
+              height, weight, goal, body.get("weight_loss_rate", "") if goal == "Lose Fat" else "",
+              workout_type, body.get("gym_focus", "") if workout_type == "Gym" else "")
+    message = profiles.validate_profile(*fields)
+    if message:
+        return error(message)
+    saved = await run_in_threadpool(profiles.save_profile, user_id, *fields)
+    return JSONResponse(profiles.profile_dict(await run_in_threadpool(profiles.latest_profile, user_id)),
+                        status_code=201 if saved else 200)
+
+
+# --- PLANS ---
+# mode "cached" returns the stored plan for the same answers when there is one
+# and generates otherwise, like the Diet Plan page; "generate" always calls the
+# model and "instant" builds the offline plan (diet plans only). ?stream=1
+# streams markdown plans.
+DIET_MODES = ("cached", "instant", "generate")
+WORKOUT_MODES = ("cached", "generate")
+
+
+def plan_mode(body, modes):
+    # An unknown mode is rejected, not taken as "generate", which costs a model call.
+    mode = body.get("mode", "cached")
+    if mode not in modes:
+        raise HTTPException(400, f"mode must be one of {', '.join(modes)}.")
+    return mode
+
+
+def wants_stream(request):
+    return request.query_params.get("stream") in ("1", "true")
+
+
+def plan_response(plan, source, problems=()):
+    return JSONResponse({"plan": plan, "source": source, "problems": list(problems)})
+
+
+async def stream_plan(messages, site, max_tokens, save):
+    # Sends the plan as it is generated and stores it once complete. The first
+    # chunk is awaited here, so a failed model call still gets an error status.
+    deltas = llm.stream_chat(messages, site, temperature=0.5, max_tokens=max_tokens)
+    first = await anext(deltas, "")
+
+    async def body():
+        parts = [first]
+        yield first
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+        await run_in_threadpool(save, "".join(parts))
+    return StreamingResponse(body(), media_type="text/markdown; charset=utf-8")
+
+
+async def generate_diet_plan(request):
+    user_id = await current_user(request)
+    body = await json_body(request)
+    mode = plan_mode(body, DIET_MODES)
+    answers = plans.diet_answers(body.get("diet_type", ""), body.get("allergens", []), body.get("other_allergy", ""),
+                                 body.get("health_conditions", []), body.get("supplements", []))
+    if not plans.diet_answers_complete(answers):
+        return error("Please answer all the questions to generate your personalized diet plan.")
+    profile = await current_profile(user_id)
+    profile_hash = plans.diet_profile_hash(profile, answers)
+
+    if mode == "cached":
+        existing_plan = await run_in_threadpool(plans.cached_diet_plan, user_id, profile_hash)
+        if existing_plan:
+            return plan_response(existing_plan, "cached")
+
+    targets = plans.diet_targets(profile)
+    if mode == "instant":
+        try:
+            plan, stored, days = plans.instant_diet_plan(profile, answers, targets)
+        except ValueError as e:
+            return error(str(e), 422)
+        problems = await run_in_threadpool(plans.save_diet_plan, user_id, profile_hash, answers, plan, stored, days)
+        return plan_response(plan, "instant", problems)
+
+    json_mode = llm.plan_output_mode() == "json"
+    feedback_note = await run_in_threadpool(plans.latest_feedback_note, user_id)
+    prompt = plans.diet_prompt(profile, answers, targets, feedback_note, json_mode)
+    if json_mode:
+        data = await llm.generate_structured_plan_async("diet", plans.DIET_SYSTEM_PROMPT, prompt, max_tokens=plans.DIET_MAX_TOKENS[1])
+        if data is None:
+            return error("Could not generate a valid diet plan. Please try again.", 502)
+        plan, stored, days = plans.structured_diet_plan(data, targets)
+    else:
+        messages = llm.plan_messages(plans.DIET_SYSTEM_PROMPT, prompt)
+        if wants_stream(request):
+            return await stream_plan(messages, "diet_plan", plans.DIET_MAX_TOKENS[0],
+                               lambda plan: plans.save_diet_plan(user_id, profile_hash, answers, plan, plan, None))
+        plan = stored = await llm.chat_async(messages, "diet_plan", temperature=0.5, max_tokens=plans.DIET_MAX_TOKENS[0])
+        days = None
+    problems = await run_in_threadpool(plans.save_diet_plan, user_id, profile_hash, answers, plan, stored, days)
+    return plan_response(plan, "model", problems)
+
+
+async def generate_workout_plan(request):
+    user_id = await current_user(request)
+    body = await json_body(request)
+    mode = plan_mode(body, WORKOUT_MODES)
+    prefs = plans.workout_preferences(body.get("time_pref", ""), body.get("duration_pref", ""),
+                                      body.get("injuries", []), body.get("equipment", []))
+    if not plans.workout_preferences_complete(prefs):
+        return error("Please complete all workout preferences to proceed.")
+
+    if mode == "cached":
+        existing_plan = await run_in_threadpool(plans.recent_workout_plan, user_id)
+        if existing_plan:
+            return plan_response(existing_plan, "cached")
+
+    profile = await current_profile(user_id)
+    json_mode = llm.plan_output_mode() == "json"
+    prompt = plans.workout_prompt(profile, prefs, json_mode)
+    if json_mode:
+        data = await llm.generate_structured_plan_async("workout", plans.WORKOUT_SYSTEM_PROMPT, prompt, max_tokens=plans.WORKOUT_MAX_TOKENS[1])
+        if data is None:
+            return error("Could not generate a valid workout plan. Please try again.", 502)
+        plan, stored = plans.structured_workout_plan(data)
+    else:
+        messages = llm.plan_messages(plans.WORKOUT_SYSTEM_PROMPT, prompt)
+        if wants_stream(request):
+            return await stream_plan(messages, "workout_plan", plans.WORKOUT_MAX_TOKENS[0], lambda plan: plans.save_workout_plan(user_id, plan))
+        plan = stored = await llm.chat_async(messages, "workout_plan", temperature=0.5, max_tokens=plans.WORKOUT_MAX_TOKENS[0])
+    await run_in_threadpool(plans.save_workout_plan, user_id, stored)
+    return plan_response(plan, "model")
+
+
+def history(table):
+    async def endpoint(request):
+        user_id = await current_user(request)
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            return error("limit must be an integer.")
+        rows = await run_in_threadpool(plans.plan_history, table, user_id, max(1, min(limit, 100)))
+        return JSONResponse({"plans": [{"created_at": date, "plan": plan} for date, plan in rows]})
+    return endpoint
+
+
+async def diet_plans(request):
+    if request.method == "GET":
+        return await history("diet_plans")(request)
+    return await generate_diet_plan(request)
+
+
+async def workout_plans(request):
+    if request.method == "GET":
+        return await history("workout_plans")(request)
+    return await generate_workout_plan(request)
+
+
+# --- IMAGES ---
+async def uploaded_image(request):
+    # (image, raw bytes) from the multipart field "image".
+    form = await request.form()
+    upload = form.get("image")
+    if upload is None or isinstance(upload, str):
+        raise HTTPException(400, "Upload the photo as the multipart field 'image'.")
+    raw = await upload.read()
+    image, message = await run_in_threadpool(images.open_image, io.BytesIO(raw))
+    if message:
+        raise HTTPException(400, message)
+    return image, raw
+
+
+async def freshness(request):
+    await current_user(request)
+    image, _ = await uploaded_image(request)
+    return JSONResponse({"assessment": await images.assess_freshness_async(image)})
+
+
+async def dish(request):
+    await current_user(request)
+    image, raw = await uploaded_image(request)
+    name = await images.identify_dish_name_async(image, raw)
+    entry, source = await images.dish_nutrition_async(name)
+    return JSONResponse({"dish": name, "nutrition": entry, "source": source})
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics_endpoint(request):
+    # Each worker process reports its own counters; scrape every worker.
+    text = await run_in_threadpool(metrics.exposition)
+    return PlainTextResponse(text, media_type=metrics.CONTENT_TYPE)
+
+
+class RequestMetrics:
+    # ASGI middleware: request latency by route, method and status. Streamed
+    # responses are timed to their last byte.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope["path"] if scope["path"] in ROUTE_PATHS else "other"
+            metrics.HTTP_REQUESTS.observe(time.perf_counter() - started, route=route, method=scope["method"], status=status[0])
+
+
+async def http_error(request, exc):
+    return error(exc.detail, exc.status_code)
+
+
+async def model_error(request, exc):
+    print("Model call failed:", exc)
+    return error("The model provider could not be reached. Please try again.", 502)
+
+
+async def budget_error(request, exc):
+    return error(str(exc), 429)
+
+
+routes = [
+        Route("/health", health),
+        Route("/metrics", metrics_endpoint),
+        Route("/signup", signup, methods=["POST"]),
+        Route("/login", login, methods=["POST"]),
+        Route("/logout", logout, methods=["POST"]),
+        Route("/profile", profile, methods=["GET", "PUT"]),
+        Route("/plans/diet", diet_plans, methods=["GET", "POST"]),
+        Route("/plans/workout", workout_plans, methods=["GET", "POST"]),
+        Route("/images/freshness", freshness, methods=["POST"]),
+        Route("/images/dish", dish, methods=["POST"]),
+]
+ROUTE_PATHS = {route.path for route in routes}
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(RequestMetrics)],
+    exception_handlers={HTTPException: http_error, APIError: model_error, ledger.BudgetExceeded: budget_error},
+)
+
+
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the Nutrivision HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--db", help="SQLite database file or PostgreSQL URL (default: the database_url or db_path setting)")
+    parser.add_argument("--forwarded-allow-ips", default=settings.get("forwarded_allow_ips", "127.0.0.1"),
+                        help="comma-separated proxy addresses whose X-Forwarded-For is trusted, or *")
+    args = parser.parse_args()
+    if args.db:
+        # Worker processes import the app afresh and read the database from here.
+        os.environ["NUTRIVISION_DATABASE_URL"] = args.db
+    uvicorn.run("nutrivision_core.api:app", host=args.host, port=args.port, workers=args.workers,
+                proxy_headers=True, forwarded_allow_ips=args.forwarded_allow_ips)
@@ -0,0 +1,191 @@
+# auth.py
+# Accounts, logins, sessions and password resets. bcrypt runs on the auth
+# worker pool; the throttle and the session store keep state in memory, so each
+# is created once per process and database. Their SQL runs on the calling
+# thread's connection, as every session thread shares them.
+import re
+import sqlite3
+
+import streamlit as st
+
+from . import auth_pool, metrics, reset_tokens, settings, storage
+from .login_throttle import LoginThrottle, throttle_keys
+from .session_store import SessionStore, load_secret
+
+
+@st.cache_resource
+def get_login_throttle(path):
+    return LoginThrottle(storage.connection)
+
+
+@st.cache_resource
+def get_session_store(path):
+    return SessionStore(storage.connection, load_secret(storage.connection(), settings.get("session_secret", None)))
+
+
+def login_throttle():
+    return get_login_throttle(storage.db_path())
+
+
+def sessions():
+    return get_session_store(storage.db_path())
+
+
+# --- HASHING UTILS ---
+# Raising the cost only affects new hashes; existing ones are upgraded the next
+# time their owner logs in.
+def bcrypt_rounds():
+    return int(settings.get("bcrypt_rounds", auth_pool.DEFAULT_ROUNDS))
+
+
+def hash_password(password):
+    with metrics.BCRYPT.time(op="hash"):
+        return auth_pool.hash_password(password, bcrypt_rounds())
+
+
+def check_password(password, hashed):
+    with metrics.BCRYPT.time(op="check"):
+        return auth_pool.check_password(password, hashed)
+
+
+# --- AUTH ---
+# register() and authenticate() return messages instead of drawing them, so the
+# HTTP API shares them; signup() and login() show the messages in Streamlit.
+BUSY_MESSAGE = "The server is busy. Please try again in a moment."
+
+
+def password_problem(password):
+    if len(password) < 8:
+        return "Password must be at least 8 characters long."
+    if not re.search(r"[A-Z]", password):
+        return "Password must contain at least one uppercase letter."
+    if not re.search(r"[a-z]", password):
+        return "Password must contain at least one lowercase letter."
+    if not re.search(r"\d", password):
+        return "Password must contain at least one digit."
+    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+        return "Password must contain at least one special character."
+    return None
+
+
+def register(email, username, password):
+    # None when the account was created, else the message to show.
+    if not email or not username or not password:
+        return "Email, username, and password cannot be empty."
+    if len(username) > 30:
+        return "Username too long (max 30 characters)."
+    if not re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", email):
+        return "Please enter a valid email address."
+    problem = password_problem(password)
+    if problem:
+        return problem
+
+    try:
+        hashed_pw = hash_password(password)
+    except auth_pool.AuthPoolBusy:
+        return BUSY_MESSAGE
+
+    conn = storage.connection()
+    try:
+        conn.execute('INSERT INTO users (email, username, password) VALUES (?, ?, ?)', (email, username, hashed_pw))
+        conn.commit()
+        return None
+    except sqlite3.IntegrityError as e:
+        # The failed INSERT leaves its transaction open, holding the write lock.
+        conn.rollback()
+        if "email" in str(e):
+            return "Email already exists. Please use a different one."
+        elif "username" in str(e):
+            return "Username already exists. Please choose another."
+        return "An account already exists with the provided details."
+
+
+def signup(email, username, password):
+    try:
+        message = register(email, username, password)
+    except Exception as e:
+        st.error("An unexpected error occurred during signup.")
+        print(e)
+        return False
+    if message:
+        st.warning(message)
+        return False
+    return True
+
+
+def client_ip():
+    return getattr(st.context, "ip_address", None) or "unknown"
+
+
+def authenticate(identifier, password, ip):
+    # (user row, None) on success, (None, message or None) otherwise.
+    keys = throttle_keys(identifier, ip)
+    throttle = login_throttle()
+    wait = throttle.retry_after(keys)
+    if wait:
+        return None, f"Too many failed login attempts. Please try again in {int(wait) + 1} seconds."
+    conn = storage.connection()
+    try:
+        user = conn.execute('SELECT * FROM users WHERE username=? OR email=?', (identifier, identifier)).fetchone()
+        if user and check_password(password, user[3]):
+            throttle.record_success(keys)
+            if auth_pool.needs_rehash(user[3], bcrypt_rounds()):
+                conn.execute('UPDATE users SET password=? WHERE id=?', (hash_password(password), user[0]))
+                conn.commit()
+            return user, None
+        throttle.record_failure(keys)
+        return None, None
+    except auth_pool.AuthPoolBusy:
+        return None, BUSY_MESSAGE
+
+
+def login(identifier, password):
+    try:
+        user, message = authenticate(identifier, password, client_ip())
+    except Exception as e:
+        st.error("Login failed due to an unexpected error.")
+        print(e)
+        return None
+    if message:
+        st.warning(message)
+    return user
+
+
+# --- FORGOT PASSWORD ---
+def initiate_password_reset(email):
+    conn = storage.connection()
+    user = conn.execute('SELECT id FROM users WHERE email=?', (email,)).fetchone()
+    if not user:
+        st.warning("No user found with that email.")
+        return
+    token = reset_tokens.issue_token(conn, user[0])
+    minutes = reset_tokens.RESET_TOKEN_TTL // 60
+    st.success(f"Reset token generated. Use this token within {minutes} minutes to reset your password: {token}")
+
+
+def reset_password_with_token(email, token, new_password):
+    conn = storage.connection()
+    user_id = reset_tokens.lookup_token(conn, token)
+    row = conn.execute('SELECT email FROM users WHERE id=?', (user_id,)).fetchone()
+    if not row or row[0] != email:
+        st.error("Invalid or expired token, or wrong email.")
+        return False
+    try:
+        hashed_pw = hash_password(new_password)
+    except auth_pool.AuthPoolBusy:
+        st.warning(BUSY_MESSAGE)
+        return False
+    # The claim and the password change commit together; a failed claim has
+    # still opened a write transaction, which must not be left holding the lock.
+    try:
+        if not reset_tokens.consume_token(conn, token):
+            conn.rollback()
+            st.error("Invalid or expired token, or wrong email.")
+            return False
+        conn.execute('UPDATE users SET password=?, reset_token=NULL WHERE id=?', (hashed_pw, user_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    st.success("Password successfully reset.")
+    return True
@@ -0,0 +1,128 @@
+# auth_pool.py
+# bcrypt hashing and verification on a process pool, so password work runs on
+# every core instead of on the Streamlit script thread. The number of pending
+# jobs is bounded: once the pool is saturated new work waits briefly and then
+# fails fast with AuthPoolBusy rather than queueing without limit.
+#
+# Benchmark: python -m nutrivision_core.auth_pool --bench
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+DEFAULT_ROUNDS = 12
+AUTH_WORKERS = int(os.environ.get("NUTRIVISION_AUTH_WORKERS", os.cpu_count() or 1))
+AUTH_QUEUE_SIZE = int(os.environ.get("NUTRIVISION_AUTH_QUEUE", AUTH_WORKERS * 4))
+AUTH_QUEUE_TIMEOUT = 5.0
+
+
+class AuthPoolBusy(Exception):
+    pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(AUTH_QUEUE_SIZE)
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def _new_pool():
+    # Not fork: the Streamlit server process is multi-threaded. Workers come
+    # from a forkserver that preloads this module. Like any multiprocessing
+    # child they import the app's __main__ as __mp_main__; the entry scripts
+    # only start the app under if __name__ == '__main__', so that import does
+    # not run it. Where there is no forkserver (Windows) a thread pool is used;
+    # bcrypt releases the GIL, so it still runs on several cores.
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload([__name__])
+    return ProcessPoolExecutor(max_workers=AUTH_WORKERS, mp_context=mp_context)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool()
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=AUTH_QUEUE_TIMEOUT):
+        raise AuthPoolBusy("Too many authentication requests in progress.")
+    try:
+        return get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password, rounds=DEFAULT_ROUNDS):
+    return _run(_hash, password.encode('utf-8'), rounds).decode('utf-8')
+
+
+def check_password(password, hashed):
+    return _run(_check, password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_rounds(hashed):
+    # "$2b$12$..." -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed, rounds=DEFAULT_ROUNDS):
+    return hash_rounds(hashed) != rounds
+
+
+# --- BENCHMARK ---
+def benchmark(rounds=DEFAULT_ROUNDS, logins=None):
+    global AUTH_WORKERS, _slots
+    hashed = bcrypt.hashpw(b"Passw0rd!", bcrypt.gensalt(rounds)).decode('utf-8')
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    print(f"bcrypt cost {rounds}, {cores} cores")
+    for workers in counts:
+        shutdown()
+        AUTH_WORKERS = workers
+        _slots = threading.BoundedSemaphore(workers * 4)
+        n = logins or workers * 8
+        get_pool().submit(_check, b"warm", hashed.encode('utf-8')).result()
+
+        threads = [threading.Thread(target=check_password, args=("Passw0rd!", hashed)) for _ in range(n)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        print(f"workers {workers:>3}: {n / elapsed:8.1f} logins/s")
+    shutdown()
+
+
+if __name__ == "__main__":
+    # Jobs must pickle as nutrivision_core.auth_pool functions, not __main__ ones.
+    from nutrivision_core import auth_pool
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        auth_pool.benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ROUNDS)
@@ -0,0 +1,47 @@
+# charts.py
+# Dashboard charts in either backend. The plotting libraries are imported when
+# a chart is drawn, so pages without charts never load pandas, matplotlib or
+# plotly.
+import streamlit as st
+
+CHART_BACKENDS = ("plotly", "matplotlib")
+
+
+def bmi_trend(dates, bmis, backend="plotly"):
+    import pandas as pd
+    df = pd.DataFrame({"Date": pd.to_datetime(dates), "BMI": bmis})
+    if backend == "matplotlib":
+        import matplotlib.pyplot as plt
+        import matplotlib.dates as mdates
+        fig, ax = plt.subplots()
+        ax.plot(df["Date"], df["BMI"], marker='o', linestyle='-', color='limegreen')
+        ax.set_title("BMI Over Time", fontsize=14)
+        ax.set_xlabel("Date", fontsize=12)
+        ax.set_ylabel("BMI", fontsize=12)
+        ax.grid(True, linestyle='--', alpha=0.6)
+        for i, txt in enumerate(df["BMI"]):
+            ax.annotate(f"{txt}", (df["Date"][i], df["BMI"][i]), textcoords="offset points", xytext=(0, 5), ha='center', fontsize=8)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
+        st.pyplot(fig)
+    else:
+        import plotly.express as px
+        fig = px.line(df, x='Date', y='BMI', markers=True, title='BMI Trend Over Time', template='plotly_dark')
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def activity_levels(levels, counts, backend="plotly"):
+    if backend == "matplotlib":
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+        bars = ax.bar(levels, counts, color=['#76b5c5', '#58a4b0', '#3b6978'])
+        ax.set_ylabel("Count", fontsize=12)
+        ax.set_title("Activity Frequency by Level", fontsize=14)
+        for bar in bars:
+            yval = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width() / 2.0, yval + 0.1, int(yval), ha='center', va='bottom', fontsize=10)
+        ax.spines[['top', 'right']].set_visible(False)
+        st.pyplot(fig)
+    else:
+        import plotly.express as px
+        fig = px.bar(x=levels, y=counts, title="Activity Frequency by Level", labels={'x': 'Activity Level', 'y': 'Count'}, template='plotly_dark')
+        st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,243 @@
+# export.py
+# Streaming export of the users' history: profiles, the profile_series buckets,
+# diet and workout plans and diet feedback, as CSV, JSONL or Parquet. Rows come
+# off a cursor CHUNK_ROWS at a time (a server-side cursor on PostgreSQL) and
+# each chunk is written before the next is read, so memory stays flat however
+# many rows a user, or the whole database, has. Plan bodies are decompressed
+# from plan_blobs through a small LRU cache, as most rows share a few plans.
+#
+# The Export My Data page zips one file per table for the signed-in user. The
+# command line exports every user: the user id range is split across --workers
+# processes, each writing its own file per table (table-SHARD.csv, ...).
+# Parquet needs pyarrow, which comes with streamlit.
+#
+#   python -m nutrivision_core.export DB OUT_DIR [--format csv] [--workers 4] [--user ID]
+import io
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import zipfile
+import argparse
+import functools
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from . import storage, write_behind
+from .plan_schema import render_stored_plan
+
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_ROWS = 1000
+PLAN_CACHE = 256
+
+# table -> ([(column, type)], ORDER BY); a "plan" column is read as (plan, blob_id).
+TABLES = {
+    "profiles": ([("user_id", int), ("created_at", str), ("name", str), ("gender", str), ("body_type", str),
+                  ("activity_level", str), ("height", float), ("weight", float), ("bmi", float), ("goal", str),
+                  ("weight_loss_rate", str), ("workout_type", str), ("gym_focus", str)], "user_id, rowid"),
+    "profile_series": ([("user_id", int), ("period", str), ("period_start", str), ("activity_level", str),
+                        ("samples", int), ("bmi_sum", float), ("bmi_count", int), ("weight_sum", float),
+                        ("weight_count", int)], "user_id, period_start, activity_level"),
+    "diet_plans": ([("user_id", int), ("created_at", str), ("diet_type", str), ("allergens", str), ("other_allergy", str),
+                    ("health_conditions", str), ("supplements", str), ("plan", str)], "user_id, rowid"),
+    "workout_plans": ([("user_id", int), ("created_at", str), ("workout_time_pref", str), ("duration_pref", str),
+                       ("injuries", str), ("equipment", str), ("plan", str)], "user_id, rowid"),
+    "diet_feedback": ([("user_id", int), ("created_at", str), ("rating", int), ("feedback", str), ("compliance", str),
+                       ("plan", str)], "user_id, rowid"),
+}
+
+
+# --- WRITERS ---
+# Each writes to an open binary file: write(rows) per chunk, then close().
+class CsvWriter:
+    suffix = ".csv"
+
+    def __init__(self, f, columns):
+        self.f = io.TextIOWrapper(f, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.flush()
+        self.f.detach()
+
+
+class JsonLinesWriter:
+    suffix = ".jsonl"
+
+    def __init__(self, f, columns):
+        self.f = f
+        self.names = [name for name, _ in columns]
+
+    def write(self, rows):
+        names = self.names
+        self.f.write("".join(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in rows).encode("utf-8"))
+
+    def close(self):
+        self.f.flush()
+
+
+class ParquetWriter:
+    # One row group per chunk.
+    suffix = ".parquet"
+
+    def __init__(self, f, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.writer = pq.ParquetWriter(f, self.schema)
+
+    def write(self, rows):
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter, "parquet": ParquetWriter}
+
+
+# --- READING ---
+def chunks(conn, sql, params=(), size=CHUNK_ROWS):
+    # Lists of up to size rows, read off the cursor as they are written out.
+    if not isinstance(conn, sqlite3.Connection):
+        yield from conn.stream(sql, params, size)
+        return
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def plan_loader(conn):
+    @functools.lru_cache(maxsize=PLAN_CACHE)
+    def blob(blob_id):
+        row = conn.execute('SELECT body, codec FROM plan_blobs WHERE id=?', (blob_id,)).fetchone()
+        return render_stored_plan(storage.decompress_plan(row[0], row[1])) if row else None
+
+    # Rows written before the blob store keep their text inline.
+    return lambda plan, blob_id: plan if plan is not None else (blob(blob_id) if blob_id is not None else None)
+
+
+def export_table(conn, table, writer, first_user, last_user, size=CHUNK_ROWS):
+    # Writes the rows of users first_user..last_user; returns the row count.
+    columns, order = TABLES[table]
+    names = [name for name, _ in columns]
+    with_plan = names[-1] == "plan"
+    read = names[:-1] + ["plan", "blob_id"] if with_plan else names
+    plan_text = plan_loader(conn) if with_plan else None
+    sql = f'SELECT {", ".join(read)} FROM {table} WHERE user_id BETWEEN ? AND ? ORDER BY {order}'
+    count = 0
+    for rows in chunks(conn, sql, (first_user, last_user), size):
+        if with_plan:
+            rows = [row[:-2] + (plan_text(row[-2], row[-1]),) for row in rows]
+        writer.write(rows)
+        count += len(rows)
+    return count
+
+
+# --- PAGE DOWNLOAD ---
+def user_archive(user_id, fmt="csv"):
+    # A zip of one file per table for one user, in an anonymous temporary file
+    # that is removed when it is closed.
+    write_behind.settle(user_id)
+    conn = storage.connection()
+    archive = tempfile.TemporaryFile()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for table, (columns, _) in TABLES.items():
+            with zf.open(f"{table}{WRITERS[fmt].suffix}", "w", force_zip64=True) as entry:
+                writer = WRITERS[fmt](entry, columns)
+                export_table(conn, table, writer, user_id, user_id)
+                writer.close()
+    archive.seek(0)
+    return archive
+
+
+# --- ALL USERS ---
+def export_shard(db, directory, fmt, shard, first_user, last_user):
+    # One worker's share: {table: rows written}. A new connection: a forked
+    # worker must not share the parent's.
+    storage.configure(db)
+    conn = storage.connect()
+    counts = {}
+    try:
+        for table, (columns, _) in TABLES.items():
+            with open(os.path.join(directory, f"{table}-{shard:03d}{WRITERS[fmt].suffix}"), "wb") as f:
+                writer = WRITERS[fmt](f, columns)
+                counts[table] = export_table(conn, table, writer, first_user, last_user)
+                writer.close()
+    finally:
+        conn.close()
+    return counts
+
+
+def export_all(db, directory, fmt="csv", workers=4):
+    # Splits the user id range into one shard per worker; returns {table: rows written}.
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}, not {fmt!r}")
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, not {workers}")
+    os.makedirs(directory, exist_ok=True)
+    storage.configure(db)
+    low, high = storage.connection().execute('SELECT MIN(id), MAX(id) FROM users').fetchone()
+    if low is None:
+        return {table: 0 for table in TABLES}
+    step = (high - low) // workers + 1
+    shards = [(shard, low + shard * step, min(high, low + (shard + 1) * step - 1)) for shard in range(workers)]
+    totals = dict.fromkeys(TABLES, 0)
+    if workers == 1:
+        results = [export_shard(db, directory, fmt, *shards[0])]
+    else:
+        # Not fork: by now this process holds a database connection and may
+        # run the write-behind and ledger threads, which a forked child would
+        # inherit mid-flight. Workers are started fresh and open their own.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method)) as pool:
+            results = list(pool.map(export_shard, *zip(*[(db, directory, fmt, *s) for s in shards])))
+    for counts in results:
+        for table, n in counts.items():
+            totals[table] += n
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export profiles, plans and feedback.")
+    parser.add_argument("db", help="SQLite file or PostgreSQL URL")
+    parser.add_argument("out", help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--workers", type=int, default=4, help="processes, each exporting a range of user ids")
+    parser.add_argument("--user", type=int, help="export only this user, as a zip archive")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    started = time.perf_counter()
+    if args.user is not None:
+        storage.configure(args.db)
+        os.makedirs(args.out, exist_ok=True)
+        path = os.path.join(args.out, f"user-{args.user}-{args.format}.zip")
+        with user_archive(args.user, args.format) as archive, open(path, "wb") as f:
+            f.write(archive.read())
+        print(f"Wrote {path}")
+        sys.exit(0)
+    totals = export_all(args.db, args.out, args.format, args.workers)
+    elapsed = time.perf_counter() - started
+    for table, n in totals.items():
+        print(f"{table:<15} {n:>10} rows")
+    print(f"{sum(totals.values())} rows in {elapsed:.1f} s ({sum(totals.values()) / elapsed:.0f} rows/s) to {args.out}")
@@ -0,0 +1,163 @@
+# food_db.py
+# Local food-composition lookup for the Dish Identifier. The bundled CSV is
+# loaded once per process into an exact-name dict plus a trigram index. A fuzzy
+# lookup walks the query's rarest trigrams first and stops once it has read a
+# fixed number of postings, so its cost does not grow with the table. A fuzzy
+# match must also pair every word of the query with a similar word of the name,
+# and the other way round, so typos and plurals match ("chiken biryani",
+# "bananas") but a different dish sharing most letters does not ("grilled
+# chicken sandwich" is not Grilled Cheese Sandwich, "chicken" is not Chicken Wrap).
+#
+# Benchmark: python -m nutrivision_core.food_db --bench 100000
+import csv
+import os
+import re
+import sys
+import time
+import random
+import functools
+from collections import Counter
+
+FOOD_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "food_composition.csv")
+NUTRIENTS = ["calories", "protein", "carbs", "fat", "sugar"]
+MATCH_CUTOFF = 0.6
+WORD_CUTOFF = 0.5
+MAX_CANDIDATES = 25
+POSTINGS_BUDGET = 5000
+
+
+def normalize_name(name):
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", " ", name.lower())).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    # Jaccard similarity of two trigram sets.
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def same_words(query, name):
+    # True when every word on each side has a similar word on the other.
+    a = [trigrams(word) for word in query.split()]
+    b = [trigrams(word) for word in name.split()]
+    return (all(any(similarity(x, y) >= WORD_CUTOFF for y in b) for x in a)
+            and all(any(similarity(x, y) >= WORD_CUTOFF for x in a) for y in b))
+
+
+class FoodIndex:
+    def __init__(self, entries):
+        # entries: dicts with name, serving and the NUTRIENTS fields
+        self.entries = list(entries)
+        self.keys = [normalize_name(entry["name"]) for entry in self.entries]
+        self.exact = {}
+        self.postings = {}
+        for i, key in enumerate(self.keys):
+            self.exact.setdefault(key, i)
+            for gram in trigrams(key):
+                self.postings.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, name, cutoff=MATCH_CUTOFF):
+        # Returns (entry, score) for the best match, or None. Score 1.0 is an exact name match.
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self.exact:
+            return self.entries[self.exact[key]], 1.0
+
+        query = trigrams(key)
+        overlap = Counter()
+        read = 0
+        for gram in sorted(query, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram, ())
+            if read and read + len(posting) > POSTINGS_BUDGET:
+                break
+            overlap.update(posting)
+            read += len(posting)
+
+        best, best_score = None, 0.0
+        for i, _ in overlap.most_common(MAX_CANDIDATES):
+            score = similarity(query, trigrams(self.keys[i]))
+            if score > best_score and same_words(key, self.keys[i]):
+                best, best_score = i, score
+        if best is None or best_score < cutoff:
+            return None
+        return self.entries[best], round(best_score, 3)
+
+
+def read_food_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for nutrient in NUTRIENTS:
+                row[nutrient] = float(row[nutrient])
+            yield row
+
+
+@functools.lru_cache(maxsize=None)
+def load_food_index(path=FOOD_DB_PATH):
+    return FoodIndex(read_food_csv(path))
+
+
+def nutrition_markdown(dish, entry, source):
+    lines = [f"**Dish:** {dish}", "",
+             f"| Nutrient | Per serving ({entry['serving']}) |",
+             "|---|---|",
+             f"| Calories | {entry['calories']:g} kcal |",
+             f"| Protein | {entry['protein']:g} g |",
+             f"| Carbs | {entry['carbs']:g} g |",
+             f"| Fat | {entry['fat']:g} g |",
+             f"| Sugar | {entry['sugar']:g} g |",
+             "", f"_Source: {source}_"]
+    return "\n".join(lines)
+
+
+# --- BENCHMARK ---
+def synthetic_entries(n, seed=0):
+    rng = random.Random(seed)
+    base = list(read_food_csv(FOOD_DB_PATH))
+    styles = ["Spicy", "Homestyle", "Grilled", "Baked", "Crispy", "Creamy", "Smoked", "Roasted", "Tandoori", "Garlic",
+              "Lemon", "Herb", "Classic", "Street-style", "Mini", "Loaded", "Vegan", "Keto", "Stuffed", "Masala"]
+    for i in range(n):
+        entry = dict(rng.choice(base))
+        entry["name"] = f"{rng.choice(styles)} {rng.choice(styles)} {entry['name']} {i}"
+        yield entry
+
+
+def benchmark(n, queries=2000):
+    start = time.perf_counter()
+    index = FoodIndex(synthetic_entries(n))
+    build = time.perf_counter() - start
+
+    rng = random.Random(1)
+    names = [e["name"] for e in rng.sample(index.entries, min(queries, len(index)))]
+    typo = [name[:len(name) // 2] + name[len(name) // 2 + 1:] for name in names]
+
+    results = {}
+    for label, batch in (("exact", names), ("fuzzy", typo)):
+        timings = []
+        for name in batch:
+            t = time.perf_counter()
+            index.lookup(name)
+            timings.append(time.perf_counter() - t)
+        timings.sort()
+        results[label] = (timings[len(timings) // 2] * 1e3, timings[int(len(timings) * 0.99)] * 1e3)
+
+    print(f"entries: {len(index)}  build: {build:.2f} s")
+    for label, (p50, p99) in results.items():
+        print(f"{label:>6} lookup  p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+    else:
+        index = load_food_index()
+        for query in sys.argv[1:]:
+            print(query, "->", index.lookup(query))
@@ -0,0 +1,66 @@
+# gateway.py
+# A dedicated asyncio event loop for model calls. Streamlit runs each session's
+# script on its own thread, and a blocking OpenAI call used to hold that
+# thread's HTTP connection for the whole generation. The pages now submit
+# coroutines to this loop instead: every call in the process shares the loop's
+# AsyncOpenAI client and its keep-alive connection pool, and the number of
+# generations in flight is bounded by a semaphore rather than by threads.
+import asyncio
+import threading
+import contextvars
+
+DEFAULT_MAX_IN_FLIGHT = 256
+
+
+class ModelGateway:
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.loop = asyncio.new_event_loop()
+        self.limit = asyncio.Semaphore(max_in_flight)
+        self.thread = threading.Thread(target=self._run, name="model-gateway", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _bounded(self, coro, context):
+        # The submitting thread's context variables (e.g. the open trace span)
+        # are applied to this task's own context copy.
+        for var, value in context.items():
+            var.set(value)
+        # Counters are only touched on the gateway loop, so they need no lock.
+        async with self.limit:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                result = await coro
+            except BaseException:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+            self.completed += 1
+            return result
+
+    def submit(self, coro):
+        # Returns a concurrent.futures.Future; safe to call from any thread.
+        return asyncio.run_coroutine_threadsafe(self._bounded(coro, contextvars.copy_context()), self.loop)
+
+    def run(self, coro, timeout=None):
+        # Blocks the calling thread until the coroutine finishes on the gateway loop.
+        return self.submit(coro).result(timeout)
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "peak_in_flight": self.peak_in_flight, "completed": self.completed,
+                "failed": self.failed, "max_in_flight": self.max_in_flight}
+
+    def close(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
@@ -0,0 +1,185 @@
+# images.py
+# Uploaded food photos: validation, the freshness check and dish
+# identification. A photo that was seen before is answered from dish_cache, and
+# nutrition comes from the local food database before any model estimate. The
+# identification call also asks for an estimate, which is cached for dishes the
+# database does not know, so a new photo costs one model call, not two. The
+# *_async variants serve the HTTP API; they share the caches and prompts.
+import json
+import base64
+import asyncio
+import hashlib
+from io import BytesIO
+
+import streamlit as st
+from PIL import Image, UnidentifiedImageError
+
+from . import llm, metrics, storage
+from .food_db import load_food_index, normalize_name, NUTRIENTS
+
+FRESHNESS_SYSTEM_PROMPT = "You are a fruit and vegetable quality inspector. You analyze images of produce to determine their freshness based on color, texture, mold presence, bruises, and overall condition."
+FRESHNESS_QUESTION = "Is this fruit or vegetable fresh? Give reasons."
+DISH_SYSTEM_PROMPT = "You are a professional food analyst. Your job is to identify dishes from images."
+DISH_QUESTION = ("Identify the dish and estimate the nutritional value of one typical serving. Reply as JSON with keys "
+                 "dish (its common name), serving (text, e.g. \"1 plate (300 g)\"), calories (kcal), "
+                 "protein, carbs, fat and sugar (grams), using numbers only.")
+DISH_OPTIONS = {"max_tokens": 150, "response_format": {"type": "json_object"}}
+
+
+# --- IMAGE VALIDATION ---
+def open_image(fp):
+    # (RGB image, None) or (None, message explaining why the upload was rejected).
+    try:
+        image = Image.open(fp)
+        if image.size[0] < 100 or image.size[1] < 100:
+            return None, "Image resolution too low. Please upload a higher quality image."
+        return image.convert("RGB"), None
+    except UnidentifiedImageError:
+        return None, "Invalid image file. Please upload a valid image."
+
+
+def validate_image(uploaded_file):
+    image, error = open_image(uploaded_file)
+    if error:
+        st.error(error)
+    return image
+
+
+def image_data_url(image):
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG")
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+# --- IMAGE FRESHNESS ANALYSIS ---
+def assess_freshness(image):
+    return llm.describe_image(FRESHNESS_SYSTEM_PROMPT, FRESHNESS_QUESTION, image_data_url(image), site="freshness")
+
+
+async def assess_freshness_async(image):
+    data_url = await asyncio.to_thread(image_data_url, image)
+    return await llm.describe_image_async(FRESHNESS_SYSTEM_PROMPT, FRESHNESS_QUESTION, data_url, site="freshness")
+
+
+# --- DISH IDENTIFICATION ---
+def cached_dish(image_hash):
+    row = storage.connection().execute('SELECT dish FROM dish_cache WHERE image_hash=?', (image_hash,)).fetchone()
+    metrics.cache_lookup("dish_image", row is not None)
+    return row[0] if row else None
+
+
+def remember_dish(image_hash, reply):
+    # Caches the name, and the estimate that came with it when the local food
+    # database does not know the dish. A reply that is not JSON is taken as the name.
+    try:
+        data = json.loads(reply)
+    except ValueError:
+        data = None
+    named = isinstance(data, dict) and data.get("dish")
+    dish = str(data["dish"] if named else reply).strip().strip('."*').strip()
+    conn = storage.connection()
+    conn.execute('INSERT OR REPLACE INTO dish_cache (image_hash, dish) VALUES (?, ?)', (image_hash, dish))
+    conn.commit()
+    if named and load_food_index().lookup(dish) is None:
+        entry = parse_estimate(data)
+        if entry:
+            store_estimate(dish, entry)
+    return dish
+
+
+def identify_dish_name(image, raw_bytes):
+    # The same photo uploaded again skips the vision call entirely.
+    image_hash = hashlib.sha256(raw_bytes).hexdigest()
+    dish = cached_dish(image_hash)
+    if dish:
+        return dish
+    return remember_dish(image_hash, llm.describe_image(DISH_SYSTEM_PROMPT, DISH_QUESTION, image_data_url(image),
+                                                        site="dish_identify", **DISH_OPTIONS))
+
+
+async def identify_dish_name_async(image, raw_bytes):
+    image_hash = hashlib.sha256(raw_bytes).hexdigest()
+    dish = await asyncio.to_thread(cached_dish, image_hash)
+    if dish:
+        return dish
+    data_url = await asyncio.to_thread(image_data_url, image)
+    reply = await llm.describe_image_async(DISH_SYSTEM_PROMPT, DISH_QUESTION, data_url, site="dish_identify", **DISH_OPTIONS)
+    return await asyncio.to_thread(remember_dish, image_hash, reply)
+
+
+def local_dish_nutrition(dish):
+    # (entry, source) from the local food database or an earlier estimate, else
+    # None. An exact name wins over an estimate of this very dish, which wins
+    # over a fuzzy match to another name.
+    match = load_food_index().lookup(dish)
+    if not match or match[1] < 1.0:
+        row = storage.connection().execute('SELECT serving, calories, protein, carbs, fat, sugar FROM dish_nutrition WHERE name=?',
+                                           (normalize_name(dish),)).fetchone()
+        if row:
+            metrics.cache_lookup("dish_nutrition", True)
+            return dict(zip(["serving"] + NUTRIENTS, row)), "cached estimate"
+    metrics.cache_lookup("dish_nutrition", match is not None)
+    if match:
+        entry, _ = match
+        return entry, f"local food database — {entry['name']}"
+    return None
+
+
+def dish_nutrition(dish):
+    # (entry, source) from the local food database, a cached estimate or a new
+    # model estimate; (None, None) when no estimate could be made.
+    return local_dish_nutrition(dish) or estimate_dish_nutrition(dish)
+
+
+async def dish_nutrition_async(dish):
+    found = await asyncio.to_thread(local_dish_nutrition, dish)
+    if found:
+        return found
+    content = await llm.chat_async(estimate_messages(dish), "dish_nutrition", max_tokens=120, response_format={"type": "json_object"})
+    return await asyncio.to_thread(remember_estimate, dish, content)
+
+
+def estimate_messages(dish):
+    return [
+        {"role": "system", "content": "You are a professional food analyst who estimates nutritional information for dishes."},
+        {"role": "user", "content": f"Estimate the nutritional value of one typical serving of {dish}. "
+                                    "Reply as JSON with keys serving (text, e.g. \"1 plate (300 g)\"), calories (kcal), "
+                                    "protein, carbs, fat and sugar (grams), using numbers only."}
+    ]
+
+
+def parse_estimate(data):
+    # The entry in a model's estimate (JSON text or already decoded), or None.
+    try:
+        if isinstance(data, str):
+            data = json.loads(data)
+        if not isinstance(data, dict):
+            raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+        entry = {"serving": str(data.get("serving") or "1 serving")}
+        entry.update({n: float(data[n]) for n in NUTRIENTS})
+    except (TypeError, ValueError, KeyError) as e:
+        print("Dish nutrition parse error:", e)
+        return None
+    return entry
+
+
+def store_estimate(dish, entry):
+    conn = storage.connection()
+    conn.execute('INSERT OR REPLACE INTO dish_nutrition (name, serving, calories, protein, carbs, fat, sugar) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                 (normalize_name(dish), entry["serving"], *(entry[n] for n in NUTRIENTS)))
+    conn.commit()
+
+
+def remember_estimate(dish, content):
+    # Parses the model's estimate and caches it by name.
+    entry = parse_estimate(content)
+    if entry is None:
+        return None, None
+    store_estimate(dish, entry)
+    return entry, f"{llm.MODEL} estimate"
+
+
+def estimate_dish_nutrition(dish):
+    # Only used for dishes the local food database does not know.
+    content = llm.chat(estimate_messages(dish), "dish_nutrition", max_tokens=120, response_format={"type": "json_object"})
+    return remember_estimate(dish, content)
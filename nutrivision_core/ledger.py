@@ -0,0 +1,279 @@
+# ledger.py
+# Token and cost ledger for model calls. Every call's user, call site, model,
+# prompt and completion tokens, cost, latency and outcome go to the model_usage
+# table. record() only appends to an in-memory queue; a writer thread inserts
+# the queued rows in batches, so a model call never waits on the database.
+# The model_usage_by_user and model_usage_by_site views aggregate the table.
+#
+# The user a call is made for is a context variable: the pages set it before
+# rendering and the API sets it when it resolves the session, and the model
+# gateway carries it into the call's task.
+#
+# Settings: daily_token_budget (tokens per user per UTC day, default 0: off).
+# Spent tokens are counted in memory, seeded from the table once per user and
+# day, so a budget check is a dictionary lookup; the model calls' async check
+# runs the seeding query in a worker thread, off the shared event loop. Each
+# process counts its own calls on top of the seed, so with several workers the
+# limit is approximate.
+#
+#   python -m nutrivision_core.ledger [db]   usage by feature and by user (db: file or URL)
+import sys
+import time
+import asyncio
+import queue
+import atexit
+import datetime
+import threading
+import contextvars
+
+from . import settings
+
+# USD per million tokens (prompt, completion). Models not listed get no cost.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0
+BUDGET_MESSAGE = "You have used today's AI allowance. Please try again tomorrow."
+
+_user = contextvars.ContextVar("nutrivision_user", default=None)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def set_user(user_id):
+    _user.set(user_id)
+
+
+def current_user():
+    return _user.get()
+
+
+def ensure_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS model_usage (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        site TEXT,
+        model TEXT,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        cost_usd REAL,
+        latency_ms REAL,
+        outcome TEXT,
+        created_at REAL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_model_usage_user ON model_usage (user_id, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_model_usage_site ON model_usage (site, created_at)')
+    conn.execute('''CREATE VIEW IF NOT EXISTS model_usage_by_user AS
+        SELECT user_id, COUNT(*) AS calls, SUM(CASE WHEN outcome != 'ok' THEN 1 ELSE 0 END) AS failed,
+               SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+               SUM(prompt_tokens + completion_tokens) AS total_tokens, ROUND(CAST(SUM(cost_usd) AS NUMERIC), 4) AS cost_usd,
+               ROUND(CAST(AVG(latency_ms) AS NUMERIC), 1) AS avg_latency_ms, MAX(created_at) AS last_call_at
+        FROM model_usage GROUP BY user_id''')
+    conn.execute('''CREATE VIEW IF NOT EXISTS model_usage_by_site AS
+        SELECT site, model, COUNT(*) AS calls, SUM(CASE WHEN outcome != 'ok' THEN 1 ELSE 0 END) AS failed,
+               SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+               ROUND(CAST(AVG(prompt_tokens + completion_tokens) AS NUMERIC), 1) AS avg_tokens_per_call,
+               ROUND(CAST(SUM(cost_usd) AS NUMERIC), 4) AS cost_usd, ROUND(CAST(AVG(latency_ms) AS NUMERIC), 1) AS avg_latency_ms
+        FROM model_usage GROUP BY site, model''')
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def _day(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date()
+
+
+def _day_start(day):
+    return datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp()
+
+
+# --- WRITER ---
+class Ledger:
+    def __init__(self):
+        self.pending = queue.SimpleQueue()
+        self.spent = {}
+        self.spent_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+        self.thread.start()
+
+    def record(self, path, row):
+        # row: (user_id, site, model, prompt, completion, cost, latency_ms, outcome, created_at)
+        user_id, prompt, completion, created_at = row[0], row[3], row[4], row[8]
+        if user_id is not None:
+            key = (path, user_id, _day(created_at))
+            with self.spent_lock:
+                if key in self.spent:
+                    self.spent[key] += prompt + completion
+        self.pending.put((path, row))
+
+    def cached_tokens(self, path, user_id):
+        # Today's count if it is already in memory, else None.
+        with self.spent_lock:
+            return self.spent.get((path, user_id, _day(time.time())))
+
+    def tokens_today(self, path, user_id):
+        # Blocking: the first check today for a user seeds the count from the
+        # table. Rows still queued at this moment are missed, so the count can
+        # run a batch low. Off the page threads, call it through to_thread.
+        key = (path, user_id, _day(time.time()))
+        with self.spent_lock:
+            if key in self.spent:
+                return self.spent[key]
+        from . import storage
+        try:
+            conn = storage.connect(path)
+            try:
+                ensure_table(conn)
+                seeded = conn.execute('SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM model_usage '
+                                      'WHERE user_id=? AND created_at>=?', (user_id, _day_start(key[2]))).fetchone()[0]
+            finally:
+                conn.close()
+        except Exception as e:
+            # The budget is a soft limit: an unreadable ledger must not fail
+            # the model call. Nothing is cached, so the next check retries.
+            print("Usage ledger read failed:", e)
+            return 0
+        with self.spent_lock:
+            # Counts from earlier days are never read again.
+            for old in [k for k in self.spent if k[2] != key[2]]:
+                del self.spent[old]
+            return self.spent.setdefault(key, seeded)
+
+    def _run(self):
+        connections = {}
+        while True:
+            batch = [self.pending.get()]
+            time.sleep(FLUSH_INTERVAL)
+            while len(batch) < BATCH_SIZE * 10:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            # Whatever goes wrong, the thread must live on and release the
+            # batch's flush() waiters, or every later flush would time out.
+            try:
+                self._write(connections, batch)
+            except Exception as e:
+                print("Usage ledger batch failed:", e)
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+    def _write(self, connections, batch):
+        from . import storage
+        by_path = {}
+        for item in batch:
+            if isinstance(item, threading.Event):
+                continue
+            by_path.setdefault(item[0], []).append(item[1])
+        for path, rows in by_path.items():
+            try:
+                conn = connections.get(path)
+                if conn is None:
+                    conn = connections[path] = storage.connect(path)
+                    if storage.dialect(path) == "sqlite":
+                        conn.execute('PRAGMA busy_timeout = 30000')
+                    ensure_table(conn)
+                for start in range(0, len(rows), BATCH_SIZE):
+                    conn.executemany('INSERT INTO model_usage (user_id, site, model, prompt_tokens, completion_tokens, cost_usd, '
+                                     'latency_ms, outcome, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     rows[start:start + BATCH_SIZE])
+                    conn.commit()
+            except Exception as e:
+                # Connection errors (PostgreSQL down, driver missing) land here
+                # too; the connection is dropped and reopened on the next batch.
+                print(f"Usage ledger write failed ({len(rows)} rows dropped):", e)
+                conn = connections.pop(path, None)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def flush(self, timeout=None):
+        # Waits until everything queued so far has been written.
+        done = threading.Event()
+        self.pending.put(done)
+        return done.wait(timeout)
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+            atexit.register(_ledger.flush, 5)
+    return _ledger
+
+
+# --- RECORDING ---
+def record(site, model, latency, outcome, usage):
+    from . import storage
+    prompt = usage.prompt_tokens if usage else 0
+    completion = usage.completion_tokens if usage else 0
+    ledger().record(storage.db_path(), (current_user(), site, model, prompt, completion, call_cost(model, prompt, completion),
+                                        round(latency * 1000, 1), outcome, time.time()))
+
+
+def daily_budget():
+    return int(settings.get("daily_token_budget", 0))
+
+
+def over_budget(user_id=None):
+    # Blocking on the first check of the day; for page and worker threads.
+    from . import storage
+    budget = daily_budget()
+    user_id = current_user() if user_id is None else user_id
+    if budget <= 0 or user_id is None:
+        return False
+    return ledger().tokens_today(storage.db_path(), user_id) >= budget
+
+
+async def check_budget():
+    # For coroutines on a shared event loop (the model gateway, the API): the
+    # seeding query runs in a worker thread so other calls keep moving.
+    from . import storage
+    budget = daily_budget()
+    user_id = current_user()
+    if budget <= 0 or user_id is None:
+        return
+    path = storage.db_path()
+    spent = ledger().cached_tokens(path, user_id)
+    if spent is None:
+        spent = await asyncio.to_thread(ledger().tokens_today, path, user_id)
+    if spent >= budget:
+        raise BudgetExceeded(BUDGET_MESSAGE)
+
+
+# --- REPORTING ---
+def report(path):
+    from . import storage
+    conn = storage.connect(path)
+    ensure_table(conn)
+    print(f"{'feature':<16} {'model':<12} {'calls':>6} {'failed':>6} {'prompt':>9} {'completion':>10} {'avg tok':>8} {'cost $':>9} {'avg ms':>8}")
+    for row in conn.execute('SELECT * FROM model_usage_by_site ORDER BY cost_usd DESC, prompt_tokens + completion_tokens DESC'):
+        site, model, calls, failed, prompt, completion, avg_tokens, cost, latency = row
+        print(f"{site:<16} {model:<12} {calls:>6} {failed:>6} {prompt:>9} {completion:>10} {avg_tokens:>8} {cost or 0:>9.4f} {latency:>8}")
+    print()
+    print(f"{'user':>6} {'calls':>6} {'failed':>6} {'tokens':>9} {'cost $':>9}")
+    for user_id, calls, failed, _, _, total, cost, _, _ in conn.execute(
+            'SELECT * FROM model_usage_by_user ORDER BY total_tokens DESC LIMIT 20'):
+        print(f"{str(user_id):>6} {calls:>6} {failed:>6} {total:>9} {cost or 0:>9.4f}")
+
+
+if __name__ == "__main__":
+    report(sys.argv[1] if len(sys.argv) > 1 else "nutrivision_users.db")
@@ -0,0 +1,147 @@
+# llm.py
+# OpenAI access for every entry point, and plan generation in both output
+# modes. All calls are async and keep one AsyncOpenAI client (and its keep-alive
+# connection pool) per event loop. The HTTP API awaits them on its own loop;
+# the Streamlit pages call the sync wrappers, which run the call on the
+# process's model gateway loop (see gateway.py).
+import time
+import asyncio
+import weakref
+
+import streamlit as st
+from openai import AsyncOpenAI
+
+from . import ledger, metrics, settings, tracing
+from .gateway import ModelGateway, DEFAULT_MAX_IN_FLIGHT
+from .plan_schema import response_format, parse_plan_json
+
+MODEL = "gpt-4o"
+
+# An AsyncOpenAI client is bound to the loop it first ran on.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def async_client():
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = AsyncOpenAI(api_key=settings.get("openai_api_key"))
+    return _async_clients[loop]
+
+
+@st.cache_resource
+def get_gateway(max_in_flight):
+    return ModelGateway(max_in_flight)
+
+
+def gateway():
+    return get_gateway(int(settings.get("model_max_in_flight", DEFAULT_MAX_IN_FLIGHT)))
+
+
+def plan_output_mode():
+    # "json" asks the model for schema-constrained plans and renders markdown locally.
+    return settings.get("plan_output_mode", "markdown")
+
+
+def plan_messages(system_prompt, prompt):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def chat(messages, site="other", **options):
+    return gateway().run(chat_async(messages, site, **options))
+
+
+# site names the feature a call serves (diet_plan, freshness, ...) in metrics
+# and in the usage ledger.
+def _record(site, started, outcome, usage):
+    latency = time.perf_counter() - started
+    metrics.MODEL_CALL.observe(latency, site=site, outcome=outcome)
+    ledger.record(site, MODEL, latency, outcome, usage)
+    if usage:
+        metrics.MODEL_TOKENS.inc(usage.prompt_tokens, site=site, kind="prompt")
+        metrics.MODEL_TOKENS.inc(usage.completion_tokens, site=site, kind="completion")
+
+
+async def chat_async(messages, site="other", **options):
+    await ledger.check_budget()
+    started = time.perf_counter()
+    with tracing.span("model.chat", model=MODEL, site=site, max_tokens=options.get("max_tokens")) as span:
+        try:
+            response = await async_client().chat.completions.create(model=MODEL, messages=messages, **options)
+        except BaseException:
+            _record(site, started, "error", None)
+            raise
+        _record(site, started, "ok", response.usage)
+        if response.usage:
+            span.set(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+    return response.choices[0].message.content
+
+
+async def stream_chat(messages, site="other", **options):
+    # Yields the reply text as it arrives; usage comes in the final chunk.
+    await ledger.check_budget()
+    started = time.perf_counter()
+    usage, outcome = None, "error"
+    try:
+        stream = await async_client().chat.completions.create(model=MODEL, messages=messages, stream=True,
+                                                              stream_options={"include_usage": True}, **options)
+        async for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        outcome = "ok"
+    finally:
+        _record(site, started, outcome, usage)
+
+
+def generate_text_plan(system_prompt, prompt, max_tokens, site="plan"):
+    return chat(plan_messages(system_prompt, prompt), site, temperature=0.5, max_tokens=max_tokens)
+
+
+def _validation_feedback(content, errors):
+    return [
+        {"role": "assistant", "content": content or ""},
+        {"role": "user", "content": "The plan failed validation:\n" + "\n".join(f"- {e}" for e in errors[:20]) +
+                                    "\nReturn the complete corrected plan as JSON."}
+    ]
+
+
+async def generate_structured_plan_async(kind, system_prompt, prompt, max_tokens, retries=1):
+    # Validation errors are sent back to the model so it only has to fix what was wrong.
+    messages = plan_messages(system_prompt, prompt)
+    for attempt in range(retries + 1):
+        content = await chat_async(messages, f"{kind}_plan", temperature=0.5, max_tokens=max_tokens, response_format=response_format(kind))
+        data, errors = parse_plan_json(kind, content)
+        if data is not None:
+            return data
+        print(f"Structured {kind} plan failed validation (attempt {attempt + 1}):", errors)
+        messages += _validation_feedback(content, errors)
+    return None
+
+
+def generate_structured_plan(kind, system_prompt, prompt, max_tokens, retries=1):
+    return gateway().run(generate_structured_plan_async(kind, system_prompt, prompt, max_tokens, retries))
+
+
+def image_messages(system_prompt, question, data_url):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": [
+            {"type": "text", "text": question},
+            {"type": "image_url", "image_url": {"url": data_url}}
+        ]}
+    ]
+
+
+def describe_image(system_prompt, question, data_url, max_tokens=None, site="vision", **options):
+    if max_tokens:
+        options["max_tokens"] = max_tokens
+    return chat(image_messages(system_prompt, question, data_url), site, **options)
+
+
+async def describe_image_async(system_prompt, question, data_url, max_tokens=None, site="vision", **options):
+    if max_tokens:
+        options["max_tokens"] = max_tokens
+    return await chat_async(image_messages(system_prompt, question, data_url), site, **options)
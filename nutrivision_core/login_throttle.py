@@ -0,0 +1,111 @@
+# login_throttle.py
+# Sliding-window limiter for failed logins, keyed per identifier and per client.
+# A key that fails too often inside the window is locked out, and each repeat
+# lockout doubles in length. Checks happen before any bcrypt work, so a
+# credential-stuffing burst is rejected with a single indexed SELECT.
+#
+# State lives in two SQLite tables (login_attempts, login_lockouts) that can be
+# inspected directly or through LoginThrottle.state(); expired rows are purged
+# as part of normal traffic. One throttle serves every session thread, so its SQL
+# runs on the calling thread's connection (storage.connection).
+import time
+
+WINDOW = 15 * 60
+LIMITS = {"user": 5, "client": 20}
+BASE_LOCKOUT = 30
+MAX_LOCKOUT = 60 * 60
+# Lockout strikes are forgotten once a key has been quiet this long.
+STRIKE_DECAY = 24 * 60 * 60
+PURGE_INTERVAL = 60
+
+
+def throttle_keys(identifier, client):
+    # client None: the address is not trustworthy (e.g. a proxy's, shared by all
+    # its users), so only the identifier is limited.
+    keys = [("user", f"user:{(identifier or '').strip().lower()}")]
+    if client is not None:
+        keys.append(("client", f"client:{client}"))
+    return keys
+
+
+class LoginThrottle:
+    def __init__(self, connection):
+        # connection: returns the calling thread's database connection.
+        self.connection = connection
+        self.last_purge = 0.0
+        conn = connection()
+        cur = conn.cursor()
+        cur.execute('''CREATE TABLE IF NOT EXISTS login_attempts (
+            key TEXT,
+            attempted_at REAL
+        )''')
+        cur.execute('''CREATE TABLE IF NOT EXISTS login_lockouts (
+            key TEXT PRIMARY KEY,
+            strikes INTEGER,
+            locked_until REAL
+        )''')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_login_attempts_key ON login_attempts (key, attempted_at)')
+        conn.commit()
+
+    @property
+    def conn(self):
+        return self.connection()
+
+    def retry_after(self, keys, now=None):
+        # Seconds until every key is unlocked; 0 when the attempt may proceed.
+        now = now or time.time()
+        names = [key for _, key in keys]
+        cur = self.conn.cursor()
+        cur.execute(f'SELECT MAX(locked_until) FROM login_lockouts WHERE key IN ({",".join("?" * len(names))})', names)
+        locked_until = cur.fetchone()[0]
+        return max(0.0, locked_until - now) if locked_until else 0.0
+
+    def record_failure(self, keys, now=None):
+        now = now or time.time()
+        cur = self.conn.cursor()
+        for kind, key in keys:
+            cur.execute('INSERT INTO login_attempts (key, attempted_at) VALUES (?, ?)', (key, now))
+            cur.execute('SELECT COUNT(*) FROM login_attempts WHERE key=? AND attempted_at>?', (key, now - WINDOW))
+            if cur.fetchone()[0] < LIMITS[kind]:
+                continue
+            cur.execute('SELECT strikes FROM login_lockouts WHERE key=?', (key,))
+            row = cur.fetchone()
+            strikes = (row[0] if row else 0) + 1
+            lockout = min(BASE_LOCKOUT * 2 ** (strikes - 1), MAX_LOCKOUT)
+            cur.execute('INSERT OR REPLACE INTO login_lockouts (key, strikes, locked_until) VALUES (?, ?, ?)',
+                        (key, strikes, now + lockout))
+            cur.execute('DELETE FROM login_attempts WHERE key=?', (key,))
+        self.conn.commit()
+        if now - self.last_purge > PURGE_INTERVAL:
+            self.purge(now)
+
+    def record_success(self, keys):
+        # Only the identifier is cleared: a client that keeps failing on other
+        # accounts stays on the clock.
+        names = [key for kind, key in keys if kind == "user"]
+        cur = self.conn.cursor()
+        cur.executemany('DELETE FROM login_attempts WHERE key=?', [(k,) for k in names])
+        cur.executemany('DELETE FROM login_lockouts WHERE key=?', [(k,) for k in names])
+        self.conn.commit()
+
+    def purge(self, now=None):
+        now = now or time.time()
+        cur = self.conn.cursor()
+        cur.execute('DELETE FROM login_attempts WHERE attempted_at<=?', (now - WINDOW,))
+        cur.execute('DELETE FROM login_lockouts WHERE locked_until<=?', (now - STRIKE_DECAY,))
+        self.conn.commit()
+        self.last_purge = now
+
+    def state(self, key, now=None):
+        now = now or time.time()
+        cur = self.conn.cursor()
+        cur.execute('SELECT COUNT(*) FROM login_attempts WHERE key=? AND attempted_at>?', (key, now - WINDOW))
+        failures = cur.fetchone()[0]
+        cur.execute('SELECT strikes, locked_until FROM login_lockouts WHERE key=?', (key,))
+        strikes, locked_until = cur.fetchone() or (0, None)
+        return {
+            "key": key,
+            "recent_failures": failures,
+            "strikes": strikes,
+            "locked_for": max(0.0, locked_until - now) if locked_until else 0.0,
+        }
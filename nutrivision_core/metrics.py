@@ -0,0 +1,235 @@
+# metrics.py
+# In-process metrics in the Prometheus text exposition format: counters,
+# gauges and histograms with labels, kept per process. The HTTP API serves
+# them at /metrics; a Streamlit process serves them on its own small HTTP
+# server when the metrics_port setting is set (python -m nutrivision_core.metrics
+# --port N prints a scrape of a running endpoint).
+#
+# Page renders, model calls (latency and tokens by call site), plan and dish
+# cache hits, SQLite statements, bcrypt work and active sessions are recorded
+# here; see the module-level metrics below.
+import re
+import sys
+import time
+import bisect
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MODEL_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), callback=None):
+        # callback() -> value is called at scrape time, for gauges read from the database.
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                self.set(self.callback())
+            except Exception as e:
+                print(f"Metric {self.name} callback failed:", e)
+        return super().render()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self.values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# --- REGISTRY ---
+_registry = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def exposition():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- APP METRICS ---
+PAGE_RENDER = register(Histogram("nutrivision_page_render_seconds", "Time to run a Streamlit page, including fragment reruns.", ["page"]))
+MODEL_CALL = register(Histogram("nutrivision_model_call_seconds", "Model call latency by call site.", ["site", "outcome"], MODEL_BUCKETS))
+MODEL_TOKENS = register(Counter("nutrivision_model_tokens_total", "Model tokens used by call site.", ["site", "kind"]))
+CACHE_LOOKUPS = register(Counter("nutrivision_cache_lookups_total", "Plan and dish cache lookups by cache and result.", ["cache", "result"]))
+DB_QUERY = register(Histogram("nutrivision_db_query_seconds", "SQLite statement time by statement kind and table.", ["op", "table"]))
+BCRYPT = register(Histogram("nutrivision_bcrypt_seconds", "Password hashing and checking time.", ["op"],
+                            (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+HTTP_REQUESTS = register(Histogram("nutrivision_http_request_seconds", "HTTP API request latency by route and status.", ["route", "method", "status"]))
+
+# Kept by the session store: counted at each cleanup, adjusted on login and logout.
+ACTIVE_SESSIONS = register(Gauge("nutrivision_active_sessions", "Unexpired login sessions in the database."))
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def timed_page(page):
+    # Decorator: observes the page's run time, whether it returns or raises.
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with PAGE_RENDER.time(page=page):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Statement labels are derived once per distinct SQL string.
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?|ON)\s+(\w+)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_labels(sql):
+    # ("SELECT", "diet_plans") for "SELECT plan FROM diet_plans WHERE ...".
+    words = sql.split(None, 1)
+    match = _TABLE.search(sql)
+    return (words[0].upper() if words else "other"), (match.group(1).lower() if match else "")
+
+
+# --- ENDPOINT ---
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    # Serves /metrics from a daemon thread; returns the server, or None if the port is taken.
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        print(f"Metrics endpoint not started on {host}:{port}:", e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import urllib.request
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else 9464
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        print(response.read().decode("utf-8"), end="")
@@ -0,0 +1,85 @@
+# nutrition_targets.py
+# Deterministic calorie and macro targets from the fields profile_page collects.
+# BMR uses the Mifflin-St Jeor equation; TDEE scales it by activity level, and the
+# goal sets a deficit or surplus. Everything is vectorised so a whole profiles
+# table can be scored in one call.
+import re
+
+import numpy as np
+
+# The profile has no age field, so BMR is computed for a reference adult.
+ASSUMED_AGE = 30
+
+# Mifflin-St Jeor sex constant; "Other" uses the midpoint.
+GENDER_OFFSET = {"Male": 5.0, "Female": -161.0, "Other": -78.0}
+
+ACTIVITY_FACTOR = {
+    "Low: 1-2 days a week": 1.375,
+    "Moderate: 3-5 days a week": 1.55,
+    "High: Almost Everyday": 1.725,
+}
+
+BODY_TYPE_FACTOR = {
+    "Ectomorph : Lean Body": 1.05,
+    "Mesomorph : Average Body": 1.0,
+    "Endomorph : Bulky or Fat": 0.95,
+}
+
+# Grams of protein per kg of body weight, and the share of calories from fat.
+PROTEIN_PER_KG = {"Lose Fat": 2.0, "Gain Muscle": 1.8, "Maintain": 1.6}
+FAT_SHARE = 0.25
+
+MUSCLE_GAIN_SURPLUS = 300.0
+KCAL_PER_KG_FAT = 7700.0
+MIN_CALORIES = {"Male": 1500.0, "Female": 1200.0, "Other": 1350.0}
+
+
+def parse_rate(rate):
+    # "0.5 kg/week" -> 0.5; anything unparseable counts as no deficit.
+    match = re.search(r"\d+(?:\.\d+)?", rate or "")
+    return float(match.group()) if match else 0.0
+
+
+def _lookup(table, values, default):
+    return np.array([table.get(v, default) for v in values], dtype=float)
+
+
+def compute_targets_batch(genders, body_types, activity_levels, heights, weights, goals, weight_loss_rates, age=ASSUMED_AGE):
+    # heights are in metres and weights in kg, matching the profiles table.
+    # Returns a dict of float arrays: bmr, tdee, calories, protein, carbs, fats.
+    heights_cm = np.asarray(heights, dtype=float) * 100.0
+    weights = np.asarray(weights, dtype=float)
+    goals = list(goals)
+
+    bmr = 10.0 * weights + 6.25 * heights_cm - 5.0 * age + _lookup(GENDER_OFFSET, genders, GENDER_OFFSET["Other"])
+    tdee = bmr * _lookup(ACTIVITY_FACTOR, activity_levels, 1.375) * _lookup(BODY_TYPE_FACTOR, body_types, 1.0)
+
+    goal_arr = np.array(goals, dtype=object)
+    deficit = np.array([parse_rate(r) for r in weight_loss_rates]) * KCAL_PER_KG_FAT / 7.0
+    adjustment = np.where(goal_arr == "Lose Fat", -deficit, np.where(goal_arr == "Gain Muscle", MUSCLE_GAIN_SURPLUS, 0.0))
+    floor = np.maximum(bmr, _lookup(MIN_CALORIES, genders, MIN_CALORIES["Other"]))
+    calories = np.where(adjustment < 0, np.maximum(tdee + adjustment, floor), tdee + adjustment)
+
+    protein = weights * _lookup(PROTEIN_PER_KG, goals, PROTEIN_PER_KG["Maintain"])
+    fats = calories * FAT_SHARE / 9.0
+    carbs = np.maximum(calories - protein * 4.0 - fats * 9.0, 0.0) / 4.0
+
+    return {
+        "bmr": np.round(bmr),
+        "tdee": np.round(tdee),
+        "calories": np.round(calories),
+        "protein": np.round(protein),
+        "carbs": np.round(carbs),
+        "fats": np.round(fats),
+    }
+
+
+def compute_targets(gender, body_type, activity_level, height, weight, goal, weight_loss_rate, age=ASSUMED_AGE):
+    batch = compute_targets_batch([gender], [body_type], [activity_level], [height], [weight], [goal], [weight_loss_rate], age)
+    return {key: float(values[0]) for key, values in batch.items()}
+
+
+def targets_prompt(targets):
+    return (f"Daily nutritional targets (fixed, use exactly these): {targets['calories']:.0f} kcal, "
+            f"Protein {targets['protein']:.0f} g, Carbs {targets['carbs']:.0f} g, Fats {targets['fats']:.0f} g. "
+            "Each day's totals should land within 5% of these targets.")
@@ -0,0 +1,212 @@
+# offline_planner.py
+# Instant, offline 7-day diet plans assembled from a small annotated meal
+# library. For each day the planner searches every combination of the top
+# candidates per meal slot, scales portions to the calorie target and keeps the
+# combination whose macros land closest to the protein / carbs / fats targets.
+# The result uses the plan_schema JSON shape, so it renders and stores exactly
+# like a plan generated in JSON mode.
+import numpy as np
+
+from .plan_parser import MEALS, PLAN_DAYS
+
+# Diet levels: a meal is allowed when its level is at or below the user's.
+DIET_LEVELS = {"Vegan": 0, "Vegetarian": 1, "Eggetarian": 2, "Non-Vegetarian": 3}
+
+# Health conditions that translate directly into an allergen-style exclusion.
+CONDITION_EXCLUSIONS = {"Celiac Disease": "Gluten"}
+
+# (slot, name, diet, allergens, (protein, carbs, fats) in g, [(amount, unit, food)])
+MEAL_LIBRARY = [
+    ("Breakfast", "Oatmeal with berries and almonds", "Vegan", ("Gluten", "Tree nuts"), (12, 58, 12),
+     [(60, "g", "rolled oats"), (100, "g", "mixed berries"), (15, "g", "almonds"), (200, "ml", "oat milk")]),
+    ("Breakfast", "Tofu scramble with whole-wheat toast", "Vegan", ("Soy", "Gluten"), (24, 35, 14),
+     [(150, "g", "firm tofu"), (60, "g", "spinach"), (2, "slice", "whole-wheat toast")]),
+    ("Breakfast", "Vegetable omelette with toast", "Eggetarian", ("Eggs", "Gluten"), (22, 28, 16),
+     [(3, "", "eggs"), (80, "g", "peppers and onion"), (1, "slice", "whole-wheat toast")]),
+    ("Breakfast", "Greek yogurt parfait", "Vegetarian", ("Dairy", "Gluten"), (22, 45, 8),
+     [(200, "g", "Greek yogurt"), (40, "g", "granola"), (1, "", "banana")]),
+    ("Breakfast", "Poha with peanuts and peas", "Vegan", ("Peanuts",), (9, 55, 10),
+     [(60, "g", "flattened rice (poha)"), (50, "g", "green peas"), (15, "g", "peanuts")]),
+    ("Breakfast", "Besan chilla with mint chutney", "Vegan", (), (16, 38, 8),
+     [(70, "g", "chickpea flour"), (80, "g", "onion and tomato"), (30, "g", "mint chutney")]),
+    ("Breakfast", "Chicken sausage and egg muffin", "Non-Vegetarian", ("Eggs", "Gluten"), (30, 30, 15),
+     [(1, "", "whole-wheat English muffin"), (2, "", "eggs"), (60, "g", "chicken sausage")]),
+    ("Breakfast", "Quinoa porridge with apple and cinnamon", "Vegan", (), (10, 55, 7),
+     [(50, "g", "quinoa"), (1, "", "apple"), (200, "ml", "rice milk")]),
+    ("Breakfast", "Idli with sambar", "Vegan", (), (12, 60, 4),
+     [(3, "", "idli"), (200, "ml", "sambar")]),
+    ("Breakfast", "Smoked salmon on rye", "Non-Vegetarian", ("Gluten", "Dairy"), (25, 30, 14),
+     [(2, "slice", "rye bread"), (70, "g", "smoked salmon"), (30, "g", "cream cheese")]),
+
+    ("Morning Snack", "Apple with peanut butter", "Vegan", ("Peanuts",), (5, 25, 8),
+     [(1, "", "apple"), (16, "g", "peanut butter")]),
+    ("Morning Snack", "Roasted chickpeas", "Vegan", (), (9, 25, 5),
+     [(40, "g", "roasted chickpeas")]),
+    ("Morning Snack", "Cottage cheese with pineapple", "Vegetarian", ("Dairy",), (14, 14, 4),
+     [(120, "g", "cottage cheese"), (80, "g", "pineapple")]),
+    ("Morning Snack", "Boiled eggs with cucumber", "Eggetarian", ("Eggs",), (12, 4, 10),
+     [(2, "", "boiled eggs"), (100, "g", "cucumber")]),
+    ("Morning Snack", "Mixed nuts and a banana", "Vegan", ("Tree nuts",), (6, 30, 14),
+     [(25, "g", "mixed nuts"), (1, "", "banana")]),
+    ("Morning Snack", "Hummus with carrot sticks", "Vegan", (), (6, 18, 8),
+     [(60, "g", "hummus"), (120, "g", "carrot sticks")]),
+    ("Morning Snack", "Edamame", "Vegan", ("Soy",), (11, 9, 5),
+     [(100, "g", "shelled edamame")]),
+    ("Morning Snack", "Turkey roll-ups", "Non-Vegetarian", (), (16, 4, 4),
+     [(80, "g", "sliced turkey breast"), (50, "g", "bell pepper strips")]),
+    ("Morning Snack", "Buttermilk and roasted makhana", "Vegetarian", ("Dairy",), (8, 20, 4),
+     [(250, "ml", "buttermilk"), (20, "g", "roasted makhana")]),
+
+    ("Lunch", "Grilled chicken quinoa bowl", "Non-Vegetarian", (), (40, 50, 14),
+     [(120, "g", "grilled chicken breast"), (150, "g", "cooked quinoa"), (100, "g", "roasted vegetables"), (10, "ml", "olive oil")]),
+    ("Lunch", "Rajma with brown rice", "Vegan", (), (18, 75, 8),
+     [(200, "g", "rajma curry"), (150, "g", "cooked brown rice"), (80, "g", "cucumber salad")]),
+    ("Lunch", "Paneer tikka wrap", "Vegetarian", ("Dairy", "Gluten"), (28, 50, 20),
+     [(1, "", "whole-wheat wrap"), (100, "g", "paneer tikka"), (60, "g", "salad greens")]),
+    ("Lunch", "Lentil soup with whole-grain bread", "Vegan", ("Gluten",), (20, 60, 8),
+     [(300, "ml", "lentil soup"), (1, "slice", "whole-grain bread"), (80, "g", "side salad")]),
+    ("Lunch", "Tuna salad with chickpeas", "Non-Vegetarian", (), (35, 35, 12),
+     [(100, "g", "tuna in water"), (100, "g", "chickpeas"), (100, "g", "mixed greens"), (10, "ml", "olive oil")]),
+    ("Lunch", "Tofu stir-fry with rice", "Vegan", ("Soy",), (25, 60, 14),
+     [(150, "g", "firm tofu"), (150, "g", "mixed vegetables"), (150, "g", "cooked jasmine rice")]),
+    ("Lunch", "Egg fried rice with vegetables", "Eggetarian", ("Eggs", "Soy"), (20, 65, 14),
+     [(2, "", "eggs"), (180, "g", "cooked rice"), (100, "g", "mixed vegetables")]),
+    ("Lunch", "Chicken curry with roti", "Non-Vegetarian", ("Gluten",), (38, 55, 16),
+     [(150, "g", "chicken curry"), (2, "", "whole-wheat roti"), (80, "g", "salad")]),
+    ("Lunch", "Chana masala with millet", "Vegan", (), (18, 70, 10),
+     [(200, "g", "chana masala"), (150, "g", "cooked millet")]),
+    ("Lunch", "Shrimp tacos", "Non-Vegetarian", ("Shellfish",), (30, 45, 12),
+     [(120, "g", "grilled shrimp"), (2, "", "corn tortillas"), (60, "g", "cabbage slaw")]),
+
+    ("Evening Snack", "Greek yogurt with honey", "Vegetarian", ("Dairy",), (17, 20, 4),
+     [(170, "g", "Greek yogurt"), (10, "g", "honey")]),
+    ("Evening Snack", "Sprouts chaat", "Vegan", (), (10, 25, 2),
+     [(120, "g", "mixed sprouts"), (60, "g", "tomato and onion")]),
+    ("Evening Snack", "Protein smoothie", "Vegetarian", ("Dairy",), (25, 30, 5),
+     [(1, "scoop", "whey protein"), (1, "", "banana"), (250, "ml", "skim milk")]),
+    ("Evening Snack", "Rice cakes with almond butter", "Vegan", ("Tree nuts",), (6, 22, 9),
+     [(2, "", "rice cakes"), (16, "g", "almond butter")]),
+    ("Evening Snack", "Trail mix", "Vegan", ("Peanuts", "Tree nuts"), (7, 20, 14),
+     [(35, "g", "trail mix")]),
+    ("Evening Snack", "Egg white bites with spinach", "Eggetarian", ("Eggs",), (14, 4, 3),
+     [(120, "g", "egg whites"), (40, "g", "spinach")]),
+    ("Evening Snack", "Fruit bowl with chia", "Vegan", (), (4, 32, 5),
+     [(200, "g", "seasonal fruit"), (10, "g", "chia seeds")]),
+    ("Evening Snack", "Grilled chicken skewers", "Non-Vegetarian", (), (22, 5, 5),
+     [(90, "g", "chicken skewers"), (60, "g", "bell peppers")]),
+
+    ("Dinner", "Baked salmon with sweet potato", "Non-Vegetarian", (), (35, 40, 18),
+     [(150, "g", "salmon fillet"), (200, "g", "sweet potato"), (100, "g", "steamed broccoli")]),
+    ("Dinner", "Dal tadka with roti", "Vegan", ("Gluten",), (20, 60, 10),
+     [(200, "g", "dal tadka"), (2, "", "whole-wheat roti"), (100, "g", "sautéed vegetables")]),
+    ("Dinner", "Palak paneer with brown rice", "Vegetarian", ("Dairy",), (25, 55, 20),
+     [(200, "g", "palak paneer"), (150, "g", "cooked brown rice")]),
+    ("Dinner", "Chicken stir-fry with noodles", "Non-Vegetarian", ("Soy", "Gluten"), (38, 55, 14),
+     [(130, "g", "chicken breast"), (120, "g", "cooked whole-wheat noodles"), (150, "g", "stir-fry vegetables")]),
+    ("Dinner", "Black bean burrito bowl", "Vegan", (), (20, 70, 12),
+     [(150, "g", "black beans"), (120, "g", "cooked rice"), (80, "g", "salsa"), (50, "g", "avocado")]),
+    ("Dinner", "Vegetable khichdi with curd", "Vegetarian", ("Dairy",), (18, 65, 9),
+     [(250, "g", "vegetable khichdi"), (100, "g", "curd")]),
+    ("Dinner", "Shakshuka with pita", "Eggetarian", ("Eggs", "Gluten"), (22, 45, 16),
+     [(3, "", "eggs"), (200, "g", "tomato-pepper sauce"), (1, "", "whole-wheat pita")]),
+    ("Dinner", "Grilled fish with quinoa", "Non-Vegetarian", (), (36, 40, 10),
+     [(150, "g", "white fish"), (150, "g", "cooked quinoa"), (100, "g", "green beans")]),
+    ("Dinner", "Tempeh and vegetable curry", "Vegan", ("Soy",), (26, 45, 16),
+     [(120, "g", "tempeh"), (150, "g", "vegetable curry"), (120, "g", "cooked rice")]),
+    ("Dinner", "Turkey meatballs with whole-wheat pasta", "Non-Vegetarian", ("Gluten", "Eggs"), (35, 60, 14),
+     [(150, "g", "turkey meatballs"), (120, "g", "cooked whole-wheat pasta"), (100, "g", "marinara sauce")]),
+]
+
+CANDIDATES_PER_SLOT = 5
+MIN_SCALE, MAX_SCALE = 0.6, 1.8
+REPEAT_PENALTY = 0.05
+# Relative weights of the squared macro errors: protein, carbs, fats, calories.
+MACRO_WEIGHTS = np.array([1.5, 1.0, 1.0, 2.0])
+
+
+def meal_calories(protein, carbs, fats):
+    return 4 * protein + 4 * carbs + 9 * fats
+
+
+def eligible_meals(diet_type, allergens=(), other_allergy="", health_conditions=()):
+    level = DIET_LEVELS.get(diet_type, DIET_LEVELS["Non-Vegetarian"])
+    excluded = {a for a in allergens if a != "None"}
+    excluded |= {CONDITION_EXCLUSIONS[h] for h in health_conditions if h in CONDITION_EXCLUSIONS}
+    other = other_allergy.strip().lower()
+
+    by_slot = {slot: [] for slot in MEALS}
+    for meal in MEAL_LIBRARY:
+        slot, name, diet, meal_allergens, _, items = meal
+        if DIET_LEVELS[diet] > level or excluded.intersection(meal_allergens):
+            continue
+        if other and (other in name.lower() or any(other in food.lower() for _, _, food in items)):
+            continue
+        by_slot[slot].append(meal)
+    return by_slot
+
+
+def _format_item(amount, unit, food, scale):
+    value = amount * scale
+    if unit in ("g", "ml"):
+        value = max(5, round(value / 5) * 5)
+        return f"{value:g} {unit} {food}"
+    value = max(0.5, round(value * 2) / 2)
+    if not unit:
+        return f"{value:g} {food}"
+    return f"{value:g} {unit if value == 1 else unit + 's'} {food}"
+
+
+def assemble_diet_plan(targets, diet_type, allergens=(), other_allergy="", health_conditions=(), title="7-Day Diet Plan"):
+    # targets needs protein, carbs, fats and calories (see nutrition_targets).
+    # Raises ValueError when the restrictions leave a meal slot with no options.
+    by_slot = eligible_meals(diet_type, allergens, other_allergy, health_conditions)
+    empty = [slot for slot, meals in by_slot.items() if not meals]
+    if empty:
+        raise ValueError(f"No meals in the library fit these restrictions for: {', '.join(empty)}.")
+
+    target = np.array([targets["protein"], targets["carbs"], targets["fats"], targets["calories"]], dtype=float)
+    macros = {slot: np.array([(*m[4], meal_calories(*m[4])) for m in meals], dtype=float) for slot, meals in by_slot.items()}
+    used = {slot: np.zeros(len(meals)) for slot, meals in by_slot.items()}
+
+    days = []
+    for day in range(PLAN_DAYS):
+        # Rotate through each slot's meals so consecutive days see different candidates.
+        picks = []
+        for slot in MEALS:
+            n = len(by_slot[slot])
+            picks.append([(day * 2 + j) % n for j in range(min(CANDIDATES_PER_SLOT, n))])
+
+        totals = np.zeros([len(p) for p in picks] + [4])
+        penalty = np.zeros([len(p) for p in picks])
+        for i, (slot, idx) in enumerate(zip(MEALS, picks)):
+            shape = [1] * len(MEALS)
+            shape[i] = len(idx)
+            totals = totals + macros[slot][idx].reshape(shape + [4])
+            penalty = penalty + (REPEAT_PENALTY * used[slot][idx]).reshape(shape)
+
+        flat = totals.reshape(-1, 4)
+        scale = np.clip(target[3] / flat[:, 3], MIN_SCALE, MAX_SCALE)
+        error = (((flat * scale[:, None] - target) / target) ** 2 * MACRO_WEIGHTS).sum(axis=1) + penalty.reshape(-1)
+        best = int(np.argmin(error))
+        choice = np.unravel_index(best, penalty.shape)
+        day_scale = float(scale[best])
+
+        meals = []
+        for slot, idx, k in zip(MEALS, picks, choice):
+            index = idx[k]
+            used[slot][index] += 1
+            _, name, _, _, (protein, carbs, fats), items = by_slot[slot][index]
+            protein, carbs, fats = (round(v * day_scale) for v in (protein, carbs, fats))
+            meals.append({
+                "meal": slot,
+                "items": [name] + [_format_item(amount, unit, food, day_scale) for amount, unit, food in items],
+                "protein": protein,
+                "carbs": carbs,
+                "fats": fats,
+                "calories": meal_calories(protein, carbs, fats),
+            })
+        days.append({"day": day + 1, "meals": meals})
+
+    goals = {macro: targets[macro] for macro in ("protein", "carbs", "fats", "calories")}
+    return {"title": title, "goals": goals, "days": days}
+
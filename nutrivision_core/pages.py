@@ -0,0 +1,622 @@
+# pages.py
+# The Streamlit pages shared by every entry point. An entry point only picks
+# the database file, the dashboard chart backend and whether the Rate Diet Plan
+# page is offered, then calls main().
+import time
+
+import streamlit as st
+
+from . import auth, charts, export, images, ledger, llm, metrics, plans, profiles, profiling, settings, storage, tracing, write_behind
+from .food_db import nutrition_markdown
+
+# A memoized profile is read again after this long, so a save from another tab
+# or through the HTTP API reaches the plan pages.
+PROFILE_CACHE_SECONDS = 30
+
+PAGE_STYLE = """
+<style>
+    .block-container {
+        padding-top: 2rem;
+        padding-bottom: 2rem;
+    }
+    .stButton>button {
+        width: 100%;
+    }
+    .stTextInput>div>input {
+        font-size: 16px;
+    }
+    .stSelectbox>div>div {
+        font-size: 16px;
+    }
+</style>
+"""
+
+def home():
+    st.title("Welcome to Nutrivision AI 🥦💪")
+
+    st.markdown("""
+    ### 🧠 Project Vision
+    Nutrivision AI is an innovative health and wellness assistant designed to empower individuals in making informed dietary and fitness choices. Using advanced AI, our platform personalizes meal plans, workout routines, and food quality analysis—all in one place.
+
+    ### 👥 About the Team
+    We are a group of passionate students and developers from University Of Illinois at Chicago working on Nutrivision AI as part of a research-driven capstone. Our goal is to use artificial intelligence to make nutrition accessible, personalized, and fun.
+
+    ### 🚀 Why We Started
+    We realized that many individuals struggle to maintain healthy habits due to a lack of guidance and clarity on what works for their body. We wanted to build a platform that bridges this gap through technology.
+
+    ### 🎯 Our Approach
+    - Personal health profiles
+    - AI-generated diet and workout plans
+    - Image-based food freshness & dish identification
+    - Clean dashboard with visual health insights
+
+    ### 🔐 Get Started
+    Use the menu on the top-left to **Sign Up** or **Login** and begin your personalized journey toward better health!
+    """)
+
+# --- LOGIN EXTENSION: FORGOT PASSWORD ---
+def forgot_password_ui():
+    st.subheader("🔑 Forgot Password")
+    email = st.text_input("Enter your registered email")
+    if st.button("Generate Reset Token"):
+        auth.initiate_password_reset(email)
+
+    with st.expander("Reset Password using Token"):
+        reset_email = st.text_input("Email for password reset")
+        token = st.text_input("Enter your reset token")
+        new_pass = st.text_input("New Password", type="password")
+        confirm_pass = st.text_input("Confirm New Password", type="password")
+        if st.button("Reset Password"):
+            if new_pass != confirm_pass:
+                st.warning("Passwords do not match.")
+            else:
+                auth.reset_password_with_token(reset_email, token, new_pass)
+
+# --- MAIN APP ---
+@st.cache_resource
+def get_metrics_server(port):
+    # One /metrics endpoint per process, shared by every session.
+    return metrics.serve(port)
+
+
+def main(db_path=storage.DEFAULT_DB_PATH, chart_backend="plotly", feedback_page=True):
+    # --- PAGE CONFIG FOR RESPONSIVENESS ---
+    st.set_page_config(page_title="Nutrivision AI", layout="centered")
+    # --- MOBILE FRIENDLY UI TIP ---
+    st.markdown(PAGE_STYLE, unsafe_allow_html=True)
+
+    # A shared database (database_url) takes the place of the entry script's SQLite file.
+    storage.configure(settings.get("database_url", db_path))
+    sessions = auth.sessions()
+    metrics_port = int(settings.get("metrics_port", 0))
+    if metrics_port:
+        get_metrics_server(metrics_port)
+
+    # --- Session Timeout Handling ---
+    # The session token is a bearer credential, so it stays in session_state and
+    # never goes into the URL, where history, shared links, proxy logs and Referer
+    # headers would leak it. Expiry slides with activity.
+    if 'sid' in st.query_params:
+        # Links from before the token left the URL.
+        del st.query_params['sid']
+    token = st.session_state.get('session_token')
+    if token:
+        user_id = sessions.resume(token)
+        if user_id is None:
+            expired = st.session_state.get('logged_in', False)
+            st.session_state.clear()
+            if expired:
+                st.warning("Session expired due to inactivity. Please log in again.")
+                st.stop()
+        else:
+            st.session_state['logged_in'] = True
+            st.session_state['user_id'] = user_id
+            st.session_state['session_token'] = token
+
+    if 'logged_in' not in st.session_state:
+        st.session_state['logged_in'] = False
+    if 'user_id' not in st.session_state:
+        st.session_state['user_id'] = None
+
+    if not st.session_state['logged_in']:
+        home()
+        with st.sidebar:
+            menu = st.radio("Navigate", ["Login", "Sign Up", "Forgot Password"])
+
+            if menu == "Sign Up":
+                st.subheader("Create New Account")
+                email = st.text_input("Email")
+                new_user = st.text_input("Username")
+                new_pass = st.text_input("Password", type='password')
+                if st.button("Sign Up"):
+                    if auth.signup(email, new_user, new_pass):
+                        st.success("Account created successfully! You can now log in.")
+
+            elif menu == "Login":
+                st.subheader("Login to Your Account")
+                identifier = st.text_input("Email or Username")
+                password = st.text_input("Password", type='password')
+                if st.button("Login"):
+                    user = auth.login(identifier, password)
+                    if user:
+                        st.session_state['logged_in'] = True
+                        st.session_state['user_id'] = user[0]
+                        st.session_state['session_token'] = sessions.create(user[0])
+                        st.success(f"Welcome {user[2]}! Redirecting to Dashboard...")
+                        time.sleep(1.2)
+                        st.rerun()
+                    else:
+                        st.warning("Incorrect Username/Email or Password")
+
+            elif menu == "Forgot Password":
+                forgot_password_ui()
+
+        return
+
+    pages = ["Dashboard", "User Profile", "Diet Plan", "Past Diet Plans", "Workout Plan", "Past Workout Plans",
+             "Freshness Checker", "Dish Identifier", "Export My Data"]
+    if feedback_page:
+        pages.append("Rate Diet Plan")
+    page = st.sidebar.selectbox("Go to", pages + ["Logout"])
+    ledger.set_user(st.session_state['user_id'])
+
+    if page == "Dashboard":
+        dashboard(st.session_state['user_id'], chart_backend)
+    elif page == "User Profile":
+        profile_page(st.session_state['user_id'])
+    elif page == "Diet Plan":
+        show_diet_plan(st.session_state['user_id'])
+    elif page == "Past Diet Plans":
+        view_past_diet_plans(st.session_state['user_id'])
+    elif page == "Workout Plan":
+        show_workout_plan(st.session_state['user_id'])
+    elif page == "Past Workout Plans":
+        view_past_workout_plans(st.session_state['user_id'])
+    elif page == "Freshness Checker":
+        analyze_freshness()
+    elif page == "Dish Identifier":
+        identify_dish()
+    elif page == "Rate Diet Plan":
+        rate_diet_plan(st.session_state['user_id'])
+    elif page == "Export My Data":
+        export_page(st.session_state['user_id'])
+    elif page == "Logout":
+        if st.button("Confirm Logout"):
+            sessions.revoke(st.session_state.get('session_token'))
+            st.session_state.clear()
+            st.success("You have been logged out.")
+            time.sleep(1.2)
+            st.rerun()
+
+# --- DASHBOARD ---
+@metrics.timed_page("dashboard")
+@profiling.profiled("dashboard")
+@tracing.traced("page.dashboard")
+def dashboard(user_id, chart_backend="plotly"):
+    write_behind.settle(user_id)
+    st.header("User Summary Dashboard")
+    with tracing.span("db.profile"):
+        row = get_latest_profile(user_id)
+
+    if row:
+        labels = ["Name", "Gender", "Body Type", "Activity Level", "Height", "Weight", "BMI", "Goal", "Weight Loss Rate", "Workout Type", "Gym Focus"]
+        st.subheader("📋 Latest Profile Information")
+        for i, label in enumerate(labels):
+            value = row[i + 1] if row[i + 1] is not None else "N/A"
+            st.markdown(f"**{label}:** {value}")
+
+        # --- Daily Targets (computed locally) ---
+        if row[5] and row[6]:
+            targets = plans.diet_targets(row)
+            st.subheader("🎯 Daily Targets")
+            t1, t2, t3, t4 = st.columns(4)
+            t1.metric("Calories", f"{targets['calories']:.0f} kcal")
+            t2.metric("Protein", f"{targets['protein']:.0f} g")
+            t3.metric("Carbs", f"{targets['carbs']:.0f} g")
+            t4.metric("Fats", f"{targets['fats']:.0f} g")
+            st.caption(f"BMR {targets['bmr']:.0f} kcal · TDEE {targets['tdee']:.0f} kcal")
+
+        # --- BMI Trend Chart ---
+        with tracing.span("db.bmi_history"):
+            data = profiles.bmi_history(user_id)
+        if data:
+            dates, bmis = zip(*data)
+            st.subheader("📈 BMI Trend Over Time")
+            with tracing.span("chart.bmi_trend", backend=chart_backend, points=len(data)):
+                charts.bmi_trend(dates, bmis, chart_backend)
+
+        # --- Activity Level Summary Chart ---
+        with tracing.span("db.activity_levels"):
+            activity_data = profiles.activity_level_counts(user_id)
+        if activity_data:
+            levels, counts = zip(*activity_data)
+            st.subheader("🏃‍♂️ Activity Level Distribution")
+            with tracing.span("chart.activity_levels", backend=chart_backend):
+                charts.activity_levels(levels, counts, chart_backend)
+
+        # --- Summary Cards ---
+        st.subheader("📊 Quick Stats")
+        col1, col2 = st.columns(2)
+        with tracing.span("db.plan_counts"):
+            diet_count, workout_count = storage.plan_counts(user_id)
+        with col1:
+            st.metric(label="Diet Plans Generated", value=diet_count)
+        with col2:
+            st.metric(label="Workout Plans Generated", value=workout_count)
+
+        with tracing.span("db.latest_plan_macros"):
+            avg_calories, avg_protein = storage.latest_plan_averages(user_id)
+        if avg_calories is not None:
+            col3, col4 = st.columns(2)
+            with col3:
+                st.metric(label="Avg Daily Calories (Latest Plan)", value=f"{avg_calories:.0f} kcal")
+            with col4:
+                st.metric(label="Avg Daily Protein (Latest Plan)", value=f"{avg_protein:.0f} g" if avg_protein is not None else "N/A")
+
+    else:
+        st.warning("No profile data available. Please fill out your profile.")
+
+# --- PROFILE & SURVEY ---
+def get_latest_profile(user_id):
+    # Memoized per session for PROFILE_CACHE_SECONDS; profile_page drops the
+    # cached row when it saves a new one.
+    cached = st.session_state.get('profile_cache')
+    if cached and cached[0] == user_id and time.monotonic() - cached[2] < PROFILE_CACHE_SECONDS:
+        return cached[1]
+    row = profiles.latest_profile(user_id)
+    st.session_state['profile_cache'] = (user_id, row, time.monotonic())
+    return row
+
+def get_profile_defaults(profile):
+    if not profile:
+        return {
+            'name': "",
+            'gender': "Male",
+            'body_type': "Ectomorph : Lean Body",
+            'activity': "Low: 1-2 days a week",
+            'height': 0.0,
+            'weight': 0.0,
+            'goal': "Lose Fat",
+            'weight_loss_rate': "0.5 kg/week",
+            'workout_type': "Gym",
+            'gym_focus': "Cardio Heavy"
+        }
+
+    return {
+        'name': profile[1],
+        'gender': profile[2] if profile[2] in profiles.GENDERS else "Male",
+        'body_type': profile[3] if profile[3] in profiles.BODY_TYPES else "Ectomorph : Lean Body",
+        'activity': profile[4] if profile[4] in profiles.ACTIVITY_LEVELS else "Low: 1-2 days a week",
+        'height': profile[5] if profile[5] else 0.0,
+        'weight': profile[6] if profile[6] else 0.0,
+        'goal': profile[8] if profile[8] in profiles.GOALS else "Lose Fat",
+        'weight_loss_rate': profile[9] if profile[9] else "0.5 kg/week",
+        'workout_type': profile[10] if profile[10] in profiles.WORKOUT_TYPES else "Gym",
+        'gym_focus': profile[11] if profile[11] in profiles.GYM_FOCUS else "Cardio Heavy"
+    }
+@metrics.timed_page("profile")
+@profiling.profiled("profile")
+def profile_page(user_id):
+    st.header("User Fitness Profile")
+
+    prev_profile = get_latest_profile(user_id)
+    defaults = get_profile_defaults(prev_profile)
+
+    name = st.text_input("Full Name", value=defaults['name'])
+    gender = st.selectbox("Gender", profiles.GENDERS, index=profiles.GENDERS.index(defaults['gender']))
+    body_type = st.selectbox("Body Type", profiles.BODY_TYPES, index=profiles.BODY_TYPES.index(defaults['body_type']))
+    activity = st.selectbox("Physical Activity Level", profiles.ACTIVITY_LEVELS, index=profiles.ACTIVITY_LEVELS.index(defaults['activity']))
+
+    height = st.number_input("Height (in meters)", min_value=0.0, max_value=3.0, step=0.01, value=defaults['height'])
+    weight = st.number_input("Weight (in kg)", min_value=0.0, max_value=300.0, step=0.5, value=defaults['weight'])
+
+    goal = st.selectbox("Fitness Goal", profiles.GOALS, index=profiles.GOALS.index(defaults['goal']))
+
+    weight_loss_rate = ""
+    if goal == "Lose Fat":
+        weight_loss_rate = st.selectbox("How fast do you want to lose weight?", profiles.LOSS_RATES,
+                                        index=profiles.LOSS_RATES.index(defaults['weight_loss_rate']))
+
+    workout_type = st.selectbox("Preferred Workout Mode", profiles.WORKOUT_TYPES, index=profiles.WORKOUT_TYPES.index(defaults['workout_type']))
+    gym_focus = ""
+    if workout_type == "Gym":
+        gym_focus = st.selectbox("Gym Focus", profiles.GYM_FOCUS, index=profiles.GYM_FOCUS.index(defaults['gym_focus']))
+
+    bmi = profiles.compute_bmi(height, weight)
+    if bmi:
+        st.success(f"Calculated BMI: {bmi}")
+    else:
+        st.warning("Enter valid height and weight to calculate BMI.")
+
+    if st.button("Save Profile"):
+        error = profiles.validate_profile(name, gender, body_type, activity, height, weight, goal, weight_loss_rate, workout_type, gym_focus)
+        if error:
+            st.error(error)
+        else:
+            try:
+                if profiles.save_profile(user_id, name, gender, body_type, activity, height, weight, goal, weight_loss_rate, workout_type, gym_focus):
+                    st.session_state.pop('profile_cache', None)
+                    st.success("Profile saved successfully!")
+                else:
+                    st.info("No changes since your last save.")
+            except Exception as e:
+                st.error("Failed to save profile.")
+                print("Profile DB error:", e)
+
+# --- DIET PLAN PAGE ---
+# The survey pages are fragments: changing one of their widgets reruns only the
+# page, not main() with its session checks and sidebar.
+@st.fragment
+@metrics.timed_page("diet_plan")
+@profiling.profiled("diet_plan")
+@tracing.traced("page.diet_plan")
+def show_diet_plan(user_id):
+    st.header("Personalised Diet Plan")
+
+    st.subheader("📝 Tell us a bit more about your dietary habits")
+
+    diet_type = st.selectbox("What is your dietary type?", [""] + plans.DIET_TYPES)
+    allergens = st.multiselect("Do you have any food allergies?", options=plans.ALLERGENS)
+    other_allergy = st.text_input("Any other allergies not listed above? (Optional)")
+    health_conditions = st.multiselect("Do you have any health conditions that require a specific diet?", options=plans.HEALTH_CONDITIONS)
+    supplements = st.multiselect("Do you consume any of the following supplements?", options=plans.SUPPLEMENTS)
+    answers = plans.diet_answers(diet_type, allergens, other_allergy, health_conditions, supplements)
+
+    if plans.diet_answers_complete(answers):
+        regenerate = st.button("Generate / Regenerate Diet Plan")
+        instant = st.button("⚡ Instant Plan (offline)")
+    else:
+        st.info("Please answer all the questions above to generate your personalized diet plan.")
+        return
+
+    with tracing.span("db.profile"):
+        profile = get_latest_profile(user_id)
+    if not profile:
+        return
+    if not plans.has_valid_bmi(profile):
+        st.warning(plans.LOW_BMI_MESSAGE)
+        return
+
+    profile_hash = plans.diet_profile_hash(profile, answers)
+    if not regenerate and not instant:
+        with tracing.span("db.cached_plan"):
+            existing_plan = plans.cached_diet_plan(user_id, profile_hash)
+        if existing_plan:
+            with tracing.span("render.markdown"):
+                st.markdown(existing_plan)
+                st.download_button("Download Diet Plan", existing_plan, file_name="diet_plan.txt")
+            return
+
+    targets = plans.diet_targets(profile)
+    if instant:
+        try:
+            with tracing.span("plan.instant"):
+                plan, stored, days = plans.instant_diet_plan(profile, answers, targets)
+        except ValueError as e:
+            st.warning(f"{e} Use Generate / Regenerate Diet Plan for a fully personalised plan.")
+            return
+        save_diet_plan(user_id, profile_hash, answers, plan, stored, days)
+        return
+
+    ledger.set_user(user_id)
+    if ledger.over_budget():
+        st.warning(ledger.BUDGET_MESSAGE)
+        return
+    json_mode = llm.plan_output_mode() == "json"
+    with tracing.span("prompt.build"):
+        prompt = plans.diet_prompt(profile, answers, targets, plans.latest_feedback_note(user_id), json_mode)
+    # The budget is checked again before each model call: a retry can cross it.
+    try:
+        with tracing.span("model.generate", json_mode=json_mode):
+            if json_mode:
+                data = llm.generate_structured_plan("diet", plans.DIET_SYSTEM_PROMPT, prompt, max_tokens=plans.DIET_MAX_TOKENS[1])
+            else:
+                plan = stored = llm.generate_text_plan(plans.DIET_SYSTEM_PROMPT, prompt, max_tokens=plans.DIET_MAX_TOKENS[0], site="diet_plan")
+                days = None
+    except ledger.BudgetExceeded:
+        st.warning(ledger.BUDGET_MESSAGE)
+        return
+    if json_mode:
+        if data is None:
+            st.error("Could not generate a valid diet plan. Please try again.")
+            return
+        plan, stored, days = plans.structured_diet_plan(data, targets)
+
+    save_diet_plan(user_id, profile_hash, answers, plan, stored, days)
+
+def save_diet_plan(user_id, profile_hash, answers, plan, stored, days):
+    with tracing.span("render.markdown"):
+        st.markdown(plan)
+        st.download_button("Download Diet Plan", plan, file_name="diet_plan.txt")
+    with tracing.span("db.save_plan"):
+        problems = plans.save_diet_plan(user_id, profile_hash, answers, plan, stored, days)
+    if problems:
+        st.warning("Some sections of this plan did not follow the expected format:\n" + "\n".join(f"- {p}" for p in problems))
+
+@metrics.timed_page("rate_diet_plan")
+@profiling.profiled("rate_diet_plan")
+def rate_diet_plan(user_id):
+    st.header("Rate & Give Feedback on Your Diet Plan")
+
+    row = storage.latest_diet_plan(user_id)
+    if not row:
+        st.warning("No diet plan found. Please generate one first.")
+        return
+    plan = storage.plan_text(row[0], row[1])
+
+    st.subheader("📋 Your Current Plan")
+    st.markdown(plan)
+    st.markdown("---")
+
+    rating = st.slider("Rate this diet plan (1-5 stars):", 1, 5, 3)
+    feedback = st.text_area("Additional feedback (optional):")
+    compliance = st.selectbox("Were you able to follow this plan?", ["Yes", "Partially", "No"])
+
+    if st.button("Submit Feedback"):
+        storage.insert_diet_feedback(user_id, row[1], plan, rating, feedback, compliance)
+        st.success("Thanks for your feedback! Future plans will consider your input.")
+
+# --- Past Plans View with Download ---
+@metrics.timed_page("past_diet_plans")
+@profiling.profiled("past_diet_plans")
+def view_past_diet_plans(user_id):
+    st.subheader("Past Diet Plans")
+    for idx, (date, plan) in enumerate(plans.plan_history("diet_plans", user_id)):
+        with st.expander(f"Diet Plan from {date}"):
+            st.markdown(plan)
+            st.download_button("Download Diet Plan", plan, file_name=f"diet_plan_{idx+1}.txt")
+            
+# --- WORKOUT PLAN PAGE ---
+@st.fragment
+@metrics.timed_page("workout_plan")
+@profiling.profiled("workout_plan")
+@tracing.traced("page.workout_plan")
+def show_workout_plan(user_id):
+    st.header("Personalised Workout Plan")
+
+    # --- Ask user for customization options ---
+    st.subheader("🏋️ Customize Your Workout Preferences")
+
+    time_pref = st.selectbox("When do you prefer to work out?", [""] + plans.WORKOUT_TIMES)
+    duration_pref = st.selectbox("Preferred workout duration:", [""] + plans.WORKOUT_DURATIONS)
+    injuries = st.multiselect("Any physical limitations/injuries:", plans.INJURIES)
+    equipment = st.multiselect("🏋️ What equipment do you have access to?", plans.EQUIPMENT)
+    prefs = plans.workout_preferences(time_pref, duration_pref, injuries, equipment)
+
+    if not plans.workout_preferences_complete(prefs):
+        st.info("Please complete all workout preferences to proceed.")
+        return
+
+    regenerate = st.button("Generate / Regenerate Workout Plan")
+
+    if not regenerate:
+        with tracing.span("db.recent_plan"):
+            existing_plan = plans.recent_workout_plan(user_id)
+        if existing_plan:
+            with tracing.span("render.markdown"):
+                st.markdown(existing_plan)
+                st.download_button("Download Workout Plan", existing_plan, file_name=f"workout_plan.txt")
+            return
+
+    with tracing.span("db.profile"):
+        profile = get_latest_profile(user_id)
+    if not profile:
+        st.warning("No profile data found. Please fill out your profile first.")
+        return
+    if not plans.has_valid_bmi(profile):
+        st.warning(plans.LOW_BMI_MESSAGE)
+        return
+
+    ledger.set_user(user_id)
+    if ledger.over_budget():
+        st.warning(ledger.BUDGET_MESSAGE)
+        return
+    json_mode = llm.plan_output_mode() == "json"
+    with tracing.span("prompt.build"):
+        prompt = plans.workout_prompt(profile, prefs, json_mode)
+    try:
+        with tracing.span("model.generate", json_mode=json_mode):
+            if json_mode:
+                data = llm.generate_structured_plan("workout", plans.WORKOUT_SYSTEM_PROMPT, prompt, max_tokens=plans.WORKOUT_MAX_TOKENS[1])
+            else:
+                plan = stored = llm.generate_text_plan(plans.WORKOUT_SYSTEM_PROMPT, prompt, max_tokens=plans.WORKOUT_MAX_TOKENS[0], site="workout_plan")
+    except ledger.BudgetExceeded:
+        st.warning(ledger.BUDGET_MESSAGE)
+        return
+    if json_mode:
+        if data is None:
+            st.error("Could not generate a valid workout plan. Please try again.")
+            return
+        plan, stored = plans.structured_workout_plan(data)
+
+    with tracing.span("render.markdown"):
+        st.markdown(plan)
+        st.download_button("Download Workout Plan", plan, file_name=f"workout_plan.txt")
+    with tracing.span("db.save_plan"):
+        plans.save_workout_plan(user_id, stored)
+
+@metrics.timed_page("past_workout_plans")
+@profiling.profiled("past_workout_plans")
+def view_past_workout_plans(user_id):
+    st.subheader("Past Workout Plans")
+    for idx, (date, plan) in enumerate(plans.plan_history("workout_plans", user_id)):
+        with st.expander(f"Workout Plan from {date}"):
+            st.markdown(plan)
+            st.download_button("Download Workout Plan", plan, file_name=f"workout_plan_{idx+1}.txt")
+            
+# --- DATA EXPORT ---
+# The archive is built when the button is clicked, on Streamlit's download
+# thread, not on every rerun of the page. The rows stream into a temporary
+# file; only the finished (compressed) archive is handed to Streamlit to serve.
+@metrics.timed_page("export")
+@profiling.profiled("export")
+def export_page(user_id):
+    st.subheader("Export My Data")
+    st.write("Download your profiles, BMI history, diet and workout plans and feedback as a zip archive with one file per table.")
+    fmt = st.selectbox("Format", export.FORMATS, format_func=lambda f: {"csv": "CSV", "jsonl": "JSON Lines", "parquet": "Parquet"}[f])
+
+    def archive():
+        with export.user_archive(user_id, fmt) as f:
+            return f.read()
+
+    st.download_button("Download My Data", data=archive, file_name=f"nutrivision_export_{fmt}.zip",
+                       mime="application/zip", on_click="ignore")
+
+# --- IMAGE FRESHNESS ANALYSIS ---
+@metrics.timed_page("freshness")
+@profiling.profiled("freshness")
+@tracing.traced("page.freshness")
+def analyze_freshness():
+    st.header("Check Freshness of Fruits/Vegetables")
+    uploaded_file = st.file_uploader("Upload Image", type=['jpg', 'jpeg', 'png'])
+    if uploaded_file:
+        with tracing.span("image.validate", bytes=uploaded_file.size):
+            image = images.validate_image(uploaded_file)
+        if image is None:
+            return
+        st.image(image, caption='Uploaded Image', width=250)
+        if ledger.over_budget():
+            st.warning(ledger.BUDGET_MESSAGE)
+            return
+        try:
+            with tracing.span("model.freshness"):
+                assessment = images.assess_freshness(image)
+        except ledger.BudgetExceeded:
+            st.warning(ledger.BUDGET_MESSAGE)
+            return
+        st.markdown(assessment)
+
+# --- DISH IDENTIFICATION ---
+@metrics.timed_page("dish")
+@profiling.profiled("dish")
+@tracing.traced("page.dish")
+def identify_dish():
+    st.header("Identify Dish and Nutritional Value")
+    uploaded_file = st.file_uploader("Upload Dish Image", type=['jpg', 'jpeg', 'png'])
+    if uploaded_file:
+        with tracing.span("image.validate", bytes=uploaded_file.size):
+            image = images.validate_image(uploaded_file)
+        if image is None:
+            return
+        st.image(image, caption='Dish Image', width=250)
+        if ledger.over_budget():
+            st.warning(ledger.BUDGET_MESSAGE)
+            return
+
+        # The identification call itself can use up the day's budget, so the
+        # follow-up estimate may be refused.
+        try:
+            with tracing.span("dish.identify") as span:
+                dish = images.identify_dish_name(image, uploaded_file.getvalue())
+                span.set(dish=dish)
+            with tracing.span("dish.nutrition") as span:
+                entry, source = images.dish_nutrition(dish)
+                span.set(source=source)
+        except ledger.BudgetExceeded:
+            st.warning(ledger.BUDGET_MESSAGE)
+            return
+        if entry is None:
+            st.markdown(f"**Dish:** {dish}")
+            st.warning("Could not estimate the nutritional value of this dish.")
+            return
+        st.markdown(nutrition_markdown(dish, entry, source))
@@ -0,0 +1,124 @@
+# plan_parser.py
+# Turns the markdown diet plans generated by show_diet_plan into day / meal rows
+# with numeric macros. The plan is read line by line, so nothing but the current
+# day and meal is held in memory.
+import re
+
+MEALS = ["Breakfast", "Morning Snack", "Lunch", "Evening Snack", "Dinner"]
+MACROS = ["protein", "carbs", "fats", "calories"]
+PLAN_DAYS = 7
+
+DAY_RE = re.compile(r"^\s*(?:#{1,6}\s*|\*\*\s*)?Day\s+(\d+)\b", re.IGNORECASE)
+MEAL_RE = re.compile(r"^\s*(?:#{1,6}\s*|[-*]\s*)?\**\s*(" + "|".join(MEALS) + r")\b", re.IGNORECASE)
+TOTALS_RE = re.compile(r"daily\s+totals?", re.IGNORECASE)
+MACRO_RE = re.compile(
+    r"\b(protein|carbs|carbohydrates|fats?|calories)\**\s*[:\-]?\s*\**\s*(?:~|approx\.?\s*|about\s*)?(\d+(?:\.\d+)?)",
+    re.IGNORECASE,
+)
+KCAL_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:kcal|calories)\b", re.IGNORECASE)
+BULLET_RE = re.compile(r"^\s*(?:[-*+]|\d+\.)\s*")
+
+MACRO_ALIASES = {"protein": "protein", "carbs": "carbs", "carbohydrates": "carbs",
+                 "fat": "fats", "fats": "fats", "calories": "calories"}
+
+
+def parse_macros(line):
+    values = {}
+    for name, value in MACRO_RE.findall(line):
+        values[MACRO_ALIASES[name.lower()]] = float(value)
+    if "calories" not in values:
+        kcal = KCAL_RE.search(line)
+        if kcal:
+            values["calories"] = float(kcal.group(1))
+    return values
+
+
+def _new_meal(name, position):
+    meal = {"meal": name, "position": position, "items": []}
+    meal.update({macro: None for macro in MACROS})
+    return meal
+
+
+def parse_diet_plan(lines):
+    # Accepts the plan text or any iterable of lines (e.g. a streamed response).
+    # Returns (days, problems): days is a list of
+    #   {"day", "meals": [{"meal", "position", "items", macros...}], "totals": {macros}}
+    # and problems lists every section that did not match the expected structure.
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    days, problems = [], []
+    day = meal = None
+    in_totals = False
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        day_match = DAY_RE.match(line)
+        if day_match:
+            day = {"day": int(day_match.group(1)), "meals": [], "totals": {}}
+            days.append(day)
+            meal, in_totals = None, False
+            continue
+        if day is None:
+            continue
+
+        if TOTALS_RE.search(line):
+            meal, in_totals = None, True
+            day["totals"].update(parse_macros(line))
+            continue
+
+        meal_match = MEAL_RE.match(line)
+        if meal_match:
+            name = next(m for m in MEALS if m.lower() == meal_match.group(1).lower())
+            meal = _new_meal(name, len(day["meals"]) + 1)
+            day["meals"].append(meal)
+            in_totals = False
+            line = line[meal_match.end():]
+
+        macros = parse_macros(line)
+        if in_totals:
+            day["totals"].update(macros)
+        elif meal is not None:
+            if macros:
+                for key, value in macros.items():
+                    if meal[key] is None:
+                        meal[key] = value
+            else:
+                item = BULLET_RE.sub("", line).strip(" *:")
+                if item:
+                    meal["items"].append(item)
+
+    for day in days:
+        for meal in day["meals"]:
+            meal["items"] = "\n".join(meal["items"])
+    problems.extend(check_plan(days))
+    return days, problems
+
+
+def check_plan(days):
+    problems = []
+    seen = [d["day"] for d in days]
+    if not days:
+        return ["No 'Day N' sections found."]
+    for n in range(1, PLAN_DAYS + 1):
+        if n not in seen:
+            problems.append(f"Day {n} is missing.")
+    for n in sorted(set(seen)):
+        if seen.count(n) > 1:
+            problems.append(f"Day {n} appears {seen.count(n)} times.")
+
+    for day in days:
+        names = [m["meal"] for m in day["meals"]]
+        for name in MEALS:
+            if name not in names:
+                problems.append(f"Day {day['day']}: {name} is missing.")
+        for meal in day["meals"]:
+            missing = [macro for macro in MACROS if meal[macro] is None]
+            if missing:
+                problems.append(f"Day {day['day']} {meal['meal']}: no value for {', '.join(missing)}.")
+        missing_totals = [macro for macro in MACROS if macro not in day["totals"]]
+        if missing_totals:
+            problems.append(f"Day {day['day']}: Daily Totals missing {', '.join(missing_totals)}.")
+    return problems
@@ -0,0 +1,226 @@
+# plan_schema.py
+# JSON output mode for diet and workout plans: the schemas sent to the model,
+# validation of what comes back, and local markdown rendering in the same
+# layout the markdown prompts ask for.
+import json
+
+from .plan_parser import MEALS, MACROS, PLAN_DAYS
+
+_MACRO_PROPS = {macro: {"type": "number"} for macro in MACROS}
+
+DIET_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["title", "goals", "days"],
+    "properties": {
+        "title": {"type": "string"},
+        "goals": {"type": "object", "additionalProperties": False, "required": MACROS, "properties": _MACRO_PROPS},
+        "days": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["day", "meals"],
+                "properties": {
+                    "day": {"type": "integer"},
+                    "meals": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "additionalProperties": False,
+                            "required": ["meal", "items"] + MACROS,
+                            "properties": dict(
+                                meal={"type": "string", "enum": MEALS},
+                                items={"type": "array", "items": {"type": "string"}},
+                                **_MACRO_PROPS,
+                            ),
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+WORKOUT_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["title", "days"],
+    "properties": {
+        "title": {"type": "string"},
+        "days": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["day", "focus", "rest", "warmup", "exercises", "cooldown"],
+                "properties": {
+                    "day": {"type": "integer"},
+                    "focus": {"type": "string"},
+                    "rest": {"type": "boolean"},
+                    "warmup": {"type": "string"},
+                    "exercises": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "additionalProperties": False,
+                            "required": ["name", "sets", "reps"],
+                            "properties": {
+                                "name": {"type": "string"},
+                                "sets": {"type": "integer"},
+                                "reps": {"type": "string"},
+                            },
+                        },
+                    },
+                    "cooldown": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+
+SCHEMAS = {"diet": DIET_SCHEMA, "workout": WORKOUT_SCHEMA}
+
+
+def response_format(kind):
+    return {"type": "json_schema", "json_schema": {"name": f"{kind}_plan", "strict": True, "schema": SCHEMAS[kind]}}
+
+
+# --- VALIDATION ---
+def _check_type(value, schema, path, errors):
+    expected = schema["type"]
+    if expected == "object":
+        if not isinstance(value, dict):
+            errors.append(f"{path} must be an object.")
+            return
+        for key in schema["required"]:
+            if key not in value:
+                errors.append(f"{path}.{key} is missing.")
+        for key, item in value.items():
+            if key not in schema["properties"]:
+                errors.append(f"{path}.{key} is not allowed.")
+            else:
+                _check_type(item, schema["properties"][key], f"{path}.{key}", errors)
+    elif expected == "array":
+        if not isinstance(value, list):
+            errors.append(f"{path} must be an array.")
+            return
+        for i, item in enumerate(value):
+            _check_type(item, schema["items"], f"{path}[{i}]", errors)
+    elif expected == "string":
+        if not isinstance(value, str):
+            errors.append(f"{path} must be a string.")
+        elif "enum" in schema and value not in schema["enum"]:
+            errors.append(f"{path} must be one of {', '.join(schema['enum'])}.")
+    elif expected == "boolean":
+        if not isinstance(value, bool):
+            errors.append(f"{path} must be true or false.")
+    elif expected == "integer":
+        if isinstance(value, bool) or not isinstance(value, int):
+            errors.append(f"{path} must be an integer.")
+    elif expected == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{path} must be a number.")
+        elif value < 0:
+            errors.append(f"{path} must not be negative.")
+
+
+def validate_plan(kind, data):
+    errors = []
+    _check_type(data, SCHEMAS[kind], "plan", errors)
+    if errors:
+        return errors
+
+    numbers = [d["day"] for d in data["days"]]
+    if numbers != list(range(1, PLAN_DAYS + 1)):
+        errors.append(f"plan.days must cover Day 1 to Day {PLAN_DAYS} in order (got {numbers}).")
+
+    for i, day in enumerate(data["days"]):
+        if kind == "diet":
+            meals = [m["meal"] for m in day["meals"]]
+            if meals != MEALS:
+                errors.append(f"plan.days[{i}].meals must be {', '.join(MEALS)} in that order (got {', '.join(meals) or 'none'}).")
+            for j, meal in enumerate(day["meals"]):
+                if not meal["items"]:
+                    errors.append(f"plan.days[{i}].meals[{j}].items must list at least one food item.")
+        else:
+            if not day["rest"] and not day["exercises"]:
+                errors.append(f"plan.days[{i}] is not a rest day but has no exercises.")
+            if not day["cooldown"].strip():
+                errors.append(f"plan.days[{i}].cooldown must not be empty.")
+    return errors
+
+
+def parse_plan_json(kind, content):
+    # Returns (data, errors); data is None when the content is unusable.
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError) as e:
+        return None, [f"Response is not valid JSON: {e}"]
+    errors = validate_plan(kind, data)
+    return (None if errors else data), errors
+
+
+def dump_plan(kind, data):
+    return json.dumps(dict(kind=kind, **data), separators=(",", ":"), ensure_ascii=False)
+
+
+# --- RENDERING ---
+def _fmt(value):
+    return f"{value:g}"
+
+
+def day_totals(day):
+    return {macro: sum(meal[macro] for meal in day["meals"]) for macro in MACROS}
+
+
+def render_diet_markdown(data):
+    goals = data["goals"]
+    lines = [f"# {data['title']}", "", "## Daily Nutritional Goals",
+             f"- **Calories:** {_fmt(goals['calories'])} kcal",
+             f"- **Protein:** {_fmt(goals['protein'])} g",
+             f"- **Carbs:** {_fmt(goals['carbs'])} g",
+             f"- **Fats:** {_fmt(goals['fats'])} g", ""]
+    for day in data["days"]:
+        lines += [f"### Day {day['day']}", ""]
+        for meal in day["meals"]:
+            lines.append(f"**{meal['meal']}**")
+            lines += [f"- {item}" for item in meal["items"]]
+            lines.append(f"- Protein: {_fmt(meal['protein'])}g, Carbs: {_fmt(meal['carbs'])}g, Fats: {_fmt(meal['fats'])}g")
+            lines += [f"- Calories: {_fmt(meal['calories'])} kcal", ""]
+        totals = day_totals(day)
+        lines += [f"**Daily Totals**: Protein: {_fmt(totals['protein'])}g, Carbs: {_fmt(totals['carbs'])}g, "
+                  f"Fats: {_fmt(totals['fats'])}g, Calories: {_fmt(totals['calories'])} kcal", ""]
+    return "\n".join(lines)
+
+
+def render_workout_markdown(data):
+    lines = [f"# {data['title']}", ""]
+    for day in data["days"]:
+        lines += [f"### Day {day['day']}: {day['focus']}"]
+        if day["rest"] and not day["exercises"]:
+            lines.append("- Rest Day")
+        if day["warmup"]:
+            lines.append(f"- Warm-up: {day['warmup']}")
+        for i, exercise in enumerate(day["exercises"], 1):
+            lines.append(f"- Exercise {i}: {exercise['name']} — {exercise['sets']} x {exercise['reps']}")
+        lines += [f"- Cooldown: {day['cooldown']}", ""]
+    return "\n".join(lines)
+
+
+def diet_days(data):
+    # Same shape as plan_parser.parse_diet_plan, built straight from validated JSON.
+    return [{"day": day["day"],
+             "meals": [dict(position=i, items="\n".join(meal["items"]), **{k: meal[k] for k in ["meal"] + MACROS})
+                       for i, meal in enumerate(day["meals"], 1)],
+             "totals": day_totals(day)}
+            for day in data["days"]]
+
+
+def render_stored_plan(text):
+    # Plans generated in JSON mode are stored as compact JSON; everything else is markdown.
+    if not text or not text.startswith('{"kind":'):
+        return text
+    data = json.loads(text)
+    kind = data.pop("kind")
+    return render_diet_markdown(data) if kind == "diet" else render_workout_markdown(data)
@@ -0,0 +1,214 @@
+# plans.py
+# Diet and workout plans without any UI: the survey options, prompts, the
+# cached-plan lookups, offline plans and persistence. The Streamlit pages and
+# the HTTP API both build on these; only the model call differs between them.
+import hashlib
+import datetime
+
+from . import metrics, storage, write_behind
+from .offline_planner import assemble_diet_plan
+from .nutrition_targets import compute_targets, targets_prompt
+from .plan_schema import dump_plan, render_diet_markdown, render_workout_markdown, diet_days
+
+DIET_TYPES = ["Vegetarian", "Eggetarian", "Non-Vegetarian", "Vegan"]
+ALLERGENS = ["Dairy", "Gluten", "Peanuts", "Tree nuts", "Soy", "Shellfish", "Eggs", "None"]
+HEALTH_CONDITIONS = ["Diabetes", "Thyroid", "Hypertension", "Celiac Disease", "PCOS", "High Cholesterol", "Gout", "None"]
+SUPPLEMENTS = ["Protein Shakes", "Multivitamins", "Omega-3", "Creatine", "Iron Supplements", "None"]
+WORKOUT_TIMES = ["Morning", "Afternoon", "Evening", "Night"]
+WORKOUT_DURATIONS = ["20 mins", "30 mins", "45 mins", "1 hour", "90 mins", "2 hours"]
+INJURIES = ["Knee pain", "Back issues", "Shoulder injury", "Limited mobility", "None"]
+EQUIPMENT = [
+    "No Equipment / Bodyweight",
+    "Dumbbells",
+    "Barbell",
+    "Kettlebells",
+    "Resistance Bands",
+    "Treadmill",
+    "Stationary Bike",
+    "Rowing Machine",
+    "Pull-Up Bar",
+    "Jump Rope",
+    "Yoga Mat / Blocks",
+    "Foam Roller",
+    "Bench / Box",
+    "Cable Machine",
+    "Smith Machine",
+    "Leg Press Machine",
+    "Medicine Ball / Slam Ball"
+]
+
+DIET_SYSTEM_PROMPT = "You are a certified dietitian and nutrition expert helping users make safe, balanced diet plans."
+WORKOUT_SYSTEM_PROMPT = "You are a professional fitness coach."
+# (markdown mode, JSON mode)
+DIET_MAX_TOKENS = (2000, 1500)
+WORKOUT_MAX_TOKENS = (1500, 1200)
+# A stored workout plan is shown again instead of generating a new one for this long.
+WORKOUT_PLAN_MAX_AGE_DAYS = 14
+LOW_BMI_MESSAGE = "BMI value is too low or missing. Please update your profile with valid height and weight."
+
+
+def diet_answers(diet_type, allergens, other_allergy, health_conditions, supplements):
+    return {"diet_type": diet_type, "allergens": list(allergens), "other_allergy": other_allergy or "",
+            "health_conditions": list(health_conditions), "supplements": list(supplements)}
+
+
+def diet_answers_complete(answers):
+    return bool(answers["diet_type"] and (answers["allergens"] or answers["other_allergy"])
+                and answers["health_conditions"] and answers["supplements"])
+
+
+def workout_preferences(time_pref, duration_pref, injuries, equipment):
+    return {"time_pref": time_pref, "duration_pref": duration_pref, "injuries": list(injuries), "equipment": list(equipment)}
+
+
+def workout_preferences_complete(prefs):
+    return bool(prefs["time_pref"] and prefs["duration_pref"] and prefs["equipment"])
+
+
+def has_valid_bmi(profile):
+    # profile is a profiles row
+    return bool(profile[7]) and profile[7] >= 10
+
+
+# --- DIET PLANS ---
+def diet_profile_hash(profile, answers):
+    # Plans are cached per profile and answer set.
+    row = (profile[2], profile[3], profile[4], profile[7], profile[8], profile[9])
+    profile_str = (''.join(map(str, row)) + answers["diet_type"] + ''.join(answers["allergens"]) + answers["other_allergy"]
+                   + ''.join(answers["health_conditions"]) + ''.join(answers["supplements"]))
+    return hashlib.md5(profile_str.encode()).hexdigest()
+
+
+def cached_diet_plan(user_id, profile_hash):
+    existing = storage.connection().execute('SELECT plan, blob_id FROM diet_plans WHERE user_id=? AND profile_hash=? ORDER BY rowid DESC LIMIT 1',
+                                            (user_id, profile_hash)).fetchone()
+    metrics.cache_lookup("diet_profile_hash", existing is not None)
+    return storage.plan_text(*existing) if existing else None
+
+
+def diet_targets(profile):
+    return compute_targets(profile[2], profile[3], profile[4], profile[5], profile[6], profile[8], profile[9])
+
+
+def instant_diet_plan(profile, answers, targets):
+    # Raises ValueError when the meal library cannot cover the answers.
+    data = assemble_diet_plan(targets, answers["diet_type"], answers["allergens"], answers["other_allergy"], answers["health_conditions"],
+                              title=f"7-Day Diet Plan for {profile[2]} {profile[3]}")
+    return render_diet_markdown(data), dump_plan("diet", data), diet_days(data)
+
+
+def structured_diet_plan(data, targets):
+    # (plan markdown, stored text, day rows) for a validated JSON diet plan.
+    data["goals"] = {macro: targets[macro] for macro in ("protein", "carbs", "fats", "calories")}
+    return render_diet_markdown(data), dump_plan("diet", data), diet_days(data)
+
+
+def latest_feedback_note(user_id):
+    write_behind.settle(user_id)
+    row = storage.connection().execute('SELECT rating, feedback, compliance FROM diet_feedback WHERE user_id=? ORDER BY created_at DESC LIMIT 1',
+                                       (user_id,)).fetchone()
+    return f"User previously rated the plan {row[0]}/5, compliance: {row[2]}. Feedback: {row[1]}" if row else ""
+
+
+def diet_prompt(profile, answers, targets, feedback_note, json_mode):
+    gender, body_type, activity, bmi, goal, weight_loss_rate = profile[2], profile[3], profile[4], profile[7], profile[8], profile[9]
+    diet_type, allergens, other_allergy = answers["diet_type"], answers["allergens"], answers["other_allergy"]
+    health_conditions, supplements = answers["health_conditions"], answers["supplements"]
+    if json_mode:
+        structure = "Return the plan as JSON matching the provided schema: a title, the daily nutritional goals, and Day 1 to Day 7 with Breakfast, Morning Snack, Lunch, Evening Snack and Dinner each day. List food items with quantities, briefly."
+    else:
+        structure = """Follow this fixed structure strictly:
+        1. Start with a header: "7-Day Diet Plan for [Gender] [Body Type]"
+        2. Include "Daily Nutritional Goals" and macronutrient breakdown
+        3. For each Day (Day 1 to Day 7), include the following sections:
+           - **Breakfast**, **Morning Snack**, **Lunch**, **Evening Snack**, **Dinner**
+           - Under each, include:
+               - Food items with quantities
+               - Macronutrients: Protein, Carbs, Fats
+               - Calories
+        4. End each day with:
+           - **Daily Totals**: Total Protein, Carbs, Fats, Calories
+        5. Use Markdown formatting (### Day X, **Meal Title**, etc.)
+
+        Do not skip or reorder any parts. Always use consistent formatting, structure, and language across all days."""
+
+    extra_note = f"The user wishes to lose weight at a rate of {weight_loss_rate}." if goal == "Lose Fat" and weight_loss_rate else ""
+
+    return f"""
+        Create a personalized 7-day diet plan for a {diet_type} {gender} {body_type} individual with a physical activity level of {activity}, a BMI of {bmi}, and a goal to {goal.lower()}.
+        {extra_note}
+        {targets_prompt(targets)}
+        {feedback_note}
+
+        Additional considerations:
+        - Allergies: {', '.join(allergens + [other_allergy]) if allergens or other_allergy else "None"}
+        - Health Conditions: {', '.join(health_conditions) if health_conditions else "None"}
+        - Supplements: {', '.join(supplements) if supplements else "None"}
+
+        {structure}
+        """
+
+
+def save_diet_plan(user_id, profile_hash, answers, plan, stored, days):
+    # Returns the format problems found while parsing the plan.
+    return storage.insert_diet_plan(user_id, profile_hash, plan, stored, days, answers["diet_type"], answers["allergens"],
+                                    answers["other_allergy"], answers["health_conditions"], answers["supplements"])
+
+
+# --- WORKOUT PLANS ---
+def recent_workout_plan(user_id, now=None):
+    existing = storage.connection().execute('SELECT plan, blob_id, created_at FROM workout_plans WHERE user_id=? ORDER BY created_at DESC LIMIT 1',
+                                            (user_id,)).fetchone()
+    fresh = existing is not None and ((now or datetime.datetime.now()) - datetime.datetime.strptime(existing[2], "%Y-%m-%d %H:%M:%S.%f")).days < WORKOUT_PLAN_MAX_AGE_DAYS
+    metrics.cache_lookup("workout_recent", fresh)
+    return storage.plan_text(existing[0], existing[1]) if fresh else None
+
+
+def workout_prompt(profile, prefs, json_mode):
+    gender, activity, goal, workout_type, gym_focus = profile[2], profile[4], profile[8], profile[10], profile[11]
+    if json_mode:
+        structure = "Return the plan as JSON matching the provided schema, with Day 1 to Day 7. Mark rest days with rest=true. Always give a cooldown suggestion."
+    else:
+        structure = """Follow this fixed structure strictly:
+        Day 1: Muscle Group
+        - Warm-up: ...
+        - Exercise 1: Name — Sets x Reps
+        - Exercise 2: ...
+        - Cooldown: ...
+
+        Repeat for Day 2 through Day 7. Clearly separate days. Add rest days as needed. Always end each day with a cooldown suggestion."""
+
+    gym_note = f"The user works out at a gym with a preference for {gym_focus.lower()} training." if workout_type == "Gym" else "The user does bodyweight workouts."
+
+    return f"""
+        You are a professional fitness coach. Design a weekly workout plan in a structured format.
+
+        User Details:
+        - Gender: {gender}
+        - Workout Type: {workout_type}
+        - Goal: {goal}
+        - Activity Level: {activity}
+        - Preferred Workout Time: {prefs['time_pref']}
+        - Preferred Session Duration: {prefs['duration_pref']}
+        - Physical Limitations: {', '.join(prefs['injuries']) if prefs['injuries'] else 'None'}
+        - Equipment Available: {', '.join(prefs['equipment'])}
+        {gym_note}
+
+        {structure}
+        """
+
+
+def structured_workout_plan(data):
+    return render_workout_markdown(data), dump_plan("workout", data)
+
+
+def save_workout_plan(user_id, stored):
+    storage.insert_workout_plan(user_id, stored)
+
+
+# --- HISTORY ---
+def plan_history(table, user_id, limit=None):
+    # [(created_at, plan text)], newest first. table: diet_plans or workout_plans.
+    sql = f'SELECT plan, blob_id, created_at FROM {table} WHERE user_id=? ORDER BY created_at DESC'
+    rows = storage.connection().execute(sql + (' LIMIT ?' if limit else ''), (user_id, limit) if limit else (user_id,)).fetchall()
+    return [(date, storage.plan_text(plan, blob_id)) for plan, blob_id, date in rows]
@@ -0,0 +1,227 @@
+# profile_history.py
+# Compact BMI and weight history. Every saved profile also adds to a bucket in
+# profile_series: sums and counts of BMI and weight, and the number of saves,
+# per user, period and activity level. The dashboard's trend and activity
+# charts read these buckets instead of scanning every profiles row.
+#
+# Retention: buckets start daily; daily buckets older than DAILY_DAYS are
+# merged into weekly ones and weekly buckets older than WEEKLY_DAYS into
+# monthly ones. Raw profiles rows are kept unless profile_raw_days is set
+# (default 0: never delete): then rows older than that many days are deleted,
+# except each user's latest, which the pages use as the current profile. Deleted
+# rows are gone for good, including from the "Export My Data" archive; only
+# their buckets remain. compact() runs on a background thread at most every
+# profile_compact_hours (default 6, 0: only from the command line) and commits a
+# batch of users at a time, so the write lock is never held for long.
+#
+#   python -m nutrivision_core.profile_history [db]   compact now and show the table
+import sys
+import time
+import sqlite3
+import datetime
+import threading
+
+from . import settings
+
+DAILY_DAYS = 90
+WEEKLY_DAYS = 365
+COMPACT_BATCH = 200
+COMPACT_LOCK_ID = 7422
+
+_last_compact = 0.0
+_compact_lock = threading.Lock()
+
+UPSERT = '''INSERT INTO profile_series (user_id, period, period_start, activity_level, samples, bmi_sum, bmi_count, weight_sum, weight_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, period, period_start, activity_level) DO UPDATE SET
+        samples = profile_series.samples + excluded.samples,
+        bmi_sum = profile_series.bmi_sum + excluded.bmi_sum,
+        bmi_count = profile_series.bmi_count + excluded.bmi_count,
+        weight_sum = profile_series.weight_sum + excluded.weight_sum,
+        weight_count = profile_series.weight_count + excluded.weight_count'''
+
+
+def ensure_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS profile_series (
+        user_id INTEGER,
+        period TEXT,
+        period_start TEXT,
+        activity_level TEXT,
+        samples INTEGER,
+        bmi_sum REAL,
+        bmi_count INTEGER,
+        weight_sum REAL,
+        weight_count INTEGER,
+        PRIMARY KEY (user_id, period, period_start, activity_level)
+    )''')
+
+
+def bucket(period, start, today):
+    # The (period, start date) a bucket belongs in at this age.
+    age = (today - start).days
+    if age >= WEEKLY_DAYS:
+        return "month", start.replace(day=1)
+    if age >= DAILY_DAYS and period == "day":
+        return "week", start - datetime.timedelta(days=start.weekday())
+    return period, start
+
+
+def raw_days():
+    # Days raw profiles rows are kept; 0 keeps them all.
+    return int(settings.get("profile_raw_days", 0))
+
+
+def _today():
+    # created_at defaults to UTC, so days are UTC days.
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def sample(user_id, activity_level, bmi, weight):
+    # The statement and parameters that add one saved profile to today's bucket.
+    return UPSERT, (user_id, "day", _today().isoformat(), activity_level or "", 1,
+                    bmi or 0, int(bmi is not None), weight or 0, int(weight is not None))
+
+
+def _merge(rows, today):
+    # rows: (user_id, period, period_start, activity_level, samples, bmi_sum, bmi_count, weight_sum, weight_count)
+    merged = {}
+    for user_id, period, start, activity, *sums in rows:
+        period, start = bucket(period, datetime.date.fromisoformat(str(start)[:10]), today)
+        key = (user_id, period, start.isoformat(), activity)
+        merged[key] = [a + b for a, b in zip(merged[key], sums)] if key in merged else list(sums)
+    return [key + tuple(sums) for key, sums in merged.items()]
+
+
+def _begin(conn):
+    # Another process must not read the same rows before this one has replaced
+    # them. (On PostgreSQL the callers hold an advisory lock instead.)
+    if isinstance(conn, sqlite3.Connection):
+        conn.execute('BEGIN IMMEDIATE')
+
+
+def backfill(conn):
+    # Fills an empty series from the profiles rows already stored.
+    _begin(conn)
+    if conn.execute('SELECT 1 FROM profile_series LIMIT 1').fetchone():
+        conn.rollback()
+        return 0
+    rows = [(user_id, "day", created_at, activity or "", 1, bmi or 0, int(bmi is not None), weight or 0, int(weight is not None))
+            for user_id, created_at, activity, bmi, weight in
+            conn.execute('SELECT user_id, created_at, activity_level, bmi, weight FROM profiles WHERE created_at IS NOT NULL')]
+    buckets = _merge(rows, _today())
+    conn.executemany(UPSERT, buckets)
+    conn.commit()
+    return len(buckets)
+
+
+# --- QUERIES ---
+def bmi_trend(conn, user_id):
+    # [(period start, average BMI)], oldest first, rounded like a saved BMI.
+    rows = conn.execute('''SELECT period_start, SUM(bmi_sum) / SUM(bmi_count) FROM profile_series
+        WHERE user_id=? AND bmi_count > 0 GROUP BY period_start ORDER BY period_start''', (user_id,)).fetchall()
+    return [(start, round(bmi, 2)) for start, bmi in rows]
+
+
+def activity_counts(conn, user_id):
+    # [(activity level, saves)].
+    return conn.execute('SELECT activity_level, SUM(samples) FROM profile_series WHERE user_id=? GROUP BY activity_level',
+                        (user_id,)).fetchall()
+
+
+# --- COMPACTION ---
+def compact_users(conn, user_ids, today, keep_days=0):
+    # Merges the users' aged buckets and, when keep_days is set, drops their
+    # raw rows older than that; returns (buckets merged, rows deleted).
+    day_cutoff = (today - datetime.timedelta(days=DAILY_DAYS)).isoformat()
+    week_cutoff = (today - datetime.timedelta(days=WEEKLY_DAYS)).isoformat()
+    marks = ",".join("?" * len(user_ids))
+    _begin(conn)
+    try:
+        aged = conn.execute(f'''SELECT user_id, period, period_start, activity_level, samples, bmi_sum, bmi_count, weight_sum, weight_count
+            FROM profile_series WHERE user_id IN ({marks})
+            AND ((period = 'day' AND period_start < ?) OR (period = 'week' AND period_start < ?))''',
+                            (*user_ids, day_cutoff, week_cutoff)).fetchall()
+        conn.executemany('DELETE FROM profile_series WHERE user_id=? AND period=? AND period_start=? AND activity_level=?',
+                         [row[:4] for row in aged])
+        conn.executemany(UPSERT, _merge(aged, today))
+        deleted = 0
+        if keep_days > 0:
+            raw_cutoff = (today - datetime.timedelta(days=keep_days)).isoformat()
+            deleted = conn.execute(f'''DELETE FROM profiles WHERE user_id IN ({marks}) AND created_at < ?
+                AND rowid < (SELECT MAX(rowid) FROM profiles latest WHERE latest.user_id = profiles.user_id)''',
+                                   (*user_ids, raw_cutoff)).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(aged), deleted
+
+
+def compact(conn=None, now=None, force=False):
+    # Compacts every user with aged buckets or raw rows; returns (users, buckets merged, rows deleted).
+    from . import storage
+    global _last_compact
+    now = now or time.time()
+    if not force and now - _last_compact < float(settings.get("profile_compact_hours", 6)) * 3600:
+        return 0, 0, 0
+    _last_compact = now
+    own = conn is None
+    if own:
+        conn = storage.connect()
+        if storage.dialect() == "sqlite":
+            conn.execute('PRAGMA busy_timeout = 30000')
+    today = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).date()
+    postgres = not isinstance(conn, sqlite3.Connection)
+    if postgres and not conn.execute('SELECT pg_try_advisory_lock(?)', (COMPACT_LOCK_ID,)).fetchone()[0]:
+        if own:
+            conn.close()
+        return 0, 0, 0
+    keep_days = raw_days()
+    try:
+        sql = '''SELECT user_id FROM profile_series WHERE (period = 'day' AND period_start < ?) OR (period = 'week' AND period_start < ?)'''
+        params = [(today - datetime.timedelta(days=DAILY_DAYS)).isoformat(), (today - datetime.timedelta(days=WEEKLY_DAYS)).isoformat()]
+        if keep_days > 0:
+            sql += '''
+            UNION
+            SELECT user_id FROM profiles WHERE created_at < ? GROUP BY user_id HAVING COUNT(*) > 1'''
+            params.append((today - datetime.timedelta(days=keep_days)).isoformat())
+        user_ids = [r[0] for r in conn.execute(sql, params).fetchall()]
+        merged = deleted = 0
+        for start in range(0, len(user_ids), COMPACT_BATCH):
+            m, d = compact_users(conn, user_ids[start:start + COMPACT_BATCH], today, keep_days)
+            merged, deleted = merged + m, deleted + d
+        return len(user_ids), merged, deleted
+    finally:
+        if postgres:
+            conn.execute('SELECT pg_advisory_unlock(?)', (COMPACT_LOCK_ID,))
+        if own:
+            conn.close()
+
+
+def maybe_compact():
+    # Starts compact() on a background thread when it is due.
+    hours = float(settings.get("profile_compact_hours", 6))
+    if hours <= 0 or time.time() - _last_compact < hours * 3600 or not _compact_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            compact()
+        except Exception as e:
+            print("Profile history compaction failed:", e)
+        finally:
+            _compact_lock.release()
+
+    threading.Thread(target=run, name="profile-compaction", daemon=True).start()
+
+
+if __name__ == "__main__":
+    from . import storage
+    storage.configure(sys.argv[1] if len(sys.argv) > 1 else storage.DEFAULT_DB_PATH)
+    conn = storage.connection()
+    started = time.perf_counter()
+    users, merged, deleted = compact(conn, force=True)
+    print(f"Compacted {users} users: {merged} buckets merged, {deleted} profile rows deleted "
+          f"in {time.perf_counter() - started:.2f} s")
+    for period, buckets, saves in conn.execute('SELECT period, COUNT(*), SUM(samples) FROM profile_series GROUP BY period'):
+        print(f"{period:<6} {buckets:>8} buckets {saves or 0:>9} saves")
@@ -0,0 +1,80 @@
+# profiles.py
+# Fitness profiles: the options profile_page offers, validation, BMI and the
+# profile rows. A save that changes something adds a row and a sample to the
+# bucketed BMI and weight series (profile_history.py) the dashboard trends read.
+from . import profile_history, storage, write_behind
+
+GENDERS = ["Male", "Female", "Other"]
+BODY_TYPES = ["Ectomorph : Lean Body", "Mesomorph : Average Body", "Endomorph : Bulky or Fat"]
+ACTIVITY_LEVELS = ["Low: 1-2 days a week", "Moderate: 3-5 days a week", "High: Almost Everyday"]
+GOALS = ["Lose Fat", "Gain Muscle", "Maintain"]
+LOSS_RATES = ["0.5 kg/week", "0.8 kg/week", "1.0 kg/week"]
+WORKOUT_TYPES = ["Gym", "Bodyweight"]
+GYM_FOCUS = ["Cardio Heavy", "Strength Training Focused", "Mix of Both"]
+
+# Column order of the profiles table after user_id.
+PROFILE_FIELDS = ["name", "gender", "body_type", "activity_level", "height", "weight", "bmi",
+                  "goal", "weight_loss_rate", "workout_type", "gym_focus", "created_at"]
+
+
+def latest_profile(user_id):
+    write_behind.settle(user_id)
+    return storage.connection().execute('SELECT * FROM profiles WHERE user_id=? ORDER BY rowid DESC LIMIT 1', (user_id,)).fetchone()
+
+
+def bmi_history(user_id):
+    # [(day, week or month start, average bmi)], oldest first.
+    write_behind.settle(user_id)
+    return profile_history.bmi_trend(storage.connection(), user_id)
+
+
+def activity_level_counts(user_id):
+    # [(activity level, saves with it)].
+    write_behind.settle(user_id)
+    return profile_history.activity_counts(storage.connection(), user_id)
+
+
+def profile_dict(row):
+    return dict(zip(PROFILE_FIELDS, row[1:])) if row else None
+
+
+def compute_bmi(height, weight):
+    return round(weight / (height ** 2), 2) if height > 0 and weight > 0 else 0
+
+
+def validate_profile(name, gender, body_type, activity, height, weight, goal, weight_loss_rate, workout_type, gym_focus):
+    # The message to show, or None when the profile can be saved.
+    if not all([name, gender, body_type, activity, goal, workout_type]) or (goal == "Lose Fat" and not weight_loss_rate) or (workout_type == "Gym" and not gym_focus):
+        return "Please fill out all required fields."
+    # The page only offers these values; the HTTP API is checked against them too.
+    choices = [("Gender", gender, GENDERS), ("Body Type", body_type, BODY_TYPES), ("Physical Activity Level", activity, ACTIVITY_LEVELS),
+               ("Fitness Goal", goal, GOALS), ("Preferred Workout Mode", workout_type, WORKOUT_TYPES)]
+    if goal == "Lose Fat":
+        choices.append(("Weight loss rate", weight_loss_rate, LOSS_RATES))
+    if workout_type == "Gym":
+        choices.append(("Gym Focus", gym_focus, GYM_FOCUS))
+    for label, value, options in choices:
+        if value not in options:
+            return f"{label} must be one of: {', '.join(options)}."
+    if height <= 0 or weight <= 0:
+        return "Height and Weight must be greater than 0."
+    return None
+
+
+def save_profile(user_id, name, gender, body_type, activity, height, weight, goal, weight_loss_rate, workout_type, gym_focus):
+    # False when the profile is the same as the latest one, which is then kept as it is.
+    bmi = compute_bmi(height, weight)
+    fields = (name, gender, body_type, activity, height, weight, bmi, goal, weight_loss_rate, workout_type, gym_focus)
+    latest = latest_profile(user_id)
+    if latest and tuple(latest[1:12]) == fields:
+        return False
+    write_behind.submit('''
+        INSERT INTO profiles (
+            user_id, name, gender, body_type, activity_level,
+            height, weight, bmi, goal, weight_loss_rate,
+            workout_type, gym_focus
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (user_id, *fields), user_id)
+    write_behind.submit(*profile_history.sample(user_id, activity, bmi, weight), user_id)
+    profile_history.maybe_compact()
+    return True
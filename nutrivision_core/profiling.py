@@ -0,0 +1,297 @@
+# profiling.py
+# On-demand profiles of slow page runs. A page wrapped in profiled() runs under
+# a profiler when the hook is on; the profile is kept when the run took longer
+# than profile_slow_ms, or always for a profile_sample_rate fraction of runs.
+# Kept profiles go to profile_dir as one file per run, named after the time,
+# page, run time and reason, and only the newest profile_keep files are kept.
+#
+# Two profilers: "sample" (default) reads the page thread's stack every
+# profile_interval_ms from one shared thread and writes collapsed stacks
+# (.folded, for flamegraph.pl or speedscope); its cost is low enough to leave on
+# for every run. "cprofile" records every call and writes a pstats file (.prof)
+# but slows the page down while it runs. With both settings at 0 (the default)
+# the hook is a wrapper call and a global read, well under a microsecond.
+#
+# Settings: profile_slow_ms, profile_sample_rate (0..1), profile_mode ("sample"
+# or "cprofile"), profile_interval_ms (default 5), profile_dir (default
+# page_profiles), profile_keep (default 100).
+#
+#   python -m nutrivision_core.profiling [dir]        list kept profiles
+#   python -m nutrivision_core.profiling --show FILE  top functions in a profile
+#   python -m nutrivision_core.profiling --bench      overhead per page call
+import os
+import sys
+import time
+import pstats
+import random
+import cProfile
+import datetime
+import functools
+import threading
+import collections
+
+from . import settings
+
+SUFFIXES = (".folded", ".prof")
+
+
+# --- PROFILERS ---
+class CallProfile:
+    suffix = ".prof"
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        # Raises ValueError where another profiler is already active (Python 3.12+).
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def dump(self, path):
+        self.profiler.dump_stats(path)
+
+
+@functools.lru_cache(maxsize=4096)
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SampleProfile:
+    suffix = ".folded"
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.stacks = collections.Counter()
+
+    def start(self):
+        self.ident = threading.get_ident()
+        # Stacks are cut at the caller's frame, so they start at the page function.
+        self.root = sys._getframe(1)
+        self.sampler.add(self)
+
+    def stop(self):
+        self.sampler.remove(self)
+
+    def fold(self, frame):
+        names = []
+        while frame is not None and frame is not self.root:
+            names.append(_label(frame.f_code))
+            frame = frame.f_back
+        if frame is None:
+            return None
+        return ";".join(reversed(names))
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Sampler:
+    # One thread samples every thread that has a SampleProfile running.
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def add(self, profile):
+        with self.lock:
+            self.active.setdefault(profile.ident, []).append(profile)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="page-profiler", daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def remove(self, profile):
+        with self.lock:
+            running = self.active.get(profile.ident, [])
+            if profile in running:
+                running.remove(profile)
+            if not running:
+                self.active.pop(profile.ident, None)
+
+    def _run(self):
+        while True:
+            if not self.active:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                running = [(ident, list(profiles)) for ident, profiles in self.active.items()]
+            for ident, profiles in running:
+                frame = frames.get(ident)
+                for profile in profiles:
+                    stack = profile.fold(frame) if frame is not None else None
+                    if stack:
+                        profile.stacks[stack] += 1
+            del frames
+
+
+# --- STORE ---
+class ProfileStore:
+    def __init__(self, directory, keep):
+        self.directory = directory
+        self.keep = keep
+        self.lock = threading.Lock()
+
+    def save(self, page, elapsed_ms, reason, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}"
+        path = os.path.join(self.directory, f"{stamp}_{page}_{round(elapsed_ms)}ms_{reason}{profile.suffix}")
+        profile.dump(path)
+        self.rotate()
+        return path
+
+    def rotate(self):
+        # Names start with the time, so name order is age order.
+        with self.lock:
+            kept = sorted(name for name in os.listdir(self.directory) if name.endswith(SUFFIXES))
+            for name in kept[:max(0, len(kept) - self.keep)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+# --- CONFIGURATION ---
+# (slow_ms, sample_rate, new_profile, store); store is None when the hook is off.
+_config = None
+_config_lock = threading.Lock()
+
+
+def _factory(mode, interval_ms):
+    if mode == "cprofile":
+        return CallProfile
+    sampler = Sampler(interval_ms / 1000)
+    return lambda: SampleProfile(sampler)
+
+
+def configure(slow_ms=0, sample_rate=0, mode="sample", directory="page_profiles", keep=100, interval_ms=5):
+    # Explicit setup, e.g. from a benchmark; otherwise the settings are read on first use.
+    global _config
+    store = ProfileStore(directory, int(keep)) if float(slow_ms) > 0 or float(sample_rate) > 0 else None
+    _config = (float(slow_ms), float(sample_rate), _factory(mode, float(interval_ms)), store)
+
+
+def _load():
+    with _config_lock:
+        if _config is None:
+            configure(settings.get("profile_slow_ms", 0), settings.get("profile_sample_rate", 0),
+                      settings.get("profile_mode", "sample"), settings.get("profile_dir", "page_profiles"),
+                      settings.get("profile_keep", 100), settings.get("profile_interval_ms", 5))
+    return _config
+
+
+# --- HOOK ---
+def profiled(page):
+    # Decorator: runs the page under a profiler when the hook is on.
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = _config or _load()
+            if config[3] is None:
+                return fn(*args, **kwargs)
+            return _profile_run(config, page, fn, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def _profile_run(config, page, fn, args, kwargs):
+    slow_ms, sample_rate, new_profile, store = config
+    sampled = sample_rate > 0 and random.random() < sample_rate
+    if not sampled and slow_ms <= 0:
+        return fn(*args, **kwargs)
+    profile = new_profile()
+    try:
+        profile.start()
+    except ValueError:
+        return fn(*args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if sampled or elapsed_ms >= slow_ms:
+            try:
+                store.save(page, elapsed_ms, "sampled" if sampled else "slow", profile)
+            except Exception as e:
+                print("Saving the page profile failed:", e)
+
+
+# --- REPORTING ---
+def listing(directory):
+    # [(time, page, ms, reason, kind, file)], newest first.
+    rows = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(SUFFIXES):
+            continue
+        stem, kind = os.path.splitext(name)
+        # The stamp has no "_" and neither do ms and reason; page names may.
+        stamp, rest = stem.split("_", 1)
+        page, ms, reason = rest.rsplit("_", 2)
+        when = datetime.datetime.strptime(stamp[:22], "%Y%m%d-%H%M%S-%f")
+        rows.append((when, page, int(ms[:-2]), reason, kind[1:], name))
+    return rows
+
+
+def show(path, limit=25):
+    if path.endswith(".prof"):
+        pstats.Stats(path).sort_stats("cumulative").print_stats(limit)
+        return
+    own, inclusive = collections.Counter(), collections.Counter()
+    total = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, count = line.rsplit(" ", 1)
+            count = int(count)
+            frames = stack.split(";")
+            total += count
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+    print(f"{total} samples")
+    print(f"{'self %':>7} {'total %':>8}  function")
+    for name, count in inclusive.most_common(limit):
+        print(f"{own[name] / total:>7.1%} {count / total:>8.1%}  {name}")
+
+
+def benchmark(n=200000):
+    def page():
+        pass
+
+    wrapped = profiled("bench")(page)
+
+    def loop(fn):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - start) / n * 1e9
+
+    print(f"{'bare function':<28} {loop(page):8.0f} ns per call")
+    configure()
+    print(f"{'hook off':<28} {loop(wrapped):8.0f} ns per call")
+    configure(slow_ms=60000, directory=os.devnull)
+    print(f"{'sampling, nothing kept':<28} {loop(wrapped):8.0f} ns per call")
+    configure(slow_ms=60000, mode="cprofile", directory=os.devnull)
+    print(f"{'cProfile, nothing kept':<28} {loop(wrapped):8.0f} ns per call")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--show":
+        show(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 25)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark()
+    elif len(sys.argv) <= 2 and not (sys.argv[1:] and sys.argv[1].startswith("-")):
+        directory = sys.argv[1] if len(sys.argv) > 1 else "page_profiles"
+        print(f"{'time':<20} {'page':<20} {'ms':>8} {'reason':<8} {'kind':<7} file")
+        for when, page, ms, reason, kind, name in listing(directory):
+            print(f"{when:%Y-%m-%d %H:%M:%S}  {page:<20} {ms:>8} {reason:<8} {kind:<7} {name}")
+    else:
+        print("Usage: python -m nutrivision_core.profiling [dir] | --show FILE [N] | --bench")
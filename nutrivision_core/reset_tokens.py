@@ -0,0 +1,76 @@
+# reset_tokens.py
+# Single-use, expiring password-reset tokens. Only a SHA-256 hash of each token
+# is stored, and the hash is the table's primary key. Checking a token is
+# therefore one indexed lookup, with no string comparison against a secret.
+import time
+import hashlib
+import secrets
+
+RESET_TOKEN_TTL = 15 * 60
+PURGE_BATCH = 500
+PURGE_INTERVAL = 10 * 60
+
+_last_purge = 0.0
+
+
+def ensure_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS password_reset_tokens (
+        token_hash TEXT PRIMARY KEY,
+        user_id INTEGER,
+        created_at REAL,
+        expires_at REAL,
+        used_at REAL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_expires ON password_reset_tokens (expires_at)')
+
+
+def token_hash(token):
+    return hashlib.sha256((token or "").strip().encode('utf-8')).hexdigest()
+
+
+def issue_token(conn, user_id, now=None):
+    # Any earlier unused token for the user stops working.
+    now = now or time.time()
+    token = secrets.token_urlsafe(32)
+    conn.execute('UPDATE password_reset_tokens SET used_at=? WHERE user_id=? AND used_at IS NULL', (now, user_id))
+    conn.execute('INSERT INTO password_reset_tokens (token_hash, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                 (token_hash(token), user_id, now, now + RESET_TOKEN_TTL))
+    conn.commit()
+    purge_tokens(conn, now)
+    return token
+
+
+def lookup_token(conn, token, now=None):
+    # The user_id a live token belongs to, or None if it is unknown, expired or used.
+    now = now or time.time()
+    row = conn.execute('SELECT user_id FROM password_reset_tokens WHERE token_hash=? AND used_at IS NULL AND expires_at>?',
+                       (token_hash(token), now)).fetchone()
+    return row[0] if row else None
+
+
+def consume_token(conn, token, now=None):
+    # Marks a live token used. The conditional UPDATE makes the claim atomic, so
+    # two concurrent resets with the same token cannot both succeed.
+    now = now or time.time()
+    claimed = conn.execute('UPDATE password_reset_tokens SET used_at=? WHERE token_hash=? AND used_at IS NULL AND expires_at>?',
+                           (now, token_hash(token), now)).rowcount
+    return claimed == 1
+
+
+def purge_tokens(conn, now=None, force=False):
+    # Deletes expired and used tokens in small batches so the write lock is
+    # never held for long.
+    global _last_purge
+    now = now or time.time()
+    if not force and now - _last_purge < PURGE_INTERVAL:
+        return 0
+    _last_purge = now
+    total = 0
+    while True:
+        deleted = conn.execute('''DELETE FROM password_reset_tokens WHERE rowid IN (
+            SELECT rowid FROM password_reset_tokens WHERE expires_at<=? OR used_at IS NOT NULL LIMIT ?
+        )''', (now, PURGE_BATCH)).rowcount
+        conn.commit()
+        total += deleted
+        if deleted < PURGE_BATCH:
+            return total
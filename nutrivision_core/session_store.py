@@ -0,0 +1,145 @@
+# session_store.py
+# Server-side login sessions that survive server restarts. The client holds a
+# signed token "<session id>.<hmac>" (the pages keep it in session_state, API
+# clients send it as a bearer token); the database only stores a hash of the
+# session id. Active sessions are cached in memory, so resuming one on every
+# Streamlit rerun needs no bcrypt work and usually no SQL. Expiry slides forward with activity, and expired rows are
+# deleted in bulk. Stores shared by several processes (the HTTP API workers)
+# pass cache=False, so a session revoked in one process ends in all of them.
+# The store is shared by every session thread, so its SQL runs on the calling
+# thread's connection (storage.connection); only the secret and the cache are
+# shared. The active-sessions metric is counted here, at each cleanup, so a
+# metrics scrape never touches the database.
+import hmac
+import time
+import hashlib
+import secrets
+import threading
+
+from . import metrics
+
+SESSION_TTL = 30 * 60
+# Sliding expiry is written back to SQLite at most this often per session.
+TOUCH_INTERVAL = 60
+GC_INTERVAL = 5 * 60
+
+
+def load_secret(conn, configured=None):
+    # A configured secret wins; otherwise one is generated once and kept in the
+    # database so tokens stay valid across restarts.
+    if configured:
+        return configured.encode('utf-8')
+    cur = conn.cursor()
+    cur.execute('CREATE TABLE IF NOT EXISTS app_secrets (name TEXT PRIMARY KEY, value TEXT)')
+    cur.execute('INSERT OR IGNORE INTO app_secrets (name, value) VALUES (?, ?)', ("session_secret", secrets.token_hex(32)))
+    conn.commit()
+    cur.execute('SELECT value FROM app_secrets WHERE name=?', ("session_secret",))
+    return cur.fetchone()[0].encode('utf-8')
+
+
+class SessionStore:
+    def __init__(self, connection, secret, ttl=SESSION_TTL, cache=True):
+        # connection: returns the calling thread's database connection.
+        self.connection = connection
+        self.secret = secret
+        self.ttl = ttl
+        self.use_cache = cache
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.last_gc = 0.0
+        conn = connection()
+        cur = conn.cursor()
+        cur.execute('''CREATE TABLE IF NOT EXISTS sessions (
+            id_hash TEXT PRIMARY KEY,
+            user_id INTEGER,
+            created_at REAL,
+            expires_at REAL
+        )''')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+        conn.commit()
+
+    @property
+    def conn(self):
+        return self.connection()
+
+    def _sign(self, session_id):
+        return hmac.new(self.secret, session_id.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+    def _id_hash(self, token):
+        session_id, _, signature = (token or "").partition(".")
+        if not session_id or not hmac.compare_digest(signature, self._sign(session_id)):
+            return None
+        return hashlib.sha256(session_id.encode('utf-8')).hexdigest()
+
+    def create(self, user_id, now=None):
+        now = now or time.time()
+        session_id = secrets.token_urlsafe(24)
+        id_hash = hashlib.sha256(session_id.encode('utf-8')).hexdigest()
+        expires_at = now + self.ttl
+        self.conn.execute('INSERT INTO sessions (id_hash, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                          (id_hash, user_id, now, expires_at))
+        self.conn.commit()
+        if self.use_cache:
+            with self.lock:
+                self.cache[id_hash] = [user_id, expires_at, now]
+        metrics.ACTIVE_SESSIONS.inc()
+        return f"{session_id}.{self._sign(session_id)}"
+
+    def resume(self, token, now=None):
+        # Returns the session's user_id and extends its expiry, or None.
+        now = now or time.time()
+        id_hash = self._id_hash(token)
+        if id_hash is None:
+            return None
+        self.gc(now)
+
+        with self.lock:
+            entry = self.cache.get(id_hash)
+        if entry is None:
+            row = self.conn.execute('SELECT user_id, expires_at FROM sessions WHERE id_hash=?', (id_hash,)).fetchone()
+            if row is None:
+                return None
+            # The stored expiry was written ttl seconds before it runs out.
+            entry = [row[0], row[1], row[1] - self.ttl]
+            if self.use_cache:
+                with self.lock:
+                    self.cache[id_hash] = entry
+
+        user_id, expires_at, last_written = entry
+        if expires_at <= now:
+            self.revoke(token)
+            return None
+        entry[1] = now + self.ttl
+        if now - last_written >= TOUCH_INTERVAL:
+            entry[2] = now
+            self.conn.execute('UPDATE sessions SET expires_at=? WHERE id_hash=?', (entry[1], id_hash))
+            self.conn.commit()
+        return user_id
+
+    def revoke(self, token):
+        id_hash = self._id_hash(token)
+        if id_hash is None:
+            return
+        with self.lock:
+            self.cache.pop(id_hash, None)
+        if self.conn.execute('DELETE FROM sessions WHERE id_hash=?', (id_hash,)).rowcount:
+            metrics.ACTIVE_SESSIONS.inc(-1)
+        self.conn.commit()
+
+    def gc(self, now=None, force=False):
+        now = now or time.time()
+        if not force and now - self.last_gc < GC_INTERVAL:
+            return 0
+        self.last_gc = now
+        with self.lock:
+            for id_hash in [k for k, v in self.cache.items() if v[1] <= now]:
+                del self.cache[id_hash]
+            # Expiry extended in memory but not yet written back must not be collected.
+            live = [(v[1], k) for k, v in self.cache.items()]
+        if live:
+            self.conn.executemany('UPDATE sessions SET expires_at=? WHERE id_hash=?', live)
+        deleted = self.conn.execute('DELETE FROM sessions WHERE expires_at<=?', (now,)).rowcount
+        self.conn.commit()
+        # Corrects the running count for expiry and for other processes' sessions.
+        metrics.ACTIVE_SESSIONS.set(self.conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0])
+        return deleted
@@ -0,0 +1,25 @@
+# settings.py
+# Configuration shared by the Streamlit app and the HTTP API. Streamlit reads
+# .streamlit/secrets.toml; the API usually runs without one, so every setting
+# can also come from an environment variable, NUTRIVISION_<NAME>, which wins.
+import os
+
+import streamlit as st
+
+# Settings with a conventional variable of their own.
+ENV_ALIASES = {"openai_api_key": "OPENAI_API_KEY"}
+_MISSING = object()
+
+
+def get(name, default=_MISSING):
+    value = os.environ.get("NUTRIVISION_" + name.upper()) or os.environ.get(ENV_ALIASES.get(name, ""))
+    if value:
+        return value
+    try:
+        return st.secrets[name]
+    except (KeyError, FileNotFoundError):
+        # A missing secrets.toml raises a FileNotFoundError subclass.
+        if default is _MISSING:
+            raise KeyError(f"Setting {name!r} is not configured. Add it to .streamlit/secrets.toml "
+                           f"or set NUTRIVISION_{name.upper()}.") from None
+        return default
@@ -0,0 +1,360 @@
+# storage.py
+# Database storage shared by every entry point: the schema and its migrations,
+# the content-addressed plan blob store, the plan rows and the queries the
+# pages run on them.
+#
+# The configured database is a SQLite file path (the default) or a PostgreSQL
+# URL (see postgres.py), so app nodes on several machines can share one
+# database. Set it with the database_url setting. The SQL everywhere is
+# written for SQLite; the PostgreSQL connections translate it.
+#
+# Each thread gets its own connection to the configured database. Streamlit
+# runs a script run (and its fragment reruns) on one thread, so a page never
+# shares a cursor with another session.
+import time
+import zlib
+import contextlib
+import sqlite3
+import hashlib
+import datetime
+import threading
+
+import streamlit as st
+
+from . import ledger, metrics, postgres, profile_history, reset_tokens, write_behind
+from .plan_parser import parse_diet_plan
+from .plan_schema import render_stored_plan
+
+DEFAULT_DB_PATH = 'nutrivision_users.db'
+SCHEMA_LOCK_ID = 7421
+
+_db_path = DEFAULT_DB_PATH
+_local = threading.local()
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def configure(db_path):
+    # db_path: a SQLite file or a postgresql:// (or pgserver://) URL.
+    global _db_path
+    _db_path = db_path
+
+
+def db_path():
+    return _db_path
+
+
+def dialect(target=None):
+    return "postgres" if postgres.is_url(target or _db_path) else "sqlite"
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Every statement is timed into metrics.DB_QUERY, labelled by kind and table.
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            op, table = metrics.statement_labels(sql)
+            metrics.DB_QUERY.observe(time.perf_counter() - start, op=op, table=table)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            op, table = metrics.statement_labels(sql)
+            metrics.DB_QUERY.observe(time.perf_counter() - start, op=op, table=table)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(path=None):
+    target = path or _db_path
+    if postgres.is_url(target):
+        return postgres.connect(target)
+    return sqlite3.connect(target, check_same_thread=False, factory=TimedConnection)
+
+
+def connection():
+    # The schema is created and migrated once per database per process.
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != _db_path:
+        conn = connect()
+        _local.conn, _local.path = conn, _db_path
+        with _ready_lock:
+            if _db_path not in _ready:
+                with schema_lock(conn):
+                    init_db(conn)
+                _ready.add(_db_path)
+    return conn
+
+
+@contextlib.contextmanager
+def schema_lock(conn):
+    # App nodes sharing a PostgreSQL database create and migrate the schema one at a time.
+    if not isinstance(conn, postgres.Connection):
+        yield
+        return
+    conn.execute('SELECT pg_advisory_lock(?)', (SCHEMA_LOCK_ID,))
+    try:
+        yield
+    finally:
+        conn.execute('SELECT pg_advisory_unlock(?)', (SCHEMA_LOCK_ID,))
+
+
+# --- DB SETUP ---
+def init_db(conn):
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        email TEXT UNIQUE,
+        username TEXT UNIQUE,
+        password TEXT,
+        reset_token TEXT
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS profiles (
+        user_id INTEGER,
+        name TEXT,
+        gender TEXT,
+        body_type TEXT,
+        activity_level TEXT,
+        height REAL,
+        weight REAL,
+        bmi REAL,
+        goal TEXT,
+        weight_loss_rate TEXT,
+        workout_type TEXT,
+        gym_focus TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS diet_plans (
+        user_id INTEGER,
+        profile_hash TEXT,
+        plan TEXT,
+        diet_type TEXT,
+        allergens TEXT,
+        other_allergy TEXT,
+        health_conditions TEXT,
+        supplements TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS workout_plans (
+        user_id INTEGER,
+        plan TEXT,
+        workout_time_pref TEXT,
+        duration_pref TEXT,
+        injuries TEXT,
+        equipment TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS diet_feedback (
+        user_id INTEGER,
+        plan TEXT,
+        rating INTEGER,
+        feedback TEXT,
+        compliance TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS plan_blobs (
+        id INTEGER PRIMARY KEY,
+        digest TEXT UNIQUE,
+        codec TEXT,
+        size INTEGER,
+        body BLOB
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS plan_days (
+        blob_id INTEGER,
+        day INTEGER,
+        protein REAL,
+        carbs REAL,
+        fats REAL,
+        calories REAL
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS plan_meals (
+        blob_id INTEGER,
+        day INTEGER,
+        position INTEGER,
+        meal TEXT,
+        items TEXT,
+        protein REAL,
+        carbs REAL,
+        fats REAL,
+        calories REAL
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS plan_parse_issues (
+        blob_id INTEGER,
+        issue TEXT
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS dish_cache (
+        image_hash TEXT PRIMARY KEY,
+        dish TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS dish_nutrition (
+        name TEXT PRIMARY KEY,
+        serving TEXT,
+        calories REAL,
+        protein REAL,
+        carbs REAL,
+        fat REAL,
+        sugar REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    reset_tokens.ensure_table(conn)
+    ledger.ensure_table(conn)
+    profile_history.ensure_table(conn)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_profiles_user ON profiles (user_id, created_at)')
+    for table in ("diet_plans", "workout_plans", "diet_feedback"):
+        c.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table} (user_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_plan_days_blob ON plan_days (blob_id, day)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_plan_meals_blob ON plan_meals (blob_id, day, position)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_plan_parse_issues_blob ON plan_parse_issues (blob_id)')
+    conn.commit()
+    for table in ("diet_plans", "workout_plans", "diet_feedback"):
+        migrate_plan_bodies(conn, table)
+    profile_history.backfill(conn)
+
+
+# --- PLAN BLOB STORE ---
+# Plan bodies are stored once per unique text, compressed, and referenced by id
+# from diet_plans, workout_plans and diet_feedback. The preset dictionary holds
+# the boilerplate every generated plan repeats, so even short plans compress well.
+PLAN_CODEC = "zlib-dict-v1"
+PLAN_ZDICT = (
+    "7-Day Diet Plan for Daily Nutritional Goals Macronutrient Breakdown "
+    "### Day 1 ### Day 2 ### Day 3 ### Day 4 ### Day 5 ### Day 6 ### Day 7 "
+    "**Breakfast** **Morning Snack** **Lunch** **Evening Snack** **Dinner** "
+    "- Food items: - Protein: g - Carbs: g - Fats: g - Calories: kcal "
+    "**Daily Totals**: Total Protein: g, Carbs: g, Fats: g, Calories: kcal "
+    "Day 1: Day 2: Day 3: Day 4: Day 5: Day 6: Day 7: Rest Day "
+    "- Warm-up: - Exercise 1: - Exercise 2: - Exercise 3: - Exercise 4: "
+    "Sets x Reps 3 x 12 3 x 10 4 x 8 minutes - Cooldown: stretching "
+).encode('utf-8')
+
+
+def compress_plan(text):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS, zdict=PLAN_ZDICT)
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+
+def decompress_plan(body, codec=PLAN_CODEC):
+    if codec != PLAN_CODEC:
+        raise ValueError(f"Unknown plan codec: {codec}")
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict=PLAN_ZDICT)
+    return (decompressor.decompress(body) + decompressor.flush()).decode('utf-8')
+
+
+def store_plan_blob(text, conn=None):
+    c = (conn or connection()).cursor()
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    c.execute('INSERT OR IGNORE INTO plan_blobs (digest, codec, size, body) VALUES (?, ?, ?, ?)',
+              (digest, PLAN_CODEC, len(text), compress_plan(text)))
+    c.execute('SELECT id FROM plan_blobs WHERE digest=?', (digest,))
+    return c.fetchone()[0]
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_plan_blob(blob_id, path):
+    # path only keys the cache: blob ids are per database.
+    c = connection().cursor()
+    c.execute('SELECT body, codec FROM plan_blobs WHERE id=?', (blob_id,))
+    row = c.fetchone()
+    return render_stored_plan(decompress_plan(row[0], row[1])) if row else None
+
+
+def plan_text(plan, blob_id):
+    # Rows written before the blob store keep their text inline.
+    return plan if plan is not None else load_plan_blob(blob_id, _db_path)
+
+
+def migrate_plan_bodies(conn, table):
+    c = conn.cursor()
+    columns = [col[0] for col in c.execute(f'SELECT * FROM {table} LIMIT 0').description]
+    if 'blob_id' in columns:
+        return
+    c.execute(f'ALTER TABLE {table} ADD COLUMN blob_id INTEGER')
+    rows = c.execute(f'SELECT rowid, plan FROM {table} WHERE plan IS NOT NULL').fetchall()
+    for rowid, plan in rows:
+        c.execute(f'UPDATE {table} SET plan=NULL, blob_id=? WHERE rowid=?', (store_plan_blob(plan, conn), rowid))
+    conn.commit()
+
+
+# --- STRUCTURED PLAN ROWS ---
+def save_plan_structure(blob_id, plan, days=None):
+    # Plans are content-addressed, so each unique plan body is parsed only once.
+    c = connection().cursor()
+    c.execute('SELECT 1 FROM plan_days WHERE blob_id=? UNION ALL SELECT 1 FROM plan_parse_issues WHERE blob_id=? LIMIT 1', (blob_id, blob_id))
+    if c.fetchone():
+        c.execute('SELECT issue FROM plan_parse_issues WHERE blob_id=?', (blob_id,))
+        return [r[0] for r in c.fetchall()]
+
+    if days is None:
+        days, problems = parse_diet_plan(plan)
+    else:
+        problems = []
+    c.executemany('INSERT INTO plan_days (blob_id, day, protein, carbs, fats, calories) VALUES (?, ?, ?, ?, ?, ?)',
+                  [(blob_id, d['day'], d['totals'].get('protein'), d['totals'].get('carbs'), d['totals'].get('fats'), d['totals'].get('calories'))
+                   for d in days])
+    c.executemany('INSERT INTO plan_meals (blob_id, day, position, meal, items, protein, carbs, fats, calories) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                  [(blob_id, d['day'], m['position'], m['meal'], m['items'], m['protein'], m['carbs'], m['fats'], m['calories'])
+                   for d in days for m in d['meals']])
+    c.executemany('INSERT INTO plan_parse_issues (blob_id, issue) VALUES (?, ?)', [(blob_id, p) for p in problems])
+    return problems
+
+
+# --- PLAN ROWS ---
+def insert_diet_plan(user_id, profile_hash, plan, stored, days, diet_type, allergens, other_allergy, health_conditions, supplements):
+    # Returns the format problems found while parsing the plan.
+    conn = connection()
+    blob_id = store_plan_blob(stored, conn)
+    problems = save_plan_structure(blob_id, plan, days)
+    conn.execute('INSERT INTO diet_plans (user_id, profile_hash, blob_id, diet_type, allergens, other_allergy, health_conditions, supplements, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                 (user_id, profile_hash, blob_id, diet_type, ','.join(allergens), other_allergy, ','.join(health_conditions), ','.join(supplements), datetime.datetime.now()))
+    conn.commit()
+    return problems
+
+
+def insert_workout_plan(user_id, stored):
+    conn = connection()
+    conn.execute('INSERT INTO workout_plans (user_id, blob_id, created_at) VALUES (?, ?, ?)',
+                 (user_id, store_plan_blob(stored, conn), datetime.datetime.now()))
+    conn.commit()
+
+
+def latest_diet_plan(user_id):
+    # (plan, blob_id, created_at) of the user's newest diet plan, or None.
+    return connection().execute('SELECT plan, blob_id, created_at FROM diet_plans WHERE user_id=? ORDER BY created_at DESC LIMIT 1',
+                                (user_id,)).fetchone()
+
+
+def plan_counts(user_id):
+    # (diet plans, workout plans) the user has generated.
+    conn = connection()
+    return (conn.execute('SELECT COUNT(*) FROM diet_plans WHERE user_id=?', (user_id,)).fetchone()[0],
+            conn.execute('SELECT COUNT(*) FROM workout_plans WHERE user_id=?', (user_id,)).fetchone()[0])
+
+
+def latest_plan_averages(user_id):
+    # (average daily calories, average daily protein) of the newest diet plan; Nones without one.
+    return connection().execute('''SELECT AVG(d.calories), AVG(d.protein) FROM plan_days d
+        WHERE d.blob_id = (SELECT blob_id FROM diet_plans WHERE user_id=? ORDER BY created_at DESC LIMIT 1)''', (user_id,)).fetchone()
+
+
+def insert_diet_feedback(user_id, blob_id, plan, rating, feedback, compliance):
+    # Queued: feedback only has to be visible by the next plan the user asks for.
+    if blob_id is None:
+        conn = connection()
+        blob_id = store_plan_blob(plan, conn)
+        conn.commit()
+    write_behind.submit('INSERT INTO diet_feedback (user_id, blob_id, rating, feedback, compliance) VALUES (?, ?, ?, ?, ?)',
+                        (user_id, blob_id, rating, feedback, compliance), user_id)
@@ -0,0 +1,286 @@
+# tracing.py
+# Lightweight latency tracing. A page opens a root span with trace() and each
+# stage inside it opens a nested span(); when the root closes, the whole trace
+# goes in one batch to the trace_spans table of the app database or to a
+# JSON-lines file. Database traces are queued and written by a background
+# thread, so the page or request being traced never waits on the write lock. Roots are sampled at trace_sample_rate (default 0: off). An
+# unsampled or disabled trace returns a shared no-op span, so the cost is one
+# random() call per root and one context-variable read per nested span.
+#
+# Settings: trace_sample_rate (0..1), trace_exporter ("database" or "file"),
+# trace_file (for the file exporter, default traces.jsonl).
+#
+#   python -m nutrivision_core.tracing --summary [db]   per-stage latency
+#   python -m nutrivision_core.tracing --bench          overhead per span
+import sys
+import json
+import queue
+import atexit
+import functools
+import time
+import random
+import secrets
+import threading
+import contextvars
+
+from . import settings
+
+_current = contextvars.ContextVar("nutrivision_span", default=None)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, exporter):
+        self.trace_id = secrets.token_hex(8)
+        self.exporter = exporter
+        self.spans = []
+        self.root = None
+
+    def finished(self, span):
+        # Spans may finish on the model gateway's thread; list.append is atomic.
+        self.spans.append(span)
+        if span is self.root:
+            try:
+                self.exporter.export(self)
+            except Exception as e:
+                print("Trace export failed:", e)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attrs", "started_at", "duration", "error", "_t0", "_token")
+
+    def __init__(self, trace, name, parent_id, attrs):
+        self.trace = trace
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self.trace.finished(self)
+        return False
+
+    def row(self):
+        return (self.trace.trace_id, self.span_id, self.parent_id, self.name, self.started_at,
+                round(self.duration * 1000, 3), self.error, json.dumps(self.attrs, default=str) if self.attrs else None)
+
+
+# --- EXPORTERS ---
+SPAN_COLUMNS = ("trace_id", "span_id", "parent_id", "name", "started_at", "duration_ms", "error", "attrs")
+# The database exporter writes what was queued in this interval as one transaction.
+EXPORT_INTERVAL = 1.0
+
+
+class DatabaseExporter:
+    def __init__(self, path):
+        self.path = path
+        self.pending = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush, 5)
+
+    def export(self, trace):
+        self.pending.put([s.row() for s in trace.spans])
+
+    def flush(self, timeout=None):
+        # Waits until everything queued so far has been written.
+        done = threading.Event()
+        self.pending.put(done)
+        return done.wait(timeout)
+
+    def _connect(self):
+        from . import storage
+        conn = storage.connect(self.path)
+        if storage.dialect(self.path) == "sqlite":
+            conn.execute('PRAGMA busy_timeout = 30000')
+        conn.execute('''CREATE TABLE IF NOT EXISTS trace_spans (
+            trace_id TEXT,
+            span_id TEXT,
+            parent_id TEXT,
+            name TEXT,
+            started_at REAL,
+            duration_ms REAL,
+            error TEXT,
+            attrs TEXT
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans (trace_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_trace_spans_name ON trace_spans (name, started_at)')
+        conn.commit()
+        return conn
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = [self.pending.get()]
+            time.sleep(EXPORT_INTERVAL)
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for item in batch if not isinstance(item, threading.Event) for row in item]
+            try:
+                if rows:
+                    conn = conn or self._connect()
+                    conn.executemany('INSERT INTO trace_spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                    conn.commit()
+            except Exception as e:
+                print(f"Trace export failed ({len(rows)} spans dropped):", e)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                conn = None
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+
+class FileExporter:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, trace):
+        lines = "".join(json.dumps(dict(zip(SPAN_COLUMNS, s.row()))) + "\n" for s in trace.spans)
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+# --- CONFIGURATION ---
+_config = None
+_config_lock = threading.Lock()
+
+
+def configure(sample_rate, exporter=None):
+    # Explicit setup, e.g. from a benchmark; otherwise the settings are read on first use.
+    global _config
+    _config = (float(sample_rate), exporter)
+
+
+def _load():
+    global _config
+    with _config_lock:
+        if _config is None:
+            rate = float(settings.get("trace_sample_rate", 0))
+            exporter = None
+            if rate > 0:
+                if settings.get("trace_exporter", "database") == "file":
+                    exporter = FileExporter(settings.get("trace_file", "traces.jsonl"))
+                else:
+                    from . import storage
+                    exporter = DatabaseExporter(storage.db_path())
+            _config = (rate, exporter)
+    return _config
+
+
+# --- SPANS ---
+def trace(name, **attrs):
+    # Opens a root span, or a child span when a trace is already active.
+    parent = _current.get()
+    if parent is not None:
+        return Span(parent.trace, name, parent.span_id, attrs)
+    rate, exporter = _config or _load()
+    if rate <= 0 or exporter is None or (rate < 1 and random.random() >= rate):
+        return NOOP
+    t = Trace(exporter)
+    t.root = Span(t, name, None, attrs)
+    return t.root
+
+
+def span(name, **attrs):
+    parent = _current.get()
+    if parent is None:
+        return NOOP
+    return Span(parent.trace, name, parent.span_id, attrs)
+
+
+def traced(name):
+    # Decorator: the function body runs inside trace(name).
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- REPORTING ---
+def summary(path):
+    # [(name, count, p50 ms, p95 ms, max ms, errors)], slowest p95 first.
+    from . import storage
+    conn = storage.connect(path)
+    durations = {}
+    errors = {}
+    for name, duration, error in conn.execute('SELECT name, duration_ms, error FROM trace_spans'):
+        durations.setdefault(name, []).append(duration)
+        errors[name] = errors.get(name, 0) + (error is not None)
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        pick = lambda p: values[min(len(values) - 1, int(p * len(values)))]
+        rows.append((name, len(values), pick(0.5), pick(0.95), values[-1], errors[name]))
+    return sorted(rows, key=lambda r: -r[3])
+
+
+def benchmark(n=200000):
+    class NullExporter:
+        def export(self, trace):
+            pass
+
+    def nested():
+        with trace("page"):
+            with span("stage"):
+                pass
+
+    def loop():
+        start = time.perf_counter()
+        for _ in range(n):
+            nested()
+        return (time.perf_counter() - start) / n * 1e9
+
+    for label, rate in (("disabled", 0), ("sampled out (rate 0.01)", 0.01), ("recorded (rate 1)", 1)):
+        configure(rate, NullExporter())
+        print(f"{label:<26} {loop():8.0f} ns per root + nested span")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--summary":
+        db = sys.argv[2] if len(sys.argv) > 2 else "nutrivision_users.db"
+        print(f"{'span':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'errors':>6}")
+        for name, count, p50, p95, worst, errs in summary(db):
+            print(f"{name:<28} {count:>6} {p50:>9.2f} {p95:>9.2f} {worst:>9.2f} {errs:>6}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark()
+    else:
+        print("Usage: python -m nutrivision_core.tracing --summary [db] | --bench")
@@ -0,0 +1,284 @@
+# write_behind.py
+# Write-behind for inserts a page does not need to wait on: profile snapshots
+# and diet feedback. submit() queues the statement; one writer thread per
+# process runs everything queued within write_behind_interval_ms as a single
+# transaction, so a burst of saves from many sessions takes SQLite's write lock
+# once instead of once per row. (The model usage ledger has its own batched
+# writer in ledger.py.)
+#
+# Read-your-writes: a queued row carries the user it was written for, and
+# settle(user_id) waits until that user's queued rows are committed. Reads of
+# those tables call it first; with nothing queued for the user it is a
+# dictionary lookup.
+#
+# Settings: write_behind - "async" (default: return at once; a normal exit
+# flushes the queue, but rows still queued when the process is killed are
+# lost), "group" (wait for the commit of the batch, so a save is durable when it
+# returns while still sharing the transaction with other sessions) or "off"
+# (commit inline on the session thread). write_behind_interval_ms (default 50).
+# write_behind_synchronous: PRAGMA synchronous for the writer (FULL, NORMAL).
+#
+#   python -m nutrivision_core.write_behind --bench   concurrent inserts, inline vs batched
+import os
+import sys
+import time
+import queue
+import atexit
+import sqlite3
+import tempfile
+import threading
+import collections
+
+from . import settings
+
+MODES = ("async", "group", "off")
+SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+MAX_BATCH = 1000
+SETTLE_TIMEOUT = 10
+# Group mode gives up on a commit after this long; longer than the writer's
+# 30 s busy_timeout, so only a stuck writer reaches it.
+COMMIT_TIMEOUT = 60
+
+
+class Ticket:
+    __slots__ = ("path", "user_id", "sql", "params", "done", "error")
+
+    def __init__(self, path, user_id, sql, params, wait):
+        self.path = path
+        self.user_id = user_id
+        self.sql = sql
+        self.params = params
+        self.done = threading.Event() if wait else None
+        self.error = None
+
+
+# --- WRITER ---
+class Writer:
+    def __init__(self, interval, synchronous):
+        self.interval = interval
+        self.synchronous = synchronous
+        self.pending = queue.SimpleQueue()
+        # (path, user_id) -> rows queued and not yet committed.
+        self.outstanding = collections.Counter()
+        self.settled = threading.Condition()
+        self.commits = 0
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def submit(self, ticket):
+        if ticket.user_id is not None:
+            with self.settled:
+                self.outstanding[(ticket.path, ticket.user_id)] += 1
+        self.pending.put(ticket)
+
+    def settle(self, path, user_id, timeout=SETTLE_TIMEOUT):
+        key = (path, user_id)
+        if key not in self.outstanding:
+            return True
+        with self.settled:
+            return self.settled.wait_for(lambda: key not in self.outstanding, timeout)
+
+    def flush(self, timeout=None):
+        # Waits until everything queued so far has been written.
+        done = threading.Event()
+        self.pending.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        connections = {}
+        while True:
+            batch = [self.pending.get()]
+            waited_on = getattr(batch[0], "done", None) is not None
+            deadline = time.monotonic() + self.interval
+            # A flush request ends the batch early. Once someone waits on the
+            # batch it takes only what is already queued: rows that arrive
+            # during its commit go into the next one.
+            while len(batch) < MAX_BATCH and not isinstance(batch[-1], threading.Event):
+                remaining = 0 if waited_on else deadline - time.monotonic()
+                try:
+                    batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+                waited_on = waited_on or getattr(batch[-1], "done", None) is not None
+            # Whatever goes wrong, the thread must live on and release the
+            # batch's waiters, or every later save and settle() would hang.
+            try:
+                self._write(connections, batch)
+            except Exception as e:
+                print("Write-behind batch failed:", e)
+                for item in batch:
+                    if isinstance(item, Ticket) and item.error is None:
+                        item.error = e
+                self._finish(batch)
+
+    def _connect(self, path):
+        from . import storage
+        conn = storage.connect(path)
+        if storage.dialect(path) == "sqlite":
+            conn.execute('PRAGMA busy_timeout = 30000')
+            conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        else:
+            conn.execute(f"SET synchronous_commit = {'off' if self.synchronous == 'OFF' else 'on'}")
+        return conn
+
+    def _commit(self, conn, tickets):
+        try:
+            for ticket in tickets:
+                conn.execute(ticket.sql, ticket.params)
+            conn.commit()
+            self.commits += 1
+            return
+        except sqlite3.Error:
+            conn.rollback()
+        # One bad row must not take the rest of the batch with it.
+        for ticket in tickets:
+            try:
+                conn.execute(ticket.sql, ticket.params)
+                conn.commit()
+                self.commits += 1
+            except sqlite3.Error as e:
+                conn.rollback()
+                ticket.error = e
+
+    def _write(self, connections, batch):
+        by_path = {}
+        for item in batch:
+            if isinstance(item, Ticket):
+                by_path.setdefault(item.path, []).append(item)
+        for path, tickets in by_path.items():
+            try:
+                conn = connections.get(path)
+                if conn is None:
+                    conn = connections[path] = self._connect(path)
+                self._commit(conn, tickets)
+            except Exception as e:
+                for ticket in tickets:
+                    ticket.error = e
+                # The connection may be unusable; the next batch opens a new one.
+                conn = connections.pop(path, None)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            failed = [t for t in tickets if t.error is not None and t.done is None]
+            if failed:
+                print(f"Write-behind insert failed ({len(failed)} rows dropped):", failed[0].error)
+        self._finish(batch)
+
+    def _finish(self, batch):
+        # Releases settle() and the waiters of a written (or failed) batch.
+        with self.settled:
+            for item in batch:
+                if isinstance(item, Ticket) and item.user_id is not None:
+                    key = (item.path, item.user_id)
+                    self.outstanding[key] -= 1
+                    if self.outstanding[key] <= 0:
+                        del self.outstanding[key]
+            self.settled.notify_all()
+        for item in batch:
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item.done is not None:
+                item.done.set()
+
+
+# --- CONFIGURATION ---
+# (mode, writer); the writer is None when write_behind is off.
+_config = None
+_config_lock = threading.Lock()
+
+
+def _configure(mode, interval_ms, synchronous):
+    global _config
+    if mode not in MODES:
+        raise ValueError(f"write_behind must be one of {', '.join(MODES)}, not {mode!r}")
+    synchronous = str(synchronous).upper()
+    if synchronous not in SYNCHRONOUS:
+        raise ValueError(f"write_behind_synchronous must be one of {', '.join(SYNCHRONOUS)}, not {synchronous!r}")
+    if _config is not None and _config[1] is not None:
+        _config[1].flush()
+    writer = Writer(float(interval_ms) / 1000, synchronous) if mode != "off" else None
+    if writer is not None:
+        atexit.register(writer.flush, 5)
+    _config = (mode, writer)
+
+
+def configure(mode="async", interval_ms=50, synchronous="FULL"):
+    # Explicit setup, e.g. from a benchmark; otherwise the settings are read on first use.
+    with _config_lock:
+        _configure(mode, interval_ms, synchronous)
+
+
+def _load():
+    with _config_lock:
+        if _config is None:
+            _configure(settings.get("write_behind", "async"), settings.get("write_behind_interval_ms", 50),
+                       settings.get("write_behind_synchronous", "FULL"))
+    return _config
+
+
+# --- API ---
+def submit(sql, params, user_id=None):
+    # Queues an INSERT (or any statement whose result nobody reads back at once).
+    from . import storage
+    conn = storage.connection()
+    mode, writer = _config or _load()
+    if writer is None:
+        conn.execute(sql, params)
+        conn.commit()
+        return
+    ticket = Ticket(storage.db_path(), user_id, sql, params, mode == "group")
+    writer.submit(ticket)
+    if ticket.done is not None:
+        if not ticket.done.wait(COMMIT_TIMEOUT):
+            raise sqlite3.OperationalError(f"write-behind commit did not finish within {COMMIT_TIMEOUT} s")
+        if ticket.error is not None:
+            raise ticket.error
+
+
+def settle(user_id):
+    # Waits until rows queued for this user are visible to reads.
+    from . import storage
+    config = _config
+    if config is not None and config[1] is not None and user_id is not None:
+        config[1].settle(storage.db_path(), user_id)
+
+
+def flush(timeout=None):
+    config = _config
+    return config[1].flush(timeout) if config is not None and config[1] is not None else True
+
+
+# --- BENCHMARK ---
+def benchmark(threads=16, rows=200):
+    from . import storage
+    path = os.path.join(tempfile.mkdtemp(prefix="nutrivision-wb-"), "bench.db")
+    storage.configure(path)
+    sql = 'INSERT INTO diet_feedback (user_id, blob_id, rating, feedback, compliance) VALUES (?, ?, ?, ?, ?)'
+
+    def one(n):
+        for i in range(rows):
+            submit(sql, (n, None, i % 5 + 1, "bench", "Yes"), n)
+        settle(n)
+
+    print(f"{threads} threads x {rows} feedback inserts")
+    for mode in ("off", "async", "group"):
+        configure(mode)
+        workers = [threading.Thread(target=one, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        flush()
+        elapsed = time.perf_counter() - start
+        commits = threads * rows if mode == "off" else _config[1].commits
+        print(f"{mode:<6} {threads * rows / elapsed:>9.0f} inserts/s  {commits:>6} commits")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark()
+    else:
+        print("Usage: python -m nutrivision_core.write_behind --bench")
@@ -0,0 +1,35 @@
+# test_startup.py
+# The plotting stack (pandas, matplotlib, plotly.express) may only load when the
+# Dashboard draws a chart. Each entry script is started in a fresh interpreter,
+# renders the login page, then walks every page but the Dashboard and Logout
+# (benchmarks/startup.py does the measuring); none of them may import it.
+#
+#   python -m pytest tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import startup
+
+
+@pytest.fixture(scope="module", params=startup.SCRIPTS)
+def started(request):
+    return request.param, startup.measure(request.param)
+
+
+def test_pages_render_without_errors(started):
+    script, result = started
+    assert result["pages"], f"{script}: no pages to walk"
+    assert result["errors"] == []
+
+
+def test_login_page_does_not_load_plotting(started):
+    script, result = started
+    assert result["heavy_at_login"] == []
+
+
+def test_other_pages_do_not_load_plotting(started):
+    script, result = started
+    assert result["heavy_after_pages"] == []